@@ -0,0 +1,63 @@
+"""
+Compares resolving config values with the member/index operators, with compiled queries and
+with fetch_many() of a dict and of compiled queries.
+Usage: PYTHONPATH=src python benchmarks/compiled_query_benchmark.py [iterations]
+"""
+import sys
+import time
+
+from jsoncfg import loads_config, compile_query, compile_queries, fetch_many
+
+
+JSON_STR = """{
+    servers: [
+        {name: "a", address: {host: "10.0.0.1", port: 80}},
+        {name: "b", address: {host: "10.0.0.2", port: 81}},
+    ],
+    routing: {default: {backend: "a", timeout: 1.5, retries: 3}},
+}"""
+
+PATHS = {
+    'host': 'servers[1].address.host',
+    'port': 'servers[1].address.port',
+    'backend': 'routing.default.backend',
+    'timeout': 'routing.default.timeout',
+    'retries': 'routing.default.retries',
+}
+
+
+def _time(func, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        func()
+    return time.time() - start
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    config = loads_config(JSON_STR)
+    queries = dict((name, compile_query(path)) for name, path in PATHS.items())
+
+    def member_access():
+        return {
+            'host': config.servers[1].address.host,
+            'port': config.servers[1].address.port,
+            'backend': config.routing.default.backend,
+            'timeout': config.routing.default.timeout,
+            'retries': config.routing.default.retries,
+        }
+
+    def compiled_queries():
+        return dict((name, query(config)) for name, query in queries.items())
+
+    print('%d iterations of %d paths' % (iterations, len(PATHS)))
+    print('member access:     %.3fs' % _time(member_access, iterations))
+    print('compiled queries:  %.3fs' % _time(compiled_queries, iterations))
+    compiled = compile_queries(queries)
+    print('fetch_many(dict):  %.3fs' % _time(lambda: fetch_many(config, queries), iterations))
+    print('fetch_many(compiled_queries): %.3fs' % _time(lambda: fetch_many(config, compiled),
+                                                        iterations))
+
+
+if __name__ == '__main__':
+    main()
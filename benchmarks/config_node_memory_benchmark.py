@@ -0,0 +1,63 @@
+"""
+Measures the memory usage of config trees compared to the python trees of the same json
+text and the average overhead of a config node. Also measures the load time of config trees
+with nodes that store only their offsets (the default) and with eagerly calculated locations.
+Usage: PYTHONPATH=src python benchmarks/config_node_memory_benchmark.py [record_count]
+"""
+import sys
+import time
+import tracemalloc
+
+from jsoncfg import loads, loads_config, JSONParserParams
+
+
+def generate_records(record_count):
+    # Non-strict json (unquoted keys) so the stdlib fast path isn't used.
+    records = ',\n'.join(
+        '  {id: %d, user: {name: "user%d", tags: ["a", "b"]}, geo: {lat: 1.5, lon: 2}}'
+        % (i, i) for i in range(record_count))
+    return '[\n%s\n]\n' % records
+
+
+def _measure(func):
+    tracemalloc.start()
+    result = func()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, memory
+
+
+def _time(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def _count_nodes(value):
+    if isinstance(value, dict):
+        return 1 + sum(_count_nodes(item) for item in value.values())
+    if isinstance(value, list):
+        return 1 + sum(_count_nodes(item) for item in value)
+    return 1
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    json_str = generate_records(record_count)
+    params = JSONParserParams(root_is_array=True)
+    tree, tree_memory = _measure(lambda: loads(json_str, params))
+    config, config_memory = _measure(lambda: loads_config(json_str, params))
+    node_count = _count_nodes(tree)
+    print('%d records, %.1f MB, %d nodes' % (record_count, len(json_str) / 1e6, node_count))
+    print('loads():           %7.1f MB' % (tree_memory / 1e6))
+    print('loads_config():    %7.1f MB' % (config_memory / 1e6))
+    print('config node overhead: %.1f bytes' % ((config_memory - tree_memory) / node_count))
+    print('loads_config() with offset locations: %.3fs' % _time(
+        lambda: loads_config(json_str, params)))
+    print('loads_config() with eager locations:  %.3fs' % _time(
+        lambda: loads_config(json_str, JSONParserParams(root_is_array=True,
+                                                        lazy_location=False))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Compares loading a large config with loads_config() and with loads_config(lazy=True) when
+only a few of its top-level values are used.
+Usage: PYTHONPATH=src python benchmarks/lazy_config_benchmark.py [section_count]
+"""
+import sys
+import time
+
+from jsoncfg import loads_config
+
+
+def generate_config(section_count):
+    sections = ',\n'.join(
+        '  // section %d\n  section%d: {port: %d, hosts: ["a%d", "b%d"], limits: {cpu: 1.5, '
+        'memory: [1, 2, 3]}, enabled: true}' % (i, i, i, i, i) for i in range(section_count))
+    return '{\n%s,\n}\n' % sections
+
+
+def _time(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def use_config(config, section_count):
+    # Touches 5% of the sections.
+    for i in range(0, section_count, 20):
+        config['section%d' % i].limits.memory[1]()
+
+
+def main():
+    section_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    json_str = generate_config(section_count)
+    print('%d sections, %.1f MB' % (section_count, len(json_str) / 1e6))
+    print('loads_config():             %.3fs' % _time(
+        lambda: use_config(loads_config(json_str), section_count)))
+    print('loads_config(lazy=True):    %.3fs' % _time(
+        lambda: use_config(loads_config(json_str, lazy=True), section_count)))
+    print('lazy, load only:            %.3fs' % _time(lambda: loads_config(json_str, lazy=True)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Compares loading many small config files one by one with load_config() and in parallel
+with load_config_many().
+Usage: PYTHONPATH=src python benchmarks/load_many_benchmark.py [file_count] [workers]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+from jsoncfg import load, load_config, load_many, load_config_many
+
+
+def write_config_files(dir_path, file_count):
+    paths = []
+    for i in range(file_count):
+        items = ',\n'.join('    // item %d\n    item%d: {port: %d, hosts: ["a%d", "b%d"]}' % (
+            j, j, j, j, j) for j in range(100))
+        path = os.path.join(dir_path, 'config%d.json' % i)
+        with open(path, 'w') as f:
+            f.write('{\n%s,\n}\n' % items)
+        paths.append(path)
+    return paths
+
+
+def _time(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+    dir_path = tempfile.mkdtemp()
+    try:
+        paths = write_config_files(dir_path, file_count)
+        print('%d files, %d workers' % (file_count, workers))
+        print('load() loop:              %.3fs' % _time(lambda: [load(path) for path in paths]))
+        print('load_many():              %.3fs' % _time(lambda: load_many(paths,
+                                                                           workers=workers)))
+        print('load_config() loop:       %.3fs' % _time(lambda: [load_config(path)
+                                                                 for path in paths]))
+        print('load_config_many():       %.3fs' % _time(lambda: load_config_many(
+            paths, workers=workers)))
+    finally:
+        shutil.rmtree(dir_path)
+
+
+if __name__ == '__main__':
+    main()
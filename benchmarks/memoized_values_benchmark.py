@@ -0,0 +1,37 @@
+"""
+Compares the repeated calls of a config subtree without and with the memoize_values option
+of loads_config().
+Usage: PYTHONPATH=src python benchmarks/memoized_values_benchmark.py [route_count] [calls]
+"""
+import sys
+import time
+
+from jsoncfg import loads_config
+
+
+def generate_config(route_count):
+    routes = ',\n'.join('    "/path%d": {backend: "host%d", timeout: 1.5, methods: ["GET"]}'
+                        % (i, i % 10) for i in range(route_count))
+    return '{\n  routing: {\n%s\n  },\n}\n' % routes
+
+
+def _time(func, calls):
+    start = time.time()
+    for _ in range(calls):
+        func()
+    return time.time() - start
+
+
+def main():
+    route_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    json_str = generate_config(route_count)
+    config = loads_config(json_str)
+    memoized_config = loads_config(json_str, memoize_values=True)
+    print('%d routes, %d calls' % (route_count, calls))
+    print('config.routing():                 %.3fs' % _time(config.routing, calls))
+    print('config.routing() memoize_values:  %.3fs' % _time(memoized_config.routing, calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Measures the lookup of missing config values with default values, for example
+config.a.b.c.d(default) where config.a doesn't exist, with different path lengths.
+Usage: PYTHONPATH=src python benchmarks/missing_value_benchmark.py [iterations]
+"""
+import sys
+import time
+
+from jsoncfg import loads_config
+
+
+def _time(func, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        func()
+    return time.time() - start
+
+
+def _lookup(config, depth):
+    node = config
+    for _ in range(depth):
+        node = node.missing
+    return node(0)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    config = loads_config('{a: {b: 0}}')
+    print('%d iterations' % iterations)
+    print('config.x.y.z.w(0):  %.3fs' % _time(lambda: config.x.y.z.w(0), iterations))
+    for depth in (1, 10, 100):
+        print('depth %3d:          %.3fs' % (depth, _time(lambda: _lookup(config, depth),
+                                                          iterations // depth)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Measures the conversion of the unquoted scalars of the parser into python objects with the
+number converters and the optional scalar cache of the DefaultStringToScalarConverter.
+Usage: PYTHONPATH=src python benchmarks/number_conversion_benchmark.py [token_count]
+"""
+import sys
+import random
+import timeit
+
+from jsoncfg import (
+    DefaultStringToScalarConverter, default_number_converter, decimal_number_converter,
+)
+
+
+def generate_tokens(token_count, distinct_count):
+    rnd = random.Random(0)
+    values = [str(rnd.randint(-1000, 1000)) for _ in range(distinct_count // 2)] +\
+        ['%.3f' % rnd.uniform(-100, 100) for _ in range(distinct_count // 2)] +\
+        ['true', 'false', 'null']
+    return [rnd.choice(values) for _ in range(token_count)]
+
+
+def _convert_all(converter, tokens):
+    for token in tokens:
+        converter(None, token, False)
+
+
+def main():
+    token_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for distinct_count in (100, 1000000):
+        tokens = generate_tokens(token_count, distinct_count)
+        print('%d tokens, %d distinct' % (token_count, len(set(tokens))))
+        for label, converter in (
+                ('default', DefaultStringToScalarConverter()),
+                ('default, cache_size=1024', DefaultStringToScalarConverter(cache_size=1024)),
+                ('decimal', DefaultStringToScalarConverter(
+                    number_converter=decimal_number_converter)),
+                ('decimal, cache_size=1024', DefaultStringToScalarConverter(
+                    number_converter=decimal_number_converter, cache_size=1024))):
+            print('  %-26s %.3fs' % (label, min(timeit.repeat(
+                lambda: _convert_all(converter, tokens), number=1, repeat=3))))
+    for number_str in ('12345', '-1.5e3'):
+        print('default_number_converter(%r): %.3fus' % (number_str, min(timeit.repeat(
+            lambda: default_number_converter(number_str), number=100000, repeat=3)) * 10))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Compares parsing a large json text with a root array in one piece with loads() and in
+parallel with loads_parallel(). Also measures the structural pre-scan that splits the array.
+Usage: PYTHONPATH=src python benchmarks/parallel_array_benchmark.py [record_count] [workers]
+"""
+import sys
+import time
+import multiprocessing
+
+from jsoncfg import loads, loads_config, loads_parallel, loads_config_parallel, JSONParserParams
+from jsoncfg.parallel import _find_item_separators
+
+
+def generate_records(record_count):
+    records = ',\n'.join(
+        '  // record %d\n  {id: %d, "user": "user%d", tags: ["a", "b,]"], geo: {lat: 1.5, lon: 2}}'
+        % (i, i, i) for i in range(record_count))
+    return '[\n%s\n]\n' % records
+
+
+def _time(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+    json_str = generate_records(record_count)
+    params = JSONParserParams(root_is_array=True)
+    print('%d records, %.1f MB, %d workers' % (record_count, len(json_str) / 1e6, workers))
+    print('pre-scan:                 %.3fs' % _time(
+        lambda: _find_item_separators(json_str, len(json_str) // (workers * 4))))
+    print('loads():                  %.3fs' % _time(lambda: loads(json_str, params)))
+    print('loads_parallel():         %.3fs' % _time(
+        lambda: loads_parallel(json_str, params, workers=workers)))
+    print('loads_config():           %.3fs' % _time(lambda: loads_config(json_str, params)))
+    print('loads_config_parallel():  %.3fs' % _time(
+        lambda: loads_config_parallel(json_str, params, workers=workers)))
+
+
+if __name__ == '__main__':
+    main()
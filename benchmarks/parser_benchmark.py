@@ -0,0 +1,55 @@
+"""
+Measures the parsing speed of the parser engines on generated json documents.
+Usage: PYTHONPATH=src python benchmarks/parser_benchmark.py [repeat]
+"""
+import sys
+import json
+import random
+import timeit
+
+from jsoncfg import loads, loads_config, JSONParserParams
+
+
+def _random_tree(rnd, depth):
+    if depth >= 5:
+        return rnd.choice([1, 2.5, 'string', None, True, False])
+    if rnd.random() < 0.5:
+        return dict(('key%d' % i, _random_tree(rnd, depth + 1)) for i in range(5))
+    return [_random_tree(rnd, depth + 1) for _ in range(5)]
+
+
+def generate_documents():
+    rnd = random.Random(0)
+    nested = json.dumps({'items': [_random_tree(rnd, 0) for _ in range(10)]}, indent=4)
+    flat = json.dumps(dict(('key%d' % i, i) for i in range(50000)), indent=4)
+    strings = json.dumps(dict(
+        ('key%d' % i, 'line\n\t"quoted" \u00e9 ' * rnd.randint(1, 20)) for i in range(5000)
+    ), indent=4)
+    deep = '{"a": ' + '[' * 5000 + ']' * 5000 + '}'
+    return [('nested', nested), ('flat', flat), ('strings', strings), ('deep', deep)]
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    parser_params = [
+        ('char', JSONParserParams(engine='char', stdlib_fast_path=False)),
+        ('regex', JSONParserParams(engine='regex', lazy_location=False, stdlib_fast_path=False)),
+        ('regex+lazy', JSONParserParams(engine='regex', stdlib_fast_path=False)),
+    ]
+    print('%-10s %-12s %10s %14s %10s' % ('document', 'engine', 'size', 'loads', 'config'))
+    for doc_name, doc in generate_documents():
+        for params_name, params in parser_params:
+            results = []
+            for func in (loads, loads_config):
+                try:
+                    results.append('%.3fs' % min(timeit.repeat(
+                        lambda: func(doc, params), number=1, repeat=repeat)))
+                except RuntimeError as e:
+                    # RecursionError is a RuntimeError subclass
+                    results.append(type(e).__name__)
+            print('%-10s %-12s %10d %14s %10s' % ((doc_name, params_name, len(doc)) +
+                                                  tuple(results)))
+
+
+if __name__ == '__main__':
+    main()
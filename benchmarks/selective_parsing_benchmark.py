@@ -0,0 +1,37 @@
+"""
+Compares parsing a large json text fully and with the select parameter that selects a few
+values and skips the rest of the text without parser events.
+Usage: PYTHONPATH=src python benchmarks/selective_parsing_benchmark.py [record_count]
+"""
+import sys
+import time
+
+from jsoncfg import loads, loads_config, JSONParserParams
+
+
+def generate_config(record_count):
+    records = ',\n'.join(
+        '    // record %d\n    {id: %d, "user": "user%d", tags: ["a", "b,]"], geo: {lat: 1.5}}'
+        % (i, i, i) for i in range(record_count))
+    return '{\n  log: {level: "info"},\n  records: [\n%s\n  ],\n  version: 3,\n}\n' % records
+
+
+def _time(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    json_str = generate_config(record_count)
+    print('%d records, %.1f MB' % (record_count, len(json_str) / 1e6))
+    for select in (None, ['log.level', 'version'], ['records[*].id']):
+        params = JSONParserParams(select=select)
+        print('select=%r' % (select,))
+        print('  loads():         %.3fs' % _time(lambda: loads(json_str, params)))
+        print('  loads_config():  %.3fs' % _time(lambda: loads_config(json_str, params)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Measures the per-document cost of parsing lots of small json documents with and without
+reusing the parsers and listeners of the default parser pool.
+Usage: PYTHONPATH=src python benchmarks/small_documents_benchmark.py [number]
+"""
+import sys
+import timeit
+
+from jsoncfg import JSONParserParams, PythonObjectBuilderParams
+from jsoncfg.functions import _parse_with_pooled_parser
+from jsoncfg.parser import JSONParser
+from jsoncfg.parser_listener import ObjectBuilderParserListener
+
+
+DOCUMENTS = [
+    ('tiny', '{a: 1}'),
+    ('small', '{tenant: "t1", /* override */ limits: {rps: 100, burst: 20}, flags: ["a", "b"],}'),
+    ('medium', '{%s}' % ', '.join('key%d: [%d, "value%d", true]' % (i, i, i) for i in range(20))),
+]
+
+
+def _parse_without_pool(s, parser_params, object_builder_params):
+    parser = JSONParser(parser_params)
+    listener = ObjectBuilderParserListener(object_builder_params)
+    parser.parse(s, listener)
+    return listener.result
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    parser_params = [
+        ('char', JSONParserParams(engine='char', stdlib_fast_path=False)),
+        ('regex+lazy', JSONParserParams(engine='regex', stdlib_fast_path=False)),
+    ]
+    object_builder_params = PythonObjectBuilderParams()
+    print('%-10s %-12s %12s %12s' % ('document', 'engine', 'no pool', 'pool'))
+    for doc_name, doc in DOCUMENTS:
+        for params_name, params in parser_params:
+            results = []
+            for func in (_parse_without_pool, _parse_with_pooled_parser):
+                seconds = min(timeit.repeat(lambda: func(doc, params, object_builder_params),
+                                            number=number, repeat=5))
+                results.append('%.2fus' % (seconds / number * 1e6))
+            print('%-10s %-12s %12s %12s' % ((doc_name, params_name) + tuple(results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Compares building python trees from object heavy json with the PythonTreeBuilderParserListener
+(the default) and with the generic ObjectBuilderParserListener. Besides loads() the listeners
+are also measured without the parser by replaying the recorded parser events.
+Usage: PYTHONPATH=src python benchmarks/tree_builder_benchmark.py [record_count]
+"""
+import sys
+import time
+
+from jsoncfg import loads, JSONParserParams, PythonObjectBuilderParams, DefaultObjectCreator
+from jsoncfg.parser import JSONParser, ParserListener
+
+
+def generate_records(record_count):
+    # Non-strict json (unquoted keys) so the stdlib fast path isn't used.
+    records = ',\n'.join(
+        '  {id: %d, user: {name: "user%d", tags: ["a", "b"]}, geo: {lat: 1.5, lon: 2}, '
+        'flags: {x: true, y: false, z: null}}' % (i, i) for i in range(record_count))
+    return '[\n%s\n]\n' % records
+
+
+class EventRecorder(ParserListener):
+    def __init__(self):
+        super(EventRecorder, self).__init__()
+        self.events = []
+
+    def begin_object(self):
+        self.events.append(('begin_object', ()))
+
+    def end_object(self):
+        self.events.append(('end_object', ()))
+
+    def begin_object_item(self, key, key_quoted):
+        self.events.append(('begin_object_item', (key, key_quoted)))
+
+    def begin_array(self):
+        self.events.append(('begin_array', ()))
+
+    def end_array(self):
+        self.events.append(('end_array', ()))
+
+    def scalar(self, scalar_str, scalar_str_quoted):
+        self.events.append(('scalar', (scalar_str, scalar_str_quoted)))
+
+
+def replay_events(parser, events, params):
+    listener = params.listener_class(params)
+    listener.begin_parsing(parser)
+    for name, args in events:
+        getattr(listener, name)(*args)
+    return listener.result
+
+
+def _time(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    json_str = generate_records(record_count)
+    parser_params = JSONParserParams(root_is_array=True)
+    print('%d records, %.1f MB' % (record_count, len(json_str) / 1e6))
+    parser = JSONParser(parser_params)
+    recorder = EventRecorder()
+    parser.parse(json_str, recorder)
+    for dict_class in (dict, None):
+        object_creator = None if dict_class is None else DefaultObjectCreator(dict_class)
+        label = 'OrderedDict' if dict_class is None else dict_class.__name__
+        for fast_tree_builder in (False, True):
+            params = PythonObjectBuilderParams(object_creator=object_creator,
+                                               fast_tree_builder=fast_tree_builder)
+            print('%-12s fast_tree_builder=%-5s loads(): %.3fs  events only: %.3fs' % (
+                label, fast_tree_builder, _time(lambda: loads(json_str, parser_params, params)),
+                _time(lambda: replay_events(parser, recorder.events, params))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures the memory usage of python and config trees that are built from json with lots of
+repeated values with and without the dedup_values option of the object builders.
+Usage: PYTHONPATH=src python benchmarks/value_dedup_benchmark.py [record_count]
+"""
+import sys
+import time
+import tracemalloc
+
+from jsoncfg import loads_config, JSONParserParams, PythonObjectBuilderParams
+from jsoncfg.parser import JSONParser
+
+
+def generate_records(record_count):
+    records = ',\n'.join(
+        '  {id: %d, status: "active", region: "eu-west-%d", tags: ["production", "web"], '
+        'weight: 1.5, limit: 10000}' % (i, i % 3) for i in range(record_count))
+    return '[\n%s\n]\n' % records
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.time()
+    result = func()
+    elapsed = time.time() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, memory
+
+
+def _loads(json_str, dedup_values):
+    params = PythonObjectBuilderParams(dedup_values=dedup_values)
+    listener = params.listener_class(params)
+    JSONParser(JSONParserParams(root_is_array=True)).parse(json_str, listener)
+    return listener.result
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    json_str = generate_records(record_count)
+    params = JSONParserParams(root_is_array=True)
+    print('%d records, %.1f MB' % (record_count, len(json_str) / 1e6))
+    for title, func in (
+            ('loads():', lambda: _loads(json_str, False)),
+            ('loads() dedup_values:', lambda: _loads(json_str, True)),
+            ('loads_config():', lambda: loads_config(json_str, params)),
+            ('loads_config() dedup_values:', lambda: loads_config(json_str, params,
+                                                                  dedup_values=True))):
+        elapsed, memory = _measure(func)
+        print('%-30s %.3fs %7.1f MB' % (title, elapsed, memory / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,14 +7,20 @@ from .config_classes import (
     JSONConfigQueryError, JSONConfigValueMapperError, JSONConfigValueNotFoundError, JSONConfigNodeTypeError,
     JSONValueMapper,
     node_location, node_exists, node_is_object, node_is_array, node_is_scalar,
-    ensure_exists, expect_object, expect_array, expect_scalar,
+    ensure_exists, expect_object, expect_array, expect_scalar, invalidate_memoized_values,
+    compile_query, compile_queries, fetch_many,
 )
 from .functions import (
-    loads, load, loads_config, load_config, JSONParserParams,
+    loads, load, loads_config, load_config, iterparse, JSONParserParams,
+    loads_many, loads_config_many, iter_load, iter_load_config,
+)
+from .parallel import (
+    load_many, load_config_many, loads_parallel, loads_config_parallel, load_parallel,
+    load_config_parallel,
 )
 from .tree_python import (
     PythonObjectBuilderParams, DefaultObjectCreator, DefaultArrayCreator, default_number_converter,
-    DefaultStringToScalarConverter,
+    decimal_number_converter, DefaultStringToScalarConverter,
 )
 
 __all__ = [
@@ -25,10 +31,15 @@ __all__ = [
     'JSONValueMapper',
     'node_location', 'node_exists', 'node_is_object', 'node_is_array', 'node_is_scalar',
     'ensure_exists', 'expect_object', 'expect_array', 'expect_scalar',
-    'loads', 'load', 'loads_config', 'load_config',
+    'invalidate_memoized_values', 'compile_query', 'compile_queries', 'fetch_many',
+    'loads', 'load', 'loads_config', 'load_config', 'iterparse',
+    'loads_many', 'loads_config_many', 'iter_load', 'iter_load_config',
+    'load_many', 'load_config_many',
+    'loads_parallel', 'loads_config_parallel', 'load_parallel', 'load_config_parallel',
     'JSONParserParams',
     'ObjectBuilderParams', 'PythonObjectBuilderParams',
     'DefaultObjectCreator', 'DefaultArrayCreator', 'default_number_converter', 'DefaultStringToScalarConverter',
+    'decimal_number_converter',
 ]
 
 # version_info[0]: Increase in case of large milestones/releases.
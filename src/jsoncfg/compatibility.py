@@ -5,9 +5,17 @@ want to depend on larger compatibility libraries.
 """
 
 import sys
+from collections import OrderedDict
 
 python2 = sys.version_info[0] == 2
 
+# The plain dict keeps the insertion order since python 3.7 and it is much smaller than
+# an OrderedDict.
+my_ordered_dict = dict if sys.version_info >= (3, 7) else OrderedDict
+
+# RecursionError is a subclass of RuntimeError, it has been added in python 3.5.
+my_recursion_error = RecursionError if sys.version_info >= (3, 5) else RuntimeError
+
 
 if python2:
     my_xrange = xrange
@@ -17,6 +25,11 @@ if python2:
 
     def utf8chr(code_point):
         return unichr(code_point).encode('utf-8')
+
+    # Converts an item of a bytes object to a single char str. The items of a str or mmap
+    # are single char strs but the items of a bytearray are ints.
+    def bytes_item_to_str(item):
+        return chr(item) if isinstance(item, int) else item
 else:
     my_xrange = range
     my_unichr = chr
@@ -26,3 +39,5 @@ else:
     # This is here just to satisfy import statements.
     def utf8chr(_):
         raise RuntimeError('This should never be called in case of python3.')
+
+    bytes_item_to_str = chr
@@ -1,8 +1,9 @@
 import numbers
-from collections import OrderedDict, namedtuple
+from collections import namedtuple
 
-from .compatibility import my_basestring
+from .compatibility import my_basestring, my_ordered_dict
 from .exceptions import JSONConfigException
+from .query_path import WILDCARD, parse_query_path
 
 
 _undefined = object()
@@ -136,6 +137,8 @@ def _process_value_fetcher_call_args(args):
 
 
 class ValueNotFoundNode(object):
+    __slots__ = ('_parent_config_node', '_prefix', '_component')
+
     def __init__(self, parent_config_node, missing_query_path):
         """
         If the user issues a config query like config.servers[2].ip_address but there is only
@@ -149,8 +152,27 @@ class ValueNotFoundNode(object):
         :param missing_query_path: The non-existing part (suffix) of the query path issued
         by the user. This is relative to parent_config_node.
         """
+        prefix = None
+        for component in missing_query_path[:-1]:
+            prefix = _value_not_found_node(parent_config_node, prefix, component)
         self._parent_config_node = parent_config_node
-        self._missing_query_path = missing_query_path
+        # The missing query path is a linked list of the nodes from the parent_config_node:
+        # every node refers to the previous one (or None) and it stores only its own path
+        # component. This way a query like config.a.b.c(default) on a missing 'a' doesn't
+        # copy the path at every step and the path is built only for the error message.
+        self._prefix = prefix
+        self._component = missing_query_path[-1] if missing_query_path else _undefined
+
+    @property
+    def _missing_query_path(self):
+        path = []
+        node = self
+        while node is not None:
+            if node._component is not _undefined:
+                path.append(node._component)
+            node = node._prefix
+        path.reverse()
+        return path
 
     def __call__(self, *args):
         """
@@ -161,6 +183,9 @@ class ValueNotFoundNode(object):
         If a default value is provided then we return it otherwise we raise an exception since
         the user tries to fetch a required value that isn't in the config file.
         """
+        if len(args) == 1 and not isinstance(args[0], JSONValueMapper):
+            # The common case of a single default value.
+            return args[0]
         default, _ = _process_value_fetcher_call_args(args)
         if default is _undefined:
             raise JSONConfigValueNotFoundError(self)
@@ -170,7 +195,7 @@ class ValueNotFoundNode(object):
         return self.__getitem__(item)
 
     def __getitem__(self, item):
-        return ValueNotFoundNode(self._parent_config_node, self._missing_query_path + [item])
+        return _value_not_found_node(self._parent_config_node, self, item)
 
     def __len__(self):
         raise JSONConfigValueNotFoundError(self)
@@ -179,6 +204,23 @@ class ValueNotFoundNode(object):
         raise JSONConfigValueNotFoundError(self)
 
 
+def _value_not_found_node(parent_config_node, prefix, component):
+    """ Creates the ValueNotFoundNode of the component after the prefix ValueNotFoundNode
+    (or None) without the overhead of ValueNotFoundNode.__init__(). """
+    node = ValueNotFoundNode.__new__(ValueNotFoundNode)
+    node._parent_config_node = parent_config_node
+    node._prefix = prefix
+    node._component = component
+    return node
+
+
+def _extend_value_not_found_node(value_not_found, components):
+    for component in components:
+        value_not_found = _value_not_found_node(value_not_found._parent_config_node,
+                                                value_not_found, component)
+    return value_not_found
+
+
 class ConfigNode(object):
     """
     Base class for the actual classes whose instances build up the config
@@ -188,16 +230,33 @@ class ConfigNode(object):
     can be accessed using the member operator (dot) and the members of the
     config node class instances should not conflict with the keys in the
     config files.
+    The nodes have __slots__ instead of an instance __dict__ because large config trees
+    consist of lots of nodes. Subclasses have to declare their own __slots__ too.
     """
+    __slots__ = ('_line', '_column', '_deferred_locations')
 
-    def __init__(self, line, column):
+    def __init__(self, line, column, deferred_locations=None):
         """
-        :param line: Zero based line number. (Add 1 for human readable error reporting).
-        :param column: Zero based column number. (Add 1 for human readable error reporting).
+        :param line: 1 based line number.
+        :param column: 1 based column number.
+        :param deferred_locations: A node with a None line has a deferred location: its column
+        holds the key that can be passed to the location() method of deferred_locations to get
+        the zero based (line, column) of the node. For example a LineIndex of the json text
+        resolves the locations of the nodes whose key is their offset in the text.
         """
         super(ConfigNode, self).__init__()
         self._line = line
         self._column = column
+        self._deferred_locations = deferred_locations
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for cls in type(self).__mro__
+                    for name in cls.__dict__.get('__slots__', ()))
+
+    def __setstate__(self, state):
+        # Without this the unpickler would find our __getattr__ while looking for __setstate__.
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def __call__(self, *args):
         """
@@ -222,8 +281,10 @@ class ConfigNode(object):
 
 
 class ConfigJSONScalar(ConfigNode):
-    def __init__(self, value, line, column):
-        super(ConfigJSONScalar, self).__init__(line, column)
+    __slots__ = ('value',)
+
+    def __init__(self, value, line, column, deferred_locations=None):
+        super(ConfigJSONScalar, self).__init__(line, column, deferred_locations)
         self.value = value
 
     def __getattr__(self, item):
@@ -270,17 +331,48 @@ class ConfigJSONScalar(ConfigNode):
         )
 
     def __repr__(self):
-        return '%s(value=%r, line=%r, column=%r)' % (self.__class__.__name__,
-                                                     self.value, self._line, self._column)
+        return '%s(value=%r, line=%r, column=%r)' % ((self.__class__.__name__, self.value) +
+                                                     node_location(self))
 
     def _fetch_unwrapped_value(self):
         return self.value
 
 
+def _read_only(*args, **kwargs):
+    raise TypeError('The memoized values of config nodes are read-only.')
+
+
+class ReadOnlyDict(dict):
+    """ The memoized unwrapped value of a ConfigJSONObject. """
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+class ReadOnlyList(list):
+    """ The memoized unwrapped value of a ConfigJSONArray. """
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = reverse = sort = clear = _read_only
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
 class ConfigJSONObject(ConfigNode):
-    def __init__(self, line, column):
-        super(ConfigJSONObject, self).__init__(line, column)
-        self._dict = OrderedDict()
+    # The _memoized_value is None if memoization is disabled for this node and _undefined
+    # if the value hasn't been memoized yet.
+    __slots__ = ('_dict', '_memoized_value')
+
+    def __init__(self, line, column, deferred_locations=None, memoize_value=False):
+        """
+        :param memoize_value: True: the unwrapped value of the node is built only by the first
+        call of the node and the next calls return the same ReadOnlyDict instance.
+        """
+        super(ConfigJSONObject, self).__init__(line, column, deferred_locations)
+        self._dict = my_ordered_dict()
+        self._memoized_value = _undefined if memoize_value else None
 
     def __getattr__(self, item):
         return self.__getitem__(item)
@@ -296,7 +388,7 @@ class ConfigJSONObject(ConfigNode):
             raise TypeError('You are allowed to index only with string or integer.')
         if item in self._dict:
             return self._dict[item]
-        return ValueNotFoundNode(self, [item])
+        return _value_not_found_node(self, None, item)
 
     def __contains__(self, item):
         return item in self._dict
@@ -308,20 +400,29 @@ class ConfigJSONObject(ConfigNode):
         return iter(self._dict.items())
 
     def __repr__(self):
-        return '%s(len=%r, line=%r, column=%r)' % (self.__class__.__name__,
-                                                   len(self), self._line, self._column)
+        return '%s(len=%r, line=%r, column=%r)' % ((self.__class__.__name__, len(self)) +
+                                                   node_location(self))
 
     def _fetch_unwrapped_value(self):
-        return dict((key, node._fetch_unwrapped_value()) for key, node in self._dict.items())
+        if self._memoized_value is None:
+            return dict((key, node._fetch_unwrapped_value()) for key, node in self._dict.items())
+        if self._memoized_value is _undefined:
+            self._memoized_value = ReadOnlyDict(
+                (key, node._fetch_unwrapped_value()) for key, node in self._dict.items())
+        return self._memoized_value
 
     def _insert(self, key, value):
         self._dict[key] = value
 
 
 class ConfigJSONArray(ConfigNode):
-    def __init__(self, line, column):
-        super(ConfigJSONArray, self).__init__(line, column)
+    __slots__ = ('_list', '_memoized_value')
+
+    def __init__(self, line, column, deferred_locations=None, memoize_value=False):
+        """ :param memoize_value: The same as in case of ConfigJSONObject. """
+        super(ConfigJSONArray, self).__init__(line, column, deferred_locations)
         self._list = []
+        self._memoized_value = _undefined if memoize_value else None
 
     def __getattr__(self, item):
         raise JSONConfigNodeTypeError(
@@ -359,16 +460,92 @@ class ConfigJSONArray(ConfigNode):
         return iter(self._list)
 
     def __repr__(self):
-        return '%s(len=%r, line=%r, column=%r)' % (self.__class__.__name__,
-                                                   len(self), self._line, self._column)
+        return '%s(len=%r, line=%r, column=%r)' % ((self.__class__.__name__, len(self)) +
+                                                   node_location(self))
 
     def _fetch_unwrapped_value(self):
-        return [node._fetch_unwrapped_value() for node in self._list]
+        if self._memoized_value is None:
+            return [node._fetch_unwrapped_value() for node in self._list]
+        if self._memoized_value is _undefined:
+            self._memoized_value = ReadOnlyList(
+                node._fetch_unwrapped_value() for node in self._list)
+        return self._memoized_value
 
     def _append(self, item):
         self._list.append(item)
 
 
+class _UnparsedValue(object):
+    """ Stands in for an item of a lazy config container until the item is parsed. """
+    __slots__ = ('pos',)
+
+    def __init__(self, pos):
+        """ :param pos: The offset of the item value in the json text. """
+        self.pos = pos
+
+
+class LazyConfigJSONObject(ConfigJSONObject):
+    """
+    A ConfigJSONObject whose item values are parsed from the json text only when they are
+    accessed for the first time. The lazy_source has a parse_value(pos) method that returns
+    the config node of the json value at the given offset of the json text.
+    """
+    __slots__ = ('_lazy_source',)
+
+    def __init__(self, line, column, lazy_source, memoize_value=False):
+        super(LazyConfigJSONObject, self).__init__(line, column, memoize_value=memoize_value)
+        self._lazy_source = lazy_source
+
+    def __getitem__(self, item):
+        node = super(LazyConfigJSONObject, self).__getitem__(item)
+        if type(node) is _UnparsedValue:
+            node = self._dict[item] = self._lazy_source.parse_value(node.pos)
+        return node
+
+    def __iter__(self):
+        self._parse_items()
+        return super(LazyConfigJSONObject, self).__iter__()
+
+    def _fetch_unwrapped_value(self):
+        self._parse_items()
+        return super(LazyConfigJSONObject, self)._fetch_unwrapped_value()
+
+    def _parse_items(self):
+        for key, node in list(self._dict.items()):
+            if type(node) is _UnparsedValue:
+                self._dict[key] = self._lazy_source.parse_value(node.pos)
+
+
+class LazyConfigJSONArray(ConfigJSONArray):
+    """ The array counterpart of LazyConfigJSONObject. """
+    __slots__ = ('_lazy_source',)
+
+    def __init__(self, line, column, lazy_source, memoize_value=False):
+        super(LazyConfigJSONArray, self).__init__(line, column, memoize_value=memoize_value)
+        self._lazy_source = lazy_source
+
+    def __getitem__(self, item):
+        node = super(LazyConfigJSONArray, self).__getitem__(item)
+        if type(node) is _UnparsedValue:
+            if item < 0:
+                item += len(self._list)
+            node = self._list[item] = self._lazy_source.parse_value(node.pos)
+        return node
+
+    def __iter__(self):
+        self._parse_items()
+        return super(LazyConfigJSONArray, self).__iter__()
+
+    def _fetch_unwrapped_value(self):
+        self._parse_items()
+        return super(LazyConfigJSONArray, self)._fetch_unwrapped_value()
+
+    def _parse_items(self):
+        for index, node in enumerate(self._list):
+            if type(node) is _UnparsedValue:
+                self._list[index] = self._lazy_source.parse_value(node.pos)
+
+
 _NodeLocation = namedtuple('NodeLocation', 'line column')
 
 
@@ -376,6 +553,9 @@ def node_location(config_node):
     """ Returns the location of this node in the file as a tuple (line, column).
     Both line and column are 1 based. """
     if isinstance(config_node, ConfigNode):
+        if config_node._line is None:
+            line, column = config_node._deferred_locations.location(config_node._column)
+            config_node._line, config_node._column = line + 1, column + 1
         return _NodeLocation(config_node._line, config_node._column)
     if isinstance(config_node, ValueNotFoundNode):
         raise JSONConfigValueNotFoundError(config_node)
@@ -383,6 +563,29 @@ def node_location(config_node):
                     type(config_node).__name__)
 
 
+def invalidate_memoized_values(config_node):
+    """
+    Drops the memoized unwrapped values of the config_node and its descendants (see the
+    memoize_values parameter of loads_config()). The next calls of the nodes build their
+    values again. The memoized value of a container contains the memoized values of its
+    items so the invalidation of a node has to be followed by the invalidation of its
+    ancestors (or simply the root) if they have been called. The config trees aren't modified
+    by this library after loading so this is needed only to free the memory of the memoized
+    values or after modifying the tree.
+    """
+    nodes = [config_node]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, ConfigJSONObject):
+            nodes.extend(node._dict.values())
+        elif isinstance(node, ConfigJSONArray):
+            nodes.extend(node._list)
+        else:
+            continue
+        if node._memoized_value is not None:
+            node._memoized_value = _undefined
+
+
 def node_exists(config_node):
     """ Returns True if the specified config node
     refers to an existing config entry. """
@@ -432,3 +635,128 @@ def expect_array(config_node):
 
 def expect_scalar(config_node):
     return _guarantee_node_class(config_node, ConfigJSONScalar)
+
+
+def _get_item(config_node, component):
+    """
+    Returns config_node[component] with fast paths for the items of the non-lazy objects
+    and arrays. The component is a string key or an int index of a parsed query path.
+    """
+    node_type = type(config_node)
+    if node_type is ConfigJSONObject and type(component) is not int:
+        node = config_node._dict.get(component)
+        if node is not None:
+            return node
+        return _value_not_found_node(config_node, None, component)
+    if node_type is ConfigJSONArray and type(component) is int and\
+            component < len(config_node._list):
+        return config_node._list[component]
+    return config_node[component]
+
+
+class CompiledQuery(object):
+    """
+    A query path that has been parsed by compile_query(). Calling it with a config node
+    returns the same node (or ValueNotFoundNode) as the member and index operators of the
+    query path, for example compile_query('servers[3].address')(config) is the same as
+    config.servers[3].address.
+    """
+    def __init__(self, path):
+        components = parse_query_path(path)
+        if WILDCARD in components:
+            raise ValueError('Wildcards aren\'t supported by compiled queries: %r' % (path,))
+        self.path = path
+        self.components = components
+
+    def __call__(self, config_node):
+        node = config_node
+        for index, component in enumerate(self.components):
+            node = _get_item(node, component)
+            if type(node) is ValueNotFoundNode:
+                return _extend_value_not_found_node(node, self.components[index+1:])
+        return node
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+
+def compile_query(path):
+    """
+    Parses a query path like 'servers[3].address' (the format of the relative_path of
+    JSONConfigValueNotFoundError without wildcards) into a CompiledQuery that can be used
+    many times.
+    """
+    return CompiledQuery(path)
+
+
+class CompiledQueries(object):
+    """
+    A set of named queries compiled by compile_queries() into a trie of their components.
+    Calling it with a config node returns the dict of fetch_many().
+    """
+    def __init__(self, queries):
+        self.queries = dict((name, query if isinstance(query, CompiledQuery) else
+                             CompiledQuery(query)) for name, query in queries.items())
+        # The names of the queries that refer to the config node itself.
+        self._root_names = []
+        # The trie maps the components of the paths to the (subtrie, names) of the components.
+        self._trie = {}
+        for name, query in self.queries.items():
+            if not query.components:
+                self._root_names.append(name)
+                continue
+            subtrie = self._trie
+            for component in query.components[:-1]:
+                subtrie = subtrie.setdefault(component, ({}, []))[0]
+            subtrie.setdefault(query.components[-1], ({}, []))[1].append(name)
+
+    def __call__(self, config_node):
+        result = dict.fromkeys(self._root_names, config_node)
+        stack = [(config_node, self._trie, 0)]
+        while stack:
+            node, trie, depth = stack.pop()
+            for component, (subtrie, names) in trie.items():
+                child = _get_item(node, component)
+                if type(child) is ValueNotFoundNode:
+                    for name in _trie_names(subtrie, names):
+                        result[name] = _extend_value_not_found_node(
+                            child, self.queries[name].components[depth+1:])
+                    continue
+                for name in names:
+                    result[name] = child
+                if subtrie:
+                    stack.append((child, subtrie, depth + 1))
+        return result
+
+
+def compile_queries(queries):
+    """
+    Compiles a dict that maps names to query paths or CompiledQuery instances for fetch_many().
+    Compiling the queries once is cheaper if the same queries are resolved many times.
+    """
+    return CompiledQueries(queries)
+
+
+def fetch_many(config_node, queries):
+    """
+    Resolves many queries relative to config_node in a single traversal: the queries with
+    a common prefix share the lookup of the prefix.
+    :param queries: A dict that maps names to query paths or CompiledQuery instances, or the
+    CompiledQueries returned by compile_queries().
+    :return: A dict that maps the names of the queries to the resulting config nodes (or
+    ValueNotFoundNode instances just like in case of CompiledQuery).
+    """
+    if not isinstance(queries, CompiledQueries):
+        queries = CompiledQueries(queries)
+    return queries(config_node)
+
+
+def _trie_names(trie, names):
+    """ Returns the names of the given trie node and its descendants. """
+    result = list(names)
+    tries = [trie]
+    while tries:
+        for subtrie, subtrie_names in tries.pop().values():
+            result.extend(subtrie_names)
+            tries.append(subtrie)
+    return result
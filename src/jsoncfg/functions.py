@@ -1,11 +1,21 @@
 """
 Contains the load functions that we use as the public interface of this whole library.
 """
-from .parser import JSONParserParams, JSONParser
-from .parser_listener import ObjectBuilderParserListener
+import copy
+import itertools
+from contextlib import contextmanager
+
+from .compatibility import my_basestring, my_xrange
+from .parser import JSONParserParams, IncrementalJSONParser, JSONConfigParserException
+from .parser_listener import DocumentCollectorParserListener, EventCollectorParserListener
 from .tree_python import PythonObjectBuilderParams, DefaultStringToScalarConverter
-from .tree_config import ConfigObjectBuilderParams
-from .text_encoding import load_utf_text_file
+from .tree_config import ConfigObjectBuilderParams, lazy_config_tree
+from .text_encoding import (
+    load_utf_text_file, load_utf_text_file_chunks, open_utf_text_file, decode_utf_text_chunks,
+    read_file_chunks,
+)
+from .parser_pool import default_parser_pool
+from . import strict_json
 
 
 def loads(s,
@@ -15,21 +25,28 @@ def loads(s,
     Loads a json string as a python object hierarchy just like the standard json.loads(). Unlike
     the standard json.loads() this function uses OrderedDict instances to represent json objects
     but the class of the dictionary to be used is configurable.
-    :param s: The json string to load.
-    :params parser_params: Parser parameters.
+    :param s: The json string to load. In case of python3 this can also be UTF-8 encoded
+    binary text (bytes, bytearray, mmap) with an optional BOM prefix. Binary text is parsed
+    with the Utf8JSONParser that decodes only the strings of the json.
+    :params parser_params: Parser parameters. The multiple_documents parameter isn't supported,
+    the texts with multiple root values can be loaded with loads_many() or iter_load().
     :type parser_params: JSONParserParams
     :param object_builder_params: Parameters to the ObjectBuilderParserListener, these parameters
     are mostly factories to create the python object hierarchy while parsing.
     """
-    parser = JSONParser(parser_params)
-    listener = ObjectBuilderParserListener(object_builder_params)
-    parser.parse(s, listener)
-    return listener.result
+    _check_single_document(parser_params)
+    result = strict_json.loads_python_tree(s, parser_params, object_builder_params)
+    if result is not None:
+        return result
+    return _parse_with_pooled_parser(s, parser_params, object_builder_params)
 
 
 def loads_config(s,
                  parser_params=JSONParserParams(),
-                 string_to_scalar_converter=DefaultStringToScalarConverter()):
+                 string_to_scalar_converter=DefaultStringToScalarConverter(),
+                 lazy=False,
+                 dedup_values=False,
+                 memoize_values=False):
     """
     Works similar to the loads() function but this one returns a json object hierarchy
     that wraps all json objects, arrays and scalars to provide a nice config query syntax.
@@ -49,12 +66,34 @@ def loads_config(s,
 
     If you specify a default value and the required config value is not present then
     default is returned. In this case mapper isn't called with the default value.
+
+    :param lazy: True: only the structure of the root object/array is parsed by this call, the
+    values of its items are parsed when they are accessed for the first time. Loading a large
+    config costs much less this way if only a small part of it is used. The syntax errors
+    in the values of the root items are raised only when the values are accessed. The tree
+    keeps a reference to the json text (a memory map or other buffer is copied to bytes).
+    :param dedup_values: True: the scalar nodes with equal values share their value objects.
+    See ObjectBuilderParams.
+    :param memoize_values: True: calling an object or array node builds its unwrapped value
+    only the first time, the next calls return the same value in O(1). The memoized values
+    are ReadOnlyDict and ReadOnlyList instances (subclasses of dict and list that raise
+    TypeError on modification) so they can be handed out repeatedly. The memoized values can
+    be dropped with invalidate_memoized_values().
     """
-    parser = JSONParser(parser_params)
-    object_builder_params = ConfigObjectBuilderParams(string_to_scalar_converter=string_to_scalar_converter)
-    listener = ObjectBuilderParserListener(object_builder_params)
-    parser.parse(s, listener)
-    return listener.result
+    _check_single_document(parser_params)
+    object_builder_params = ConfigObjectBuilderParams(
+        string_to_scalar_converter=string_to_scalar_converter, dedup_values=dedup_values,
+        memoize_values=memoize_values)
+    if lazy:
+        if not isinstance(s, (my_basestring, bytes)):
+            s = s[:]
+        return lazy_config_tree(s, parser_params, object_builder_params)
+    if not dedup_values:
+        result = strict_json.loads_config_tree(s, parser_params, string_to_scalar_converter,
+                                               memoize_values)
+        if result is not None:
+            return result
+    return _parse_with_pooled_parser(s, parser_params, object_builder_params)
 
 
 def load(file_, *args, **kwargs):
@@ -68,13 +107,20 @@ def load(file_, *args, **kwargs):
     :param use_utf8_strings: Ignored in case of python3, in case of python2 the default
     value of this is True. True means that the loaded json string should be handled as a utf-8
     encoded str instead of a unicode object.
+    :param stream: Defaults to False. True means that the file is read, decoded and parsed in
+    chunks instead of loading the whole file into memory before parsing. This reduces the peak
+    memory usage to the size of the loaded tree plus one chunk.
+    :param chunk_size: The number of bytes to read at once in stream mode.
+    :param use_mmap: Defaults to False. True means that the file is mapped into memory and
+    parsed from the mapped pages instead of reading the file contents into a bytes object.
+    :param parse_utf8_bytes: Defaults to False. True means that UTF-8 files aren't decoded
+    before parsing, they are parsed with the Utf8JSONParser that decodes only the strings of
+    the json. Ignored in stream mode.
     """
-    json_str = load_utf_text_file(
-        file_,
-        default_encoding=kwargs.pop('default_encoding', 'UTF-8'),
-        use_utf8_strings=kwargs.pop('use_utf8_strings', True),
-    )
-    return loads(json_str, *args, **kwargs)
+    with _open_json_file(file_, kwargs) as (stream, json_str):
+        if stream:
+            return _loads_chunks(json_str, *args, **kwargs)
+        return loads(json_str, *args, **kwargs)
 
 
 def load_config(file_, *args, **kwargs):
@@ -88,10 +134,255 @@ def load_config(file_, *args, **kwargs):
     :param use_utf8_strings: Ignored in case of python3, in case of python2 the default
     value of this is True. True means that the loaded json string should be handled as a utf-8
     encoded str instead of a unicode object.
+    :param stream: Defaults to False. True means that the file is read, decoded and parsed in
+    chunks instead of loading the whole file into memory before parsing. This reduces the peak
+    memory usage to the size of the loaded tree plus one chunk.
+    :param chunk_size: The number of bytes to read at once in stream mode.
+    :param use_mmap: Defaults to False. True means that the file is mapped into memory and
+    parsed from the mapped pages instead of reading the file contents into a bytes object.
+    :param parse_utf8_bytes: Defaults to False. True means that UTF-8 files aren't decoded
+    before parsing, they are parsed with the Utf8JSONParser that decodes only the strings of
+    the json. Ignored in stream mode.
+    :param lazy: The same as in case of loads_config(). Ignored in stream mode.
     """
-    json_str = load_utf_text_file(
-        file_,
-        default_encoding=kwargs.pop('default_encoding', 'UTF-8'),
-        use_utf8_strings=kwargs.pop('use_utf8_strings', True),
-    )
-    return loads_config(json_str, *args, **kwargs)
+    with _open_json_file(file_, kwargs) as (stream, json_str):
+        if stream:
+            return _loads_config_chunks(json_str, *args, **kwargs)
+        return loads_config(json_str, *args, **kwargs)
+
+
+def _check_single_document(parser_params):
+    if parser_params.multiple_documents:
+        raise ValueError('The multiple_documents parser parameter isn\'t supported by the '
+                         'single document loaders. Use loads_many() or iter_load() instead.')
+
+
+def _parse_with_pooled_parser(s, parser_params, object_builder_params):
+    parser, listener = default_parser_pool.acquire(s, parser_params, object_builder_params)
+    try:
+        parser.parse(s, listener)
+        return listener.result
+    finally:
+        default_parser_pool.release(parser, listener)
+
+
+@contextmanager
+def _open_json_file(file_, kwargs):
+    """
+    Pops the file loading parameters of load() and load_config() from kwargs and loads the file.
+    Yields (stream, json_str) where json_str is an iterable of text chunks if stream is True.
+    """
+    default_encoding = kwargs.pop('default_encoding', 'UTF-8')
+    use_utf8_strings = kwargs.pop('use_utf8_strings', True)
+    use_mmap = kwargs.pop('use_mmap', False)
+    parse_utf8_bytes = kwargs.pop('parse_utf8_bytes', False)
+    chunk_size = kwargs.pop('chunk_size', 64*1024)
+    if kwargs.pop('stream', False):
+        yield True, load_utf_text_file_chunks(file_, default_encoding, use_utf8_strings,
+                                              chunk_size, use_mmap)
+    elif use_mmap or parse_utf8_bytes:
+        with open_utf_text_file(file_, default_encoding, use_utf8_strings, use_mmap,
+                                parse_utf8_bytes) as json_str:
+            yield False, json_str
+    else:
+        yield False, load_utf_text_file(
+            file_,
+            default_encoding=default_encoding,
+            use_utf8_strings=use_utf8_strings,
+        )
+
+
+def _parse_chunks(chunks, parser_params, object_builder_params):
+    _check_single_document(parser_params)
+    listener = object_builder_params.listener_class(object_builder_params)
+    parser = IncrementalJSONParser(listener, parser_params)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return listener.result
+
+
+def _loads_chunks(chunks,
+                  parser_params=JSONParserParams(),
+                  object_builder_params=PythonObjectBuilderParams()):
+    """ The stream mode of load(): same parameters as loads() but it parses text chunks. """
+    return _parse_chunks(chunks, parser_params, object_builder_params)
+
+
+def _loads_config_chunks(chunks,
+                         parser_params=JSONParserParams(),
+                         string_to_scalar_converter=DefaultStringToScalarConverter(),
+                         lazy=False,
+                         dedup_values=False,
+                         memoize_values=False):
+    """ The stream mode of load_config(): same parameters as loads_config() but the lazy
+    parameter is ignored. """
+    object_builder_params = ConfigObjectBuilderParams(
+        string_to_scalar_converter=string_to_scalar_converter, dedup_values=dedup_values,
+        memoize_values=memoize_values)
+    return _parse_chunks(chunks, parser_params, object_builder_params)
+
+
+def loads_many(s,
+               parser_params=JSONParserParams(),
+               object_builder_params=PythonObjectBuilderParams(),
+               chunk_size=64*1024):
+    """
+    A generator that loads a json text that contains any number of root json values (e.g.:
+    JSON Lines or concatenated json documents) and yields the python object hierarchies of the
+    root values one by one. The text is parsed in chunks with a single parser so a document is
+    yielded as soon as the chunk that contains its end has been parsed. The line/column numbers
+    of the parse errors are relative to the whole text and the documents that precede the
+    error are yielded before the error is raised. For example:
+    for record in loads_many(jsonl_text):
+        ...
+    :param s: The json text. In case of python3 this can also be binary text with an
+    optional BOM prefix.
+    :param parser_params: Parser parameters. The multiple_documents parameter is ignored,
+    this function always parses in multiple_documents mode.
+    :param object_builder_params: The same as in case of loads().
+    :param chunk_size: The size of the chunks the text is parsed in.
+    """
+    return _iter_documents(_source_chunks(s, chunk_size), parser_params, object_builder_params)
+
+
+def loads_config_many(s,
+                      parser_params=JSONParserParams(),
+                      string_to_scalar_converter=DefaultStringToScalarConverter(),
+                      chunk_size=64*1024):
+    """
+    Works like loads_many() but it yields config trees just like the ones of loads_config().
+    """
+    object_builder_params = ConfigObjectBuilderParams(
+        string_to_scalar_converter=string_to_scalar_converter)
+    return _iter_documents(_source_chunks(s, chunk_size), parser_params, object_builder_params)
+
+
+def iter_load(file_, *args, **kwargs):
+    """
+    Does exactly the same as loads_many() but instead of a json text this generator receives
+    the path to a file or a file like object with a read() method. The file is read, decoded
+    and parsed in chunks so a large JSON Lines file can be processed in constant memory.
+    :param file_: Filename or a file like object with read() method.
+    :param default_encoding: The encoding to be used if the file doesn't have a BOM prefix.
+    Defaults to UTF-8.
+    :param use_utf8_strings: Ignored in case of python3, in case of python2 the default
+    value of this is True. True means that the loaded json string should be handled as a utf-8
+    encoded str instead of a unicode object.
+    :param chunk_size: The number of bytes to read at once.
+    :param use_mmap: Defaults to False. True means that the chunks are read from a memory map
+    of the file.
+    """
+    chunks = _load_file_chunks(file_, kwargs)
+    return _iter_documents(chunks, *args, **kwargs)
+
+
+def iter_load_config(file_, *args, **kwargs):
+    """
+    Does exactly the same as loads_config_many() but instead of a json text this generator
+    receives the path to a file or a file like object with a read() method.
+    It accepts the same file loading parameters as iter_load().
+    """
+    chunks = _load_file_chunks(file_, kwargs)
+    return loads_config_many(chunks, *args, **kwargs)
+
+
+def _load_file_chunks(file_, kwargs):
+    """ Pops the file loading parameters of iter_load() from kwargs and opens the file. """
+    return load_utf_text_file_chunks(file_,
+                                     kwargs.pop('default_encoding', 'UTF-8'),
+                                     kwargs.pop('use_utf8_strings', True),
+                                     kwargs.pop('chunk_size', 64*1024),
+                                     kwargs.pop('use_mmap', False))
+
+
+def _source_chunks(source, chunk_size):
+    """
+    Returns the text chunks of a json text or a file like object with a read() method.
+    A json text that has already been split into chunks (any other iterable) is returned as it
+    is. Binary chunks are decoded. In case of python2 the str chunks are treated as binary:
+    their encoding is detected and UTF-8 chunks are left as they are after removing the BOM.
+    """
+    if hasattr(source, 'read'):
+        chunks = read_file_chunks(source, chunk_size)
+    elif hasattr(source, 'find'):
+        # str, bytes, bytearray, mmap
+        chunks = (source[pos:pos+chunk_size] for pos in my_xrange(0, len(source), chunk_size))
+    else:
+        chunks = source
+    return _decode_binary_chunks(chunks)
+
+
+def _iter_documents(chunks,
+                    parser_params=JSONParserParams(),
+                    object_builder_params=PythonObjectBuilderParams()):
+    if not parser_params.multiple_documents:
+        parser_params = copy.copy(parser_params)
+        parser_params.multiple_documents = True
+    listener = DocumentCollectorParserListener(object_builder_params)
+    parser = IncrementalJSONParser(listener, parser_params)
+    documents = listener.documents
+    for chunk in itertools.chain(chunks, (None,)):
+        try:
+            if chunk is None:
+                parser.close()
+            else:
+                parser.feed(chunk)
+        except JSONConfigParserException as e:
+            for document in documents:
+                yield document
+            raise e
+        for document in documents:
+            yield document
+        del documents[:]
+
+
+def iterparse(source,
+              parser_params=JSONParserParams(),
+              string_to_scalar_converter=DefaultStringToScalarConverter(),
+              chunk_size=64*1024):
+    """
+    A generator that parses the json lazily and yields the parser events as
+    (event, value, line, column) tuples without building a json object hierarchy.
+    The events: 'begin_object', 'end_object', 'object_key', 'begin_array', 'end_array' and
+    'scalar'. The value is the key in case of 'object_key', the python object equivalent of
+    the scalar in case of 'scalar' and None in case of the other events. The line and column
+    numbers are 1 based and they point to the location of the parser when the event occurred.
+    For example:
+    for event, value, line, column in iterparse(f):
+        ...
+    :param source: A json string or a file like object with a read() method. If the read()
+    method returns bytes then the encoding is detected based on the BOM prefix (UTF-8 by
+    default) and the contents are decoded incrementally. The source is read and parsed in
+    chunks so the generator can stop early without reading the rest of the source and a large
+    file can be processed in constant memory.
+    :param parser_params: Parser parameters.
+    :type parser_params: JSONParserParams
+    :param string_to_scalar_converter: Converts the scalars of the 'scalar' events.
+    :param chunk_size: The size of the chunks the source is read and parsed in.
+    """
+    chunks = _source_chunks(source, chunk_size)
+    listener = EventCollectorParserListener(string_to_scalar_converter)
+    parser = IncrementalJSONParser(listener, parser_params)
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event in listener.events:
+            yield event
+        del listener.events[:]
+    parser.close()
+    for event in listener.events:
+        yield event
+
+
+def _decode_binary_chunks(chunks):
+    """ Decodes the chunks if they are bytes, leaves them as they are otherwise. """
+    chunks = iter(chunks)
+    for first_chunk in chunks:
+        if isinstance(first_chunk, bytes):
+            for chunk in decode_utf_text_chunks(itertools.chain((first_chunk,), chunks)):
+                yield chunk
+        else:
+            yield first_chunk
+            for chunk in chunks:
+                yield chunk
+        break
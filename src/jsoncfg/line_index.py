@@ -0,0 +1,104 @@
+"""
+Contains the LineIndex that converts positions of a text into line/column numbers on demand.
+"""
+import re
+import codecs
+import bisect
+
+from .compatibility import my_unicode
+
+
+def advance_column(text, begin, end, column, tab_size):
+    """
+    Calculates the column number at position end if the column number at position begin
+    is column. The [begin, end) range of text must not contain newline characters.
+    """
+    tab_pos = text.find('\t', begin, end)
+    while tab_pos >= 0:
+        column += tab_pos - begin + tab_size
+        column -= column % tab_size
+        begin = tab_pos + 1
+        tab_pos = text.find('\t', begin, end)
+    return column + end - begin
+
+
+class LineIndex(object):
+    """
+    Maps the positions of a text to zero based (line, column) pairs the same way as the
+    TextParser counts them: CR, LF, CRLF and LFCR are single newlines and tabs are expanded
+    to the next multiple of tab_size. The newline offset table is built in bulk when the
+    first location is queried so an index that is never queried costs almost nothing.
+    """
+    # The regex alternatives pair the newline chars the same way as TextParser.skip_chars().
+    _newline_re = re.compile(r'\r\n|\n\r|\r|\n')
+    _newline_pairs = ('\r\n', '\n\r')
+
+    def __init__(self, text, tab_size=4):
+        self.text = text
+        self.tab_size = tab_size
+        self._line_starts = None
+        # The column of the last query. Parsers query the locations mostly in increasing
+        # order so we can continue the column calculation from the previous query.
+        self._query_line = 0
+        self._query_pos = 0
+        self._query_column = 0
+
+    @property
+    def line_starts(self):
+        """ The start positions of the lines following the first line. """
+        if self._line_starts is None:
+            self._line_starts = [m.start() + 1 for m in self._newline_re.finditer(self.text)]
+        return self._line_starts
+
+    def location(self, pos):
+        """ Returns the zero based (line, column) of the specified position. """
+        if pos == self._query_pos:
+            return self._query_line, self._query_column
+
+        line = bisect.bisect_right(self.line_starts, pos)
+        begin = self._line_begin(line)
+        if line == self._query_line and begin <= self._query_pos < pos:
+            begin, column = self._query_pos, self._query_column
+        else:
+            column = 0
+
+        if begin < pos:
+            column = self._advance_column(begin, pos, column)
+
+        self._query_line = line
+        self._query_pos = pos
+        self._query_column = column
+        return line, column
+
+    def _advance_column(self, begin, end, column):
+        return advance_column(self.text, begin, end, column, self.tab_size)
+
+    def _line_begin(self, line):
+        """ Returns the position of the first column of the specified line. """
+        if line == 0:
+            return 0
+        begin = self._line_starts[line - 1]
+        # In case of CRLF and LFCR the line starts after the first newline char
+        # but the column counting starts only after the second one.
+        if self.text[begin-1:begin+1] in self._newline_pairs:
+            begin += 1
+        return begin
+
+
+class Utf8LineIndex(LineIndex):
+    """
+    A LineIndex for UTF-8 encoded binary text (bytes or any buffer supported by the re module).
+    The positions are byte offsets but the columns are counted in characters. The optional
+    UTF-8 BOM at the beginning of the text isn't counted as a column.
+    """
+    _newline_re = re.compile(br'\r\n|\n\r|\r|\n')
+    _newline_pairs = (b'\r\n', b'\n\r')
+
+    def _advance_column(self, begin, end, column):
+        line_text = my_unicode(self.text[begin:end], 'utf-8', 'replace')
+        return advance_column(line_text, 0, len(line_text), column, self.tab_size)
+
+    def _line_begin(self, line):
+        if line == 0:
+            return len(codecs.BOM_UTF8) if self.text[:3] == codecs.BOM_UTF8 else 0
+        return super(Utf8LineIndex, self)._line_begin(line)
@@ -0,0 +1,347 @@
+"""
+Parses json in parallel in a pool of worker processes: many json files or the items of a
+large root array. The parsing is pure python and CPU bound so threads don't help but
+processes scale with the number of cores.
+
+The python trees are sent back from the worker processes as they are. The config trees are
+sent back in a compact picklable form: the python tree along with the (line, column) of its
+nodes and the config tree is built from these by the caller process.
+"""
+import re
+import functools
+import itertools
+import multiprocessing
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # python2 without the futures backport
+    ProcessPoolExecutor = None
+
+from .compatibility import my_xrange
+from .parser import JSONParserParams, JSONConfigParserException, text_parser_class
+from .line_index import LineIndex
+from .tree_python import PythonObjectBuilderParams, DefaultStringToScalarConverter
+from .tree_config import (
+    LocationRecordingObjectBuilderParserListener, RecordedNodeLocations,
+    config_tree_from_python_tree,
+)
+from .text_encoding import open_utf_text_file, load_utf_text_file
+from .functions import load, load_config, loads, loads_config
+
+
+def load_many(paths,
+              parser_params=JSONParserParams(),
+              object_builder_params=PythonObjectBuilderParams(),
+              workers=None,
+              executor=None,
+              **kwargs):
+    """
+    Does the same as calling load() for each of the paths but the files are loaded in parallel
+    in a process pool. Returns the list of the loaded python object hierarchies in the order of
+    the paths. The parse errors are raised with the name of the file that contains the error.
+    :param paths: The paths of the json files.
+    :param parser_params: The same as in case of load(). It has to be picklable.
+    :param object_builder_params: The same as in case of load(). It has to be picklable so the
+    object and array creators and the scalar converter can't be lambdas or local functions.
+    :param workers: The maximum number of worker processes. Defaults to the number of CPUs.
+    1 loads the files in the current process. In case of python2 the files are loaded in the
+    current process if the futures package isn't installed.
+    :param executor: An optional concurrent.futures.Executor to use instead of creating a
+    new process pool. Reusing an executor saves the startup time of the worker processes.
+    :param kwargs: The file loading parameters of load() except stream and chunk_size:
+    default_encoding, use_utf8_strings, use_mmap and parse_utf8_bytes.
+    """
+    load_file = functools.partial(_load_python_tree, parser_params=parser_params,
+                                  object_builder_params=object_builder_params,
+                                  file_kwargs=kwargs)
+    paths = list(paths)
+    python_trees = _process_pool_map(load_file, paths, workers, executor)
+    if python_trees is None:
+        return [load_file(path) for path in paths]
+    return python_trees
+
+
+def load_config_many(paths,
+                     parser_params=JSONParserParams(),
+                     string_to_scalar_converter=DefaultStringToScalarConverter(),
+                     workers=None,
+                     executor=None,
+                     **kwargs):
+    """
+    Does the same as calling load_config() for each of the paths but the files are parsed in
+    parallel in a process pool. Returns the list of config trees in the order of the paths.
+    The config nodes have the same line/column info as in case of load_config().
+    The parameters are the same as those of load_many().
+    """
+    load_file_parts = functools.partial(_load_config_tree_parts, parser_params=parser_params,
+                                        string_to_scalar_converter=string_to_scalar_converter,
+                                        file_kwargs=kwargs)
+    paths = list(paths)
+    config_tree_parts = _process_pool_map(load_file_parts, paths, workers, executor)
+    if config_tree_parts is None:
+        # Building the config trees directly is cheaper than building them from the parts.
+        return [_load_config_tree(path, parser_params, string_to_scalar_converter, kwargs)
+                for path in paths]
+    return [config_tree_from_python_tree(python_tree, RecordedNodeLocations(locations))
+            for python_tree, locations in config_tree_parts]
+
+
+def loads_parallel(s,
+                   parser_params=JSONParserParams(root_is_array=True),
+                   object_builder_params=PythonObjectBuilderParams(),
+                   workers=None,
+                   executor=None,
+                   min_chunk_size=1024*1024):
+    """
+    Works like loads() but a large json text with a root array is split into chunks at the
+    boundaries of its items and the chunks are parsed in parallel in a process pool. The
+    items are stitched together in order. The boundaries are found by a fast structural
+    pre-scan that skips the quoted strings and comments of the text. If the text can't be
+    split (e.g.: it is small or its root is an object) then it is parsed in the current
+    process. If the parsing of a chunk fails then the whole text is parsed again in the
+    current process so the errors are exactly the same as in case of loads().
+    :param s: The json text.
+    :param parser_params: The same as in case of loads() but the default root_is_array is
+    True. It has to be picklable.
+    :param object_builder_params: The same as in case of loads(). It has to be picklable and
+    the arrays created by its array creator must have an append() method.
+    :param workers: The maximum number of worker processes. Defaults to the number of CPUs.
+    :param executor: An optional concurrent.futures.Executor to use instead of creating a
+    new process pool.
+    :param min_chunk_size: The text isn't split into chunks smaller than this.
+    """
+    chunks = _split_root_array(s, parser_params, workers, executor, min_chunk_size)
+    if chunks is None:
+        return loads(s, parser_params, object_builder_params)
+    parse_chunk = functools.partial(_parse_python_tree_chunk, parser_params=parser_params,
+                                    object_builder_params=object_builder_params)
+    try:
+        chunk_arrays = _process_pool_map(parse_chunk, chunks, workers, executor)
+    except JSONConfigParserException:
+        return loads(s, parser_params, object_builder_params)
+    result = chunk_arrays[0]
+    append = result.append
+    for chunk_array in itertools.islice(chunk_arrays, 1, None):
+        for item in chunk_array:
+            append(item)
+    return result
+
+
+def loads_config_parallel(s,
+                          parser_params=JSONParserParams(root_is_array=True),
+                          string_to_scalar_converter=DefaultStringToScalarConverter(),
+                          workers=None,
+                          executor=None,
+                          min_chunk_size=1024*1024):
+    """
+    Works like loads_parallel() but it returns a config tree just like loads_config().
+    The line/column numbers of the config nodes are the same as in case of loads_config().
+    """
+    chunks = _split_root_array(s, parser_params, workers, executor, min_chunk_size)
+    if chunks is None:
+        return loads_config(s, parser_params, string_to_scalar_converter)
+    parse_chunk = functools.partial(_parse_config_tree_chunk, parser_params=parser_params,
+                                    string_to_scalar_converter=string_to_scalar_converter)
+    try:
+        chunk_parts = _process_pool_map(parse_chunk, chunks, workers, executor)
+    except JSONConfigParserException:
+        return loads_config(s, parser_params, string_to_scalar_converter)
+    items = []
+    # The first location is that of the root array.
+    locations = [chunk_parts[0][1][0]]
+    for chunk_items, chunk_locations in chunk_parts:
+        items.extend(chunk_items)
+        locations.extend(itertools.islice(chunk_locations, 1, None))
+    return config_tree_from_python_tree(items, RecordedNodeLocations(locations))
+
+
+def load_parallel(file_, *args, **kwargs):
+    """
+    Does exactly the same as loads_parallel() but instead of a json string this function
+    receives the path to a file or a file like object with a read() method.
+    :param default_encoding: The encoding to be used if the file doesn't have a BOM prefix.
+    Defaults to UTF-8.
+    :param use_utf8_strings: The same as in case of load().
+    """
+    json_str = load_utf_text_file(file_, kwargs.pop('default_encoding', 'UTF-8'),
+                                  kwargs.pop('use_utf8_strings', True))
+    return loads_parallel(json_str, *args, **kwargs)
+
+
+def load_config_parallel(file_, *args, **kwargs):
+    """
+    Does exactly the same as loads_config_parallel() but instead of a json string this
+    function receives the path to a file or a file like object with a read() method.
+    It accepts the same file loading parameters as load_parallel().
+    """
+    json_str = load_utf_text_file(file_, kwargs.pop('default_encoding', 'UTF-8'),
+                                  kwargs.pop('use_utf8_strings', True))
+    return loads_config_parallel(json_str, *args, **kwargs)
+
+
+def _worker_count(workers, executor):
+    if executor is None and ProcessPoolExecutor is None:
+        return 1
+    if workers is None or executor is not None:
+        return multiprocessing.cpu_count()
+    return workers
+
+
+def _process_pool_map(func, items, workers, executor):
+    """
+    Calls func with each of the items in the executor or in a new process pool.
+    Returns the list of the results or None if the items should be processed in the current
+    process because there is no use in starting worker processes.
+    """
+    if executor is not None:
+        return list(executor.map(func, items))
+    workers = min(_worker_count(workers, None), len(items))
+    if workers <= 1:
+        return None
+    with ProcessPoolExecutor(workers) as executor:
+        # Sending the items in batches reduces the number of round trips to the workers.
+        chunksize = max(1, len(items) // (workers * 4))
+        return list(executor.map(func, items, chunksize=chunksize))
+
+
+# Matches everything up to the next bracket that isn't in a quoted string or comment.
+# A '/' that doesn't start a comment and a '"' without closing quotation mark are invalid
+# json, they are matched only to make sure that the pre-scan finishes.
+_non_bracket_re = re.compile(r'(?:[^"/\[\]{}]+|"[^"\\]*(?:\\[\s\S][^"\\]*)*"|//[^\r\n]*|'
+                             r'/\*[\s\S]*?\*/|[/"])*')
+# Matches a comma that isn't in a quoted string or comment or the thing to skip before it.
+_comma_re = re.compile(r',|"[^"\\]*(?:\\[\s\S][^"\\]*)*"|//[^\r\n]*|/\*[\s\S]*?\*/|[/"]')
+_spaces_and_comments_re = re.compile(r'(?:[ \t\r\n]+|//[^\r\n]*|/\*[\s\S]*?\*/)*')
+
+
+def _find_item_separators(text, target_chunk_size):
+    """
+    Pre-scans the json text and returns the positions of some of the commas that separate
+    the items of the root array. The distance between the returned commas is at least
+    target_chunk_size. Returns an empty list if the root of the json text isn't an array.
+    """
+    end = len(text)
+    pos = _spaces_and_comments_re.match(text).end()
+    if pos >= end or text[pos] != '[':
+        return []
+    separators = []
+    next_separator = pos + target_chunk_size
+    depth = 0
+    while pos < end:
+        if text[pos] in '[{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth <= 0:
+                break
+        pos += 1
+        run_end = _non_bracket_re.match(text, pos).end()
+        if depth == 1 and run_end > next_separator:
+            # The items between pos and run_end are scalars or the end of an object/array.
+            for comma in _iter_commas(text, pos, run_end):
+                if comma < next_separator:
+                    continue
+                after_comma = _spaces_and_comments_re.match(text, comma + 1).end()
+                if after_comma < end and text[after_comma] != ']':
+                    separators.append(comma)
+                    next_separator = comma + target_chunk_size
+        pos = run_end
+    return separators
+
+
+def _iter_commas(text, begin, end):
+    """ Yields the positions of the commas of text[begin:end] that aren't in strings. """
+    pos = begin
+    while 1:
+        m = _comma_re.search(text, pos, end)
+        if not m:
+            return
+        if m.group() == ',':
+            yield m.start()
+        pos = m.end()
+
+
+def _split_root_array(s, parser_params, workers, executor, min_chunk_size):
+    """
+    Splits the root array of the json text into chunks that can be parsed separately.
+    Returns None if the text should be parsed in one piece in the current process.
+    The chunks are (chunk_text, line, column, padding) tuples: the chunk_text is an array
+    that contains some of the items of the root array and its first character is at the
+    0 based line and column of the original text if the padding spaces at its beginning
+    are ignored.
+    """
+    workers = _worker_count(workers, executor)
+    # The array indexes of the select parameter can't be matched in the chunks.
+    if workers <= 1 or not parser_params.root_is_array or len(s) < 2 * min_chunk_size or\
+            parser_params.selection_tree is not None:
+        return None
+    # A few chunks per worker balances the load if the items have different parsing cost.
+    target_chunk_size = max(min_chunk_size, len(s) // (workers * 4))
+    separators = _find_item_separators(s, target_chunk_size)
+    if not separators:
+        return None
+
+    line_index = LineIndex(s, parser_params.tab_size)
+    chunks = [(s[:separators[0]] + ']', 0, 0, 0)]
+    for i in my_xrange(len(separators)):
+        begin = separators[i] + 1
+        end = separators[i+1] if i+1 < len(separators) else len(s)
+        line, column = line_index.location(separators[i])
+        # The padding keeps the tab stops of the first line at the same columns.
+        padding = column % parser_params.tab_size
+        chunk_text = ' ' * padding + '[' + s[begin:end]
+        if end < len(s):
+            chunk_text += ']'
+        chunks.append((chunk_text, line, column, padding))
+    return chunks
+
+
+def _parse_python_tree_chunk(chunk, parser_params, object_builder_params):
+    # Runs in a worker process.
+    return loads(chunk[0], parser_params, object_builder_params)
+
+
+def _parse_config_tree_chunk(chunk, parser_params, string_to_scalar_converter):
+    # Runs in a worker process.
+    chunk_text, line, column, padding = chunk
+    listener = LocationRecordingObjectBuilderParserListener(
+        PythonObjectBuilderParams(string_to_scalar_converter=string_to_scalar_converter))
+    text_parser_class(chunk_text, parser_params)(parser_params).parse(chunk_text, listener)
+    # Converting the locations of the chunk_text into locations of the original text.
+    column_offset = column - padding
+    locations = [(chunk_line + line, chunk_column + column_offset if chunk_line == 1 else
+                  chunk_column) for chunk_line, chunk_column in listener.locations]
+    return listener.result, locations
+
+
+def _load_python_tree(path, parser_params, object_builder_params, file_kwargs):
+    # Runs in a worker process.
+    try:
+        return load(path, parser_params, object_builder_params, **file_kwargs)
+    except JSONConfigParserException as e:
+        raise e.with_filename(path)
+
+
+def _load_config_tree(path, parser_params, string_to_scalar_converter, file_kwargs):
+    try:
+        return load_config(path, parser_params, string_to_scalar_converter, **file_kwargs)
+    except JSONConfigParserException as e:
+        raise e.with_filename(path)
+
+
+def _load_config_tree_parts(path, parser_params, string_to_scalar_converter, file_kwargs):
+    # Runs in a worker process.
+    listener = LocationRecordingObjectBuilderParserListener(
+        PythonObjectBuilderParams(string_to_scalar_converter=string_to_scalar_converter))
+    with open_utf_text_file(path,
+                            file_kwargs.get('default_encoding', 'UTF-8'),
+                            file_kwargs.get('use_utf8_strings', True),
+                            file_kwargs.get('use_mmap', False),
+                            file_kwargs.get('parse_utf8_bytes', False)) as json_text:
+        parser = text_parser_class(json_text, parser_params)(parser_params)
+        try:
+            parser.parse(json_text, listener)
+        except JSONConfigParserException as e:
+            raise e.with_filename(path)
+    return listener.result, listener.locations
@@ -1,32 +1,74 @@
 """
 This file contains the JSON parser that works like a SAX XML parser.
 """
+import re
+import codecs
+
 from kwonly_args import kwonly_defaults
 
-from .compatibility import my_xrange, my_unichr, my_unicode, utf8chr
+from .compatibility import (
+    python2, my_xrange, my_unichr, my_unicode, my_basestring, utf8chr, bytes_item_to_str,
+)
 from .exceptions import JSONConfigException
+from .line_index import LineIndex, Utf8LineIndex, advance_column
+from .query_path import WILDCARD, SELECT_ALL, compile_selection_tree
 
 
 class JSONConfigParserException(JSONConfigException):
-    def __init__(self, parser, error_message):
+    def __init__(self, parser, error_message, filename=None):
+        """
+        :param parser: The parser or an object with the 0 based line and column of the error.
+        :param filename: The name of the parsed file if it is known.
+        """
         self.error_message = error_message
         self.line = parser.line + 1
         self.column = parser.column + 1
-        message = '%s [line=%s;col=%s]' % (error_message, self.line, self.column)
+        self.filename = filename
+        if filename is None:
+            message = '%s [line=%s;col=%s]' % (error_message, self.line, self.column)
+        else:
+            message = '%s [file=%s;line=%s;col=%s]' % (error_message, filename, self.line,
+                                                       self.column)
         super(JSONConfigParserException, self).__init__(message)
 
+    def with_filename(self, filename):
+        """ Returns a copy of this exception that reports also the name of the parsed file. """
+        return JSONConfigParserException(_ErrorLocation(self.line, self.column),
+                                         self.error_message, filename)
+
+    def __reduce__(self):
+        # The parser isn't picklable so the exception is recreated from its location.
+        # This way the exception can be raised in a worker process of a process pool.
+        return JSONConfigParserException, (_ErrorLocation(self.line, self.column),
+                                           self.error_message, self.filename)
+
+
+class _ErrorLocation(object):
+    """ Stands in for the parser when a JSONConfigParserException is recreated. """
+    def __init__(self, line, column):
+        """ :param line: 1 based. :param column: 1 based. """
+        self.line = line - 1
+        self.column = column - 1
+
 
 class TextParser(object):
     """
     A base class for parsers. It handles the position in the parsed text and
     tracks the current line/column number.
     """
+    # True if the line/column of the positions of the parsed text can be resolved also after
+    # the parsing with the line_index of the parser.
+    offset_locations = False
+
     def __init__(self, tab_size=4):
         super(TextParser, self).__init__()
         self.tab_size = tab_size
         self.text = None
         self.pos = 0
         self.end = 0
+        self._init_location_tracking()
+
+    def _init_location_tracking(self):
         self.line = 0
         self.prev_newline_char = None
         self._column = 0
@@ -50,6 +92,13 @@ class TextParser(object):
         self.text = text
         self.end = len(text)
 
+    def reset(self):
+        """ Drops the parsed text and makes the parser ready to parse another text. """
+        self.text = None
+        self.pos = 0
+        self.end = 0
+        self._init_location_tracking()
+
     def error(self, message):
         """ Raises an exception with the given message and with the current position of
         the parser in the parsed json string. """
@@ -83,6 +132,17 @@ class TextParser(object):
         """
         self.skip_chars(target_pos, lambda c: True)
 
+    def jump_to(self, target_pos, line_index):
+        """
+        Moves the pointer to target_pos without scanning the skipped text: the line/column
+        of target_pos is looked up in the LineIndex of the text. The target_pos must not be
+        in the middle of a CRLF or LFCR.
+        """
+        self.pos = target_pos
+        self.line, self._column = line_index.location(target_pos)
+        self._column_query_pos = target_pos
+        self.prev_newline_char = None
+
     def skip_char(self):
         """ Skips a single character. """
         self.skip_to(self.pos + 1)
@@ -106,9 +166,13 @@ class TextParser(object):
 
 
 class JSONParserParams(object):
+    engines = ('regex', 'char')
+
     @kwonly_defaults
     def __init__(self, tab_size=4, root_is_array=False, allow_comments=True,
-                 allow_unquoted_keys=True, allow_trailing_commas=True):
+                 allow_unquoted_keys=True, allow_trailing_commas=True, engine='regex',
+                 lazy_location=True, stdlib_fast_path=True, max_depth=None,
+                 multiple_documents=False, select=None):
         """
         :param tab_size: Used when calculating the column of the error location. Defaults to 4.
         :param root_is_array: True: the root of the json hierarchy must be an object/dict.
@@ -119,12 +183,63 @@ class JSONParserParams(object):
         :param allow_trailing_commas: Allow putting an optional comma after the last
         item in json objects and arrays. Comes handy when you are exchanging lines in
         the config with copy pasting.
+        :param engine: The scanning engine of the parser. 'regex' finds the tokens with
+        precompiled regular expressions and str.find(), 'char' steps through the input
+        one character at a time. Both engines emit the same parser events and report
+        errors at the same line/column positions.
+        :param lazy_location: Used only by the 'regex' engine. True: the parser tracks only
+        its position in the text and the line/column numbers are calculated on demand
+        (e.g.: on error) from a newline offset table. The config nodes built by this engine
+        store only their offsets and they keep a reference to the json text to resolve their
+        locations on demand. False: the line/column numbers are updated while the parser
+        advances in the text.
+        :param stdlib_fast_path: Used only by the loads() functions. True: try to load the
+        json string with the C accelerated scanner of the standard json module and fall back
+        to the JSONParser only if the json string isn't strict json (e.g.: it has comments).
+        The result is the same in both cases.
+        :param max_depth: The maximum allowed nesting depth of json objects and arrays or None
+        to allow any depth. The parser doesn't use recursion so it can parse any depth without
+        hitting the recursion limit of python but a limit can protect from malicious input.
+        :param multiple_documents: True: the json text is a sequence of any number of root
+        json values (e.g.: JSON Lines or concatenated json documents) that are separated only
+        by optional spaces and comments. The parser emits the events of the root values one
+        after the other. False: the json text must contain exactly one root value.
+        :param select: None or a list of query paths (e.g.: ['servers[*].address', 'log.level'])
+        in the format of JSONConfigValueNotFoundError.relative_path with optional '*' wildcards.
+        The parser emits events only for the selected values (along with their descendants)
+        and for the containers on their paths. The other object items are skipped without
+        parser events and the other array items are replaced with a single null scalar event
+        to keep the indexes of the selected items. The skipped values are checked only for
+        balanced brackets, quoted strings and comments.
         """
+        if engine not in self.engines:
+            raise ValueError('Invalid engine: %r. Expected one of: %s' % (
+                engine, ', '.join(self.engines)))
         self.tab_size = tab_size
         self.root_is_array = root_is_array
         self.allow_comments = allow_comments
         self.allow_unquoted_keys = allow_unquoted_keys
         self.allow_trailing_commas = allow_trailing_commas
+        self.engine = engine
+        self.lazy_location = lazy_location
+        self.stdlib_fast_path = stdlib_fast_path
+        self.max_depth = max_depth
+        self.multiple_documents = multiple_documents
+        self.select = select
+
+    @property
+    def select(self):
+        return self._select
+
+    @select.setter
+    def select(self, paths):
+        self._select = paths
+        # The compiled form of the paths or None if everything is selected.
+        self.selection_tree = None
+        if paths is not None:
+            selection_tree = compile_selection_tree(paths)
+            if selection_tree is not SELECT_ALL:
+                self.selection_tree = selection_tree
 
 
 class JSONParser(TextParser):
@@ -139,10 +254,59 @@ class JSONParser(TextParser):
     special_chars = set('{}[]",:/*')
     spaces_and_special_chars = spaces | special_chars
 
+    # The states of the parser. The parser doesn't recurse into the nested json objects and
+    # arrays, it parses one step at a time in a loop and keeps track of the currently open
+    # containers in a stack. A step emits at most one parser event as its last action.
+    _ROOT = 0
+    _OBJECT_FIRST_KEY = 1
+    _OBJECT_COLON = 2
+    _OBJECT_COMMA = 3
+    _ARRAY_FIRST_ITEM = 4
+    _ARRAY_COMMA = 5
+    _END = 6
+
+    def __new__(cls, params=JSONParserParams()):
+        # Instantiating JSONParser creates a parser with the engine selected by the params.
+        if cls is JSONParser:
+            cls = engine_parser_class(params)
+        return super(JSONParser, cls).__new__(cls)
+
     def __init__(self, params=JSONParserParams()):
         super(JSONParser, self).__init__(tab_size=params.tab_size)
         self.params = params
+        self._init_parser_state()
+
+    def reset(self, params=None):
+        """
+        Makes the parser ready to parse another json text. Reusing a parser is cheaper than
+        creating a new one when many small json texts are parsed.
+        :param params: The parameters for the next parse() or None to keep the current ones.
+        The engine selected by the new parameters must be the same as that of the parser.
+        """
+        super(JSONParser, self).reset()
+        if params is not None:
+            self.params = params
+            self.tab_size = params.tab_size
+        self._init_parser_state()
+
+    def _init_parser_state(self):
         self.listener = None
+        # In multiple_documents mode the parser starts as if it had parsed a root value
+        # already: this way _parse_end() handles the empty text and the next documents.
+        self._state = self._END if self.params.multiple_documents else self._ROOT
+        # The stack of the currently open containers: True for objects, False for arrays.
+        self._object_stack = []
+        # The index of the next item in the current array.
+        self._item_index = 0
+
+        # The state of the select parameter. The _selection is the selection tree of the
+        # items of the current container or None if all of them are selected. The
+        # _child_selection is the selection tree of the value that is being parsed.
+        self._selective = self.params.selection_tree is not None
+        self._selection = self.params.selection_tree
+        self._child_selection = None
+        # The (_selection, _item_index) of the parent containers.
+        self._selection_stack = []
 
     def parse(self, json_text, listener):
         """
@@ -157,24 +321,309 @@ class JSONParser(TextParser):
         try:
             self.init_text_parser(json_text)
             self.listener = listener
+            # The same as calling self._parse_step() in a loop but faster.
+            step_parsers = self._step_parsers
+            skip_spaces_and_peek = self._skip_spaces_and_peek
+            while step_parsers[self._state](self, skip_spaces_and_peek()):
+                pass
+        finally:
+            listener.end_parsing()
 
+    def parse_value(self, json_text, listener, begin, line_index):
+        """
+        Parses only the json value (object, array or scalar) that starts at the begin offset
+        of json_text and emits its parser events to the listener. The text after the value
+        isn't parsed. The locations of the events and errors are relative to json_text.
+        :param line_index: The LineIndex (or Utf8LineIndex in case of binary text) of
+        json_text. It can be shared by the parse_value() calls of the same text so its
+        newline offset table is built only once.
+        """
+        listener.begin_parsing(self)
+        try:
+            self.init_text_parser(json_text)
+            self.jump_to(begin, line_index)
+            self.listener = listener
+            self._child_selection = self._selection
+            self._parse_value(self._skip_spaces_and_peek())
+            step_parsers = self._step_parsers
+            skip_spaces_and_peek = self._skip_spaces_and_peek
+            while self._state != self._END:
+                step_parsers[self._state](self, skip_spaces_and_peek())
+        finally:
+            listener.end_parsing()
+
+    def scan_root_items(self, json_text):
+        """
+        Parses the root object or array of json_text without parsing the values of its items:
+        they are skipped like the values that aren't selected by the select parameter and no
+        parser events are emitted. Returns (root_pos, items) where root_pos is the offset of
+        the root and items is the list of the (key, value_pos) pairs of the items. The key is
+        None in case of array items.
+        """
+        self.init_text_parser(json_text)
+        c = self._skip_spaces_and_peek()
+        self._check_root(c)
+        root_pos = self.pos
+        closing_bracket = '}' if c == '{' else ']'
+        self.skip_char()
+        items = []
+        keys = set()
+        c = self._skip_spaces_and_peek()
+        while c != closing_bracket:
+            key = None
+            if closing_bracket == '}':
+                key, _, pos_after_key = self._parse_and_return_string(
+                    self.params.allow_unquoted_keys)
+                if key in keys:
+                    self.error('Duplicate key: "%s"' % (key,))
+                keys.add(key)
+                self.skip_to(pos_after_key)
+                if self._skip_spaces_and_peek() != ':':
+                    self.error('Expected ":"')
+                self.skip_char()
+                c = self._skip_spaces_and_peek()
+            items.append((key, self.pos))
+            self._skip_value(c)
             c = self._skip_spaces_and_peek()
+            if c == closing_bracket:
+                break
+            self.expect(',')
+            c = self._skip_spaces_and_peek()
+            if c == closing_bracket and not self.params.allow_trailing_commas:
+                self.error('Trailing commas aren\'t enabled for this parser.')
+        self.skip_char()
+        if self._skip_spaces_and_peek() is not None:
+            self.error('Garbage detected after the parsed json!')
+        return root_pos, items
+
+    def _parse_step(self):
+        """
+        Parses the next step in the current state of the parser.
+        :return: False if the end of the json text has been reached.
+        """
+        return self._step_parsers[self._state](self, self._skip_spaces_and_peek())
+
+    def _parse_root(self, c):
+        self._check_root(c)
+        self._child_selection = self._selection
+        self._parse_value(c)
+        return True
+
+    def _check_root(self, c):
+        if c == '{':
+            if self.params.root_is_array:
+                self.error('The root of the json is expected to be an array!')
+        elif c == '[':
+            if not self.params.root_is_array:
+                self.error('The root of the json is expected to be an object!')
+        else:
+            self.error('The json string should start with "%s"' % (
+                '[' if self.params.root_is_array else '{'))
+
+    def _parse_object_first_key(self, c):
+        if c == '}':
+            self._parse_container_end()
+        else:
+            self._parse_object_key()
+        return True
+
+    def _parse_object_colon(self, c):
+        if c != ':':
+            self.error('Expected ":"')
+        self.skip_char()
+        self._parse_value(self._skip_spaces_and_peek())
+        return True
+
+    def _parse_object_comma(self, c):
+        if c == '}':
+            self._parse_container_end()
+            return True
+        self.expect(',')
+        if self._skip_spaces_and_peek() == '}':
+            if not self.params.allow_trailing_commas:
+                self.error('Trailing commas aren\'t enabled for this parser.')
+            self._parse_container_end()
+        else:
+            self._parse_object_key()
+        return True
+
+    def _parse_array_first_item(self, c):
+        if c == ']':
+            self._parse_container_end()
+        elif self._selection is not None and not self._select_array_item():
+            self._skip_item_value(c)
+        else:
+            self._parse_value(c)
+        return True
+
+    def _parse_array_comma(self, c):
+        if c == ']':
+            self._parse_container_end()
+            return True
+        self.expect(',')
+        c = self._skip_spaces_and_peek()
+        if c == ']':
+            if not self.params.allow_trailing_commas:
+                self.error('Trailing commas aren\'t enabled for this parser.')
+            self._parse_container_end()
+        elif self._selection is not None and not self._select_array_item():
+            self._skip_item_value(c)
+        else:
+            self._parse_value(c)
+        return True
+
+    def _parse_end(self, c):
+        if c is None:
+            return False
+        if not self.params.multiple_documents:
+            self.error('Garbage detected after the parsed json!')
+        return self._parse_root(c)
+
+    # Indexed by the parser state.
+    _step_parsers = (_parse_root, _parse_object_first_key, _parse_object_colon,
+                     _parse_object_comma, _parse_array_first_item, _parse_array_comma,
+                     _parse_end)
+
+    def _parse_object_key(self):
+        key, key_quoted, pos_after_key = self._parse_and_return_string(
+            self.params.allow_unquoted_keys)
+        if self._selection is not None and not self._select_object_item(key):
+            self._skip_object_item(pos_after_key)
+            return
+        self.listener.begin_object_item(key, key_quoted)
+        # We step self.pos and self.line only after a successful call to the listener
+        # because in case of an exception that is raised from the listener we want the
+        # line/column number to point to the beginning of the parsed string.
+        self.skip_to(pos_after_key)
+        self._state = self._OBJECT_COLON
+
+    def _parse_value(self, c):
+        if c == '{' or c == '[':
+            max_depth = self.params.max_depth
+            if max_depth is not None and len(self._object_stack) >= max_depth:
+                self.error('The json is nested deeper than the max_depth=%s limit.' % (
+                    max_depth,))
+            if self._selective:
+                self._begin_selected_container()
             if c == '{':
-                if self.params.root_is_array:
-                    self.error('The root of the json is expected to be an array!')
-                self._parse_object()
-            elif c == '[':
-                if not self.params.root_is_array:
-                    self.error('The root of the json is expected to be an object!')
-                self._parse_array()
+                self.listener.begin_object()
+                self._object_stack.append(True)
+                self._state = self._OBJECT_FIRST_KEY
             else:
-                self.error('The json string should start with "%s"' % (
-                    '[' if self.params.root_is_array else '{'))
+                self.listener.begin_array()
+                self._object_stack.append(False)
+                self._state = self._ARRAY_FIRST_ITEM
+            self.skip_char()
+        else:
+            scalar_str, scalar_str_quoted, pos_after_scalar = self._parse_and_return_string(True)
+            self.listener.scalar(scalar_str, scalar_str_quoted)
+            self.skip_to(pos_after_scalar)
+            self._end_value()
 
-            if self._skip_spaces_and_peek() is not None:
-                self.error('Garbage detected after the parsed json!')
-        finally:
-            listener.end_parsing()
+    def _parse_container_end(self):
+        self.skip_char()
+        if self._selective:
+            self._selection, self._item_index = self._selection_stack.pop()
+        if self._object_stack.pop():
+            self.listener.end_object()
+        else:
+            self.listener.end_array()
+        self._end_value()
+
+    def _end_value(self):
+        if not self._object_stack:
+            self._state = self._END
+        elif self._object_stack[-1]:
+            self._state = self._OBJECT_COMMA
+        else:
+            self._state = self._ARRAY_COMMA
+            self._item_index += 1
+
+    def _begin_selected_container(self):
+        self._selection_stack.append((self._selection, self._item_index))
+        if self._selection is not None:
+            self._selection = self._child_selection
+        self._child_selection = None
+        self._item_index = 0
+
+    def _select_item(self, key):
+        """
+        Returns True if the item with the specified object key or array index is selected
+        and sets the _child_selection for parsing it.
+        """
+        child_selection = self._selection.get(key)
+        if child_selection is None:
+            child_selection = self._selection.get(WILDCARD)
+            if child_selection is None:
+                return False
+        self._child_selection = None if child_selection is SELECT_ALL else child_selection
+        return True
+
+    def _select_object_item(self, key):
+        # A '*' key is selected only by the wildcard.
+        return self._select_item(key if key != WILDCARD else None)
+
+    def _select_array_item(self):
+        return self._select_item(self._item_index)
+
+    def _skip_object_item(self, pos_after_key):
+        self.skip_to(pos_after_key)
+        if self._skip_spaces_and_peek() != ':':
+            self.error('Expected ":"')
+        self.skip_char()
+        self._skip_item_value(self._skip_spaces_and_peek())
+
+    def _skip_item_value(self, c):
+        self._skip_value(c)
+        self._end_skipped_item()
+
+    def _end_skipped_item(self):
+        if not self._object_stack[-1]:
+            # The skipped item is replaced with a null to keep the indexes of the other items.
+            self.listener.scalar('null', False)
+        self._end_value()
+
+    def _skip_value(self, c):
+        """ Skips the json value that starts with the c character without parser events. """
+        if c == '{' or c == '[':
+            self.skip_to(self._find_container_end())
+        else:
+            self.skip_to(self._parse_and_return_string(True)[2])
+
+    # Matches the text up to the next bracket that isn't in a quoted string or comment and
+    # the bracket is captured by the first group. The first group is None if the end of the
+    # text or an unterminated quoted string or comment has been reached.
+    _skipped_container_token_re = re.compile(
+        r'(?:[^"/\[\]{}]+|"[^"\\]*(?:\\[\s\S][^"\\]*)*"|//[^\r\n]*|/\*[\s\S]*?\*/|'
+        r'/(?![/*]))*([\[\]{}])?')
+    _closing_brackets = {'{': '}', '[': ']'}
+
+    def _find_container_end(self):
+        """
+        Returns the position after the end of the json object or array that starts at the
+        current position. Only the brackets, quoted strings and comments are checked.
+        Raises an error if the end of the text is reached before the end of the container.
+        """
+        match_token = self._skipped_container_token_re.match
+        closing_brackets = self._closing_brackets
+        text = self.text
+        end = self.end
+        expected_closing_brackets = []
+        pos = self.pos
+        while 1:
+            m = match_token(text, pos, end)
+            bracket = m.group(1)
+            if bracket is None:
+                self.error('Reached the end of stream while skipping a json value.')
+            pos = m.end()
+            closing_bracket = closing_brackets.get(bracket)
+            if closing_bracket is not None:
+                expected_closing_brackets.append(closing_bracket)
+            elif bracket != expected_closing_brackets.pop():
+                self.skip_to(pos - 1)
+                self.error('Mismatched closing bracket in a skipped json value.')
+            elif not expected_closing_brackets:
+                return pos
 
     def _skip_spaces_and_peek(self):
         """ Skips all spaces and comments.
@@ -182,8 +631,7 @@ class JSONParser(TextParser):
                 None if the end of the json string has been reached.
         """
         while 1:
-            # skipping spaces
-            self.skip_chars(self.end, lambda x: x in self.spaces)
+            self._skip_spaces()
             c = self.peek()
             if not self.params.allow_comments:
                 return c
@@ -199,6 +647,9 @@ class JSONParser(TextParser):
             else:
                 return c
 
+    def _skip_spaces(self):
+        self.skip_chars(self.end, lambda x: x in self.spaces)
+
     def _skip_singleline_comment(self):
         for pos in my_xrange(self.pos, self.end):
             if self.text[pos] in '\r\n':
@@ -214,86 +665,6 @@ class JSONParser(TextParser):
                 return
         self.error('Multiline comment isn\'t closed.')
 
-    def _parse_object(self):
-        assert self.peek() == '{'
-        self.listener.begin_object()
-        self.skip_char()
-        first_item = True
-        while 1:
-            c = self._skip_spaces_and_peek()
-            if c == '}':
-                self.skip_char()
-                self.listener.end_object()
-                break
-
-            if not first_item:
-                self.expect(',')
-
-                c = self._skip_spaces_and_peek()
-                if c == '}':
-                    if not self.params.allow_trailing_commas:
-                        self.error('Trailing commas aren\'t enabled for this parser.')
-                    self.skip_char()
-                    self.listener.end_object()
-                    break
-
-            key, key_quoted, pos_after_key = self._parse_and_return_string(
-                self.params.allow_unquoted_keys)
-            self.listener.begin_object_item(key, key_quoted)
-            # We step self.pos and self.line only after a successful call to the listener
-            # because in case of an exception that is raised from the listener we want the
-            # line/column number to point to the beginning of the parsed string.
-            self.skip_to(pos_after_key)
-
-            c = self._skip_spaces_and_peek()
-            if c != ':':
-                self.error('Expected ":"')
-            self.skip_char()
-
-            self._parse_value()
-
-            first_item = False
-
-    def _parse_array(self):
-        assert self.peek() == '['
-        self.listener.begin_array()
-        self.skip_char()
-        first_item = True
-        while 1:
-            c = self._skip_spaces_and_peek()
-            if c == ']':
-                self.skip_char()
-                self.listener.end_array()
-                break
-
-            if not first_item:
-                self.expect(',')
-
-                c = self._skip_spaces_and_peek()
-                if c == ']':
-                    if not self.params.allow_trailing_commas:
-                        self.error('Trailing commas aren\'t enabled for this parser.')
-                    self.skip_char()
-                    self.listener.end_array()
-                    break
-
-            self._parse_value()
-            first_item = False
-
-    def _parse_value(self):
-        c = self._skip_spaces_and_peek()
-        if c == '{':
-            self._parse_object()
-        elif c == '[':
-            self._parse_array()
-        else:
-            self._parse_scalar()
-
-    def _parse_scalar(self):
-        scalar_str, scalar_str_quoted, pos_after_scalar = self._parse_and_return_string(True)
-        self.listener.scalar(scalar_str, scalar_str_quoted)
-        self.skip_to(pos_after_scalar)
-
     def _parse_and_return_string(self, allow_unquoted):
         c = self._skip_spaces_and_peek()
         quoted = c == '"'
@@ -337,8 +708,9 @@ class JSONParser(TextParser):
                 self.skip_to(pos)
                 self.error('Encountered a control character that isn\'t allowed in quoted strings.')
             elif c == '"':
-                if segment_begin < pos:
-                    result.append(self.text[segment_begin:pos])
+                # The slice is appended even if it is empty: this way an empty string has the
+                # same type as the text (str or unicode in case of python2).
+                result.append(self.text[segment_begin:pos])
                 pos += 1
                 return ''.join(result), True, pos
             elif c == '\\':
@@ -359,21 +731,32 @@ class JSONParser(TextParser):
                 pos += 1
         self.error('Reached the end of stream while parsing quoted string.')
 
+    def _decode(self, begin, end):
+        """ Returns the text[begin:end] segment as a string. """
+        return self.text[begin:end]
+
+    # The raw text of the escape sequence of the low surrogate of a surrogate pair.
+    _unicode_escape_prefix = '\\u'
+
+    def _hex_value(self, begin, end):
+        """ Returns the value of the hex digits of the text[begin:end] segment. """
+        return int(self.text[begin:end], 16)
+
     def _handle_unicode_escape(self, pos):
         if self.end - pos < 5:
             self.error('Reached the end of stream while parsing quoted string.')
         pos += 1
         try:
-            code_point = int(self.text[pos:pos+4], 16)
+            code_point = self._hex_value(pos, pos+4)
         except ValueError:
             self.skip_to(pos - 2)
             self.error('Error decoding unicode escape sequence.')
         else:
             pos += 4
             if 0xd800 <= code_point < 0xdc00 and self.end-pos >= 6 and\
-                    self.text[pos] == '\\' and self.text[pos+1] == 'u':
+                    self.text[pos:pos+2] == self._unicode_escape_prefix:
                 try:
-                    low_surrogate = int(self.text[pos+2:pos+6], 16)
+                    low_surrogate = self._hex_value(pos+2, pos+6)
                 except ValueError:
                     self.skip_to(pos)
                     self.error('Error decoding unicode escape sequence.')
@@ -384,23 +767,515 @@ class JSONParser(TextParser):
                                                 (low_surrogate - 0xdc00))
             return code_point, pos
 
+    _escape_chars = {
+        '\\': '\\',
+        '/': '/',
+        '"': '"',
+        'b': '\b',
+        'f': '\f',
+        't': '\t',
+        'r': '\r',
+        'n': '\n',
+    }
+
     def _handle_escape(self, pos, c):
-        char = {
-            '\\': '\\',
-            '/': '/',
-            '"': '"',
-            'b': '\b',
-            'f': '\f',
-            't': '\t',
-            'r': '\r',
-            'n': '\n',
-        }.get(c)
+        char = self._escape_chars.get(c)
         if char is None:
             self.skip_to(pos - 1)
             self.error('Quoted string contains an invalid escape sequence.')
         return char, pos + 1
 
 
+class RegexJSONParser(JSONParser):
+    """
+    The 'regex' engine: instead of stepping through the input one character at a time it
+    finds the end of whitespace runs, comments and unquoted strings with precompiled
+    regular expressions and str.find(). The line/column tracking is performed in bulk
+    for the skipped ranges.
+    """
+    _spaces_re = re.compile(r'[ \t\r\n]*')
+    _unquoted_string_re = re.compile(r'[^ \t\r\n{}\[\]",:/*]*')
+    _singleline_comment_re = re.compile(r'[^\r\n]*')
+    # Matches the characters of a quoted string until the closing quotation mark, an escape
+    # sequence or a control character (tab is allowed).
+    _quoted_string_segment_re = re.compile(r'[^"\\\x00-\x08\x0a-\x1f]*')
+    # Matches the newlines in the order TextParser.skip_chars() counts them:
+    # a CRLF or LFCR pair is a single newline.
+    _newline_re = re.compile(r'\r\n|\n\r|\r|\n')
+    # True if the text is binary UTF-8 that has to be decoded.
+    _binary_text = False
+
+    @property
+    def column(self):
+        if self._column_query_pos < self.pos:
+            self._column = advance_column(self.text, self._column_query_pos, self.pos,
+                                          self._column, self.tab_size)
+            self._column_query_pos = self.pos
+        return self._column
+
+    def skip_to(self, target_pos):
+        assert self.pos <= target_pos <= self.end
+        text = self.text
+        pos = self.pos
+        if pos == target_pos:
+            return
+        c = text[pos]
+        if self.prev_newline_char is not None and c in '\r\n' and c != self.prev_newline_char:
+            # this is the second char of a CRLF or LFCR
+            pos += 1
+            self._column_query_pos = pos
+            self._column = 0
+        self.prev_newline_char = None
+
+        last_newline_pos = max(text.rfind('\n', pos, target_pos),
+                               text.rfind('\r', pos, target_pos))
+        if last_newline_pos >= 0:
+            newlines = self._newline_re.findall(text, pos, target_pos)
+            self.line += len(newlines)
+            self._column_query_pos = last_newline_pos + 1
+            self._column = 0
+            # The last newline can be the first half of a CRLF or LFCR that continues
+            # right after target_pos.
+            if last_newline_pos == target_pos - 1 and len(newlines[-1]) == 1:
+                self.prev_newline_char = newlines[-1]
+        self.pos = target_pos
+
+    def _skip_spaces(self):
+        self.skip_to(self._spaces_re.match(self.text, self.pos, self.end).end())
+
+    def _skip_singleline_comment(self):
+        end = self._singleline_comment_re.match(self.text, self.pos, self.end).end()
+        # skipping the terminating newline char too
+        self.skip_to(min(end + 1, self.end))
+
+    def _skip_multiline_comment(self):
+        pos = self.text.find('*/', self.pos, self.end)
+        if pos < 0:
+            self.error('Multiline comment isn\'t closed.')
+        self.skip_to(pos + 2)
+
+    def _parse_and_return_unquoted_string(self):
+        begin = self.pos
+        end = self._unquoted_string_re.match(self.text, begin, self.end).end()
+        if begin == end:
+            self.error('Expected a scalar here.')
+        return self.text[begin:end], False, end
+
+    def _parse_and_return_quoted_string(self):
+        # Jumps from escape sequence to escape sequence instead of checking the characters
+        # one by one. A string without escape sequences is a single slice of the text.
+        text = self.text
+        end = self.end
+        match_segment = self._quoted_string_segment_re.match
+        # Binary text is decoded segment by segment.
+        decode = self._decode if self._binary_text else None
+        result = []
+        pos = self.pos + 1
+        my_chr = my_unichr if decode is not None or isinstance(text, my_unicode) else utf8chr
+        while 1:
+            segment_end = match_segment(text, pos, end).end()
+            if segment_end >= end:
+                break
+            c = text[segment_end] if decode is None else bytes_item_to_str(text[segment_end])
+            if c == '"':
+                segment = text[pos:segment_end] if decode is None else decode(pos, segment_end)
+                if not result:
+                    return segment, True, segment_end + 1
+                result.append(segment)
+                return ''.join(result), True, segment_end + 1
+            if c != '\\':
+                self.skip_to(segment_end)
+                self.error('Encountered a control character that isn\'t allowed in quoted strings.')
+            if pos < segment_end:
+                result.append(text[pos:segment_end] if decode is None else decode(pos, segment_end))
+            pos = segment_end + 1
+            if pos >= end:
+                break
+            c = text[pos] if decode is None else bytes_item_to_str(text[pos])
+            if c == 'u':
+                code_point, pos = self._handle_unicode_escape(pos)
+                result.append(my_chr(code_point))
+            else:
+                char, pos = self._handle_escape(pos, c)
+                result.append(char)
+        self.error('Reached the end of stream while parsing quoted string.')
+
+
+class LazyLocationJSONParser(RegexJSONParser):
+    """
+    The 'regex' engine with lazy_location=True: the parser advances only its position
+    in the text and the line/column numbers are calculated on demand with a LineIndex
+    that is built when a location is queried for the first time.
+    """
+    def _init_location_tracking(self):
+        self._line_index = None
+
+    def init_text_parser(self, text):
+        super(LazyLocationJSONParser, self).init_text_parser(text)
+        self._line_index = None
+        # A memory map or other buffer may be closed after the parsing.
+        self.offset_locations = isinstance(text, (my_basestring, bytes))
+
+    _line_index_class = LineIndex
+
+    @property
+    def line_index(self):
+        if self._line_index is None:
+            self._line_index = self._line_index_class(self.text or '', self.tab_size)
+        return self._line_index
+
+    @property
+    def line(self):
+        return self.line_index.location(self.pos)[0]
+
+    @property
+    def column(self):
+        return self.line_index.location(self.pos)[1]
+
+    def skip_to(self, target_pos):
+        assert self.pos <= target_pos <= self.end
+        self.pos = target_pos
+
+    def jump_to(self, target_pos, line_index):
+        self._line_index = line_index
+        self.pos = target_pos
+
+
+class Utf8JSONParser(LazyLocationJSONParser):
+    """
+    Parses UTF-8 encoded binary json text (bytes, mmap or any other buffer supported by the
+    re module) without decoding the whole text. The structural characters of json are ASCII
+    so only the quoted and unquoted strings are decoded when they are passed to the listener
+    as unicode objects. The text may start with an UTF-8 BOM. The line/column numbers are
+    calculated lazily like in case of the LazyLocationJSONParser and the columns are counted
+    in characters, not in bytes.
+    """
+    _spaces_re = re.compile(br'[ \t\r\n]*')
+    _unquoted_string_re = re.compile(br'[^ \t\r\n{}\[\]",:/*]*')
+    _singleline_comment_re = re.compile(br'[^\r\n]*')
+    _multiline_comment_end_re = re.compile(br'\*/')
+    # Matches the characters of a quoted string until the closing quotation mark, an escape
+    # sequence or a control character (tab is allowed).
+    _quoted_string_segment_re = re.compile(br'[^"\\\x00-\x08\x0a-\x1f]*')
+    _skipped_container_token_re = re.compile(
+        br'(?:[^"/\[\]{}]+|"[^"\\]*(?:\\[\s\S][^"\\]*)*"|//[^\r\n]*|/\*[\s\S]*?\*/|'
+        br'/(?![/*]))*([\[\]{}])?')
+    _closing_brackets = {b'{': b'}', b'[': b']'}
+    _line_index_class = Utf8LineIndex
+    _binary_text = True
+
+    def init_text_parser(self, text):
+        super(Utf8JSONParser, self).init_text_parser(text)
+        if text[:3] == codecs.BOM_UTF8:
+            self.pos = len(codecs.BOM_UTF8)
+
+    def peek(self, offset=0):
+        pos = self.pos + offset
+        if pos >= self.end:
+            return None
+        return bytes_item_to_str(self.text[pos])
+
+    def _decode(self, begin, end):
+        try:
+            return my_unicode(self.text[begin:end], 'utf-8')
+        except UnicodeDecodeError as e:
+            self.skip_to(begin + e.start)
+            self.error('Invalid UTF-8 byte sequence.')
+
+    _unicode_escape_prefix = b'\\u'
+
+    def _hex_value(self, begin, end):
+        # The non-ASCII bytes aren't decoded: they are invalid hex digits like any other char.
+        return int(bytes(self.text[begin:end]), 16)
+
+    def _skip_multiline_comment(self):
+        m = self._multiline_comment_end_re.search(self.text, self.pos, self.end)
+        if not m:
+            self.error('Multiline comment isn\'t closed.')
+        self.skip_to(m.end())
+
+    def _parse_and_return_unquoted_string(self):
+        begin = self.pos
+        end = self._unquoted_string_re.match(self.text, begin, self.end).end()
+        if begin == end:
+            self.error('Expected a scalar here.')
+        return self._decode(begin, end), False, end
+
+
+class _NeedMoreData(Exception):
+    """ Raised by the IncrementalJSONParser if the token at the end of the buffered text
+    may continue in the next chunk. """
+    def __init__(self, unfinished_token=None):
+        """
+        :param unfinished_token: An _UnfinishedToken that finds the end of the token in the
+        next chunks or None if the buffered text has to be parsed again after every chunk.
+        """
+        super(_NeedMoreData, self).__init__()
+        self.unfinished_token = unfinished_token
+
+
+class _UnfinishedToken(object):
+    """
+    Scans the chunks received by the IncrementalJSONParser for the end of the token that
+    continues past the end of the buffered text. This way the text of a long token isn't
+    scanned again after each chunk, it is parsed only after the end of the token arrived.
+    """
+    def __init__(self, rest_re, tail=''):
+        """
+        :param rest_re: Matches the characters of the token that don't end it. Its group is
+        the end of the matched text that may be the beginning of the end of the token
+        (e.g.: a backslash that may escape the next char).
+        :param tail: The group of the rest_re matched at the end of the buffered text.
+        """
+        self.rest_re = rest_re
+        self.tail = tail
+
+    def ends_in(self, chunk):
+        """ Returns True if the token may end in the chunk that follows the scanned text. """
+        text = self.tail + chunk if self.tail else chunk
+        m = self.rest_re.match(text)
+        if m.end() < len(text):
+            return True
+        self.tail = m.group(1)
+        return False
+
+
+class IncrementalJSONParser(RegexJSONParser):
+    """
+    A push parser that receives the json text in chunks through feed() calls followed by a
+    close() call. It emits the same events as the JSONParser as soon as the parsed tokens
+    are complete and it keeps only the unfinished token of the text in memory.
+    Since the parsed text isn't kept the line/column numbers are always tracked while
+    the parser advances in the text (the lazy_location parameter is ignored).
+    """
+    # These match the rest of a token until its end (see _UnfinishedToken). The rest of a
+    # quoted string is matched after the opening quotation mark and a multiline comment
+    # after the opening /*.
+    _quoted_string_rest_re = re.compile(r'[^"\\]*(?:\\[\s\S][^"\\]*)*(\\?)')
+    _multiline_comment_rest_re = re.compile(r'[^*]*(?:\*+[^*/][^*]*)*(\**)')
+    _singleline_comment_rest_re = re.compile(r'[^\r\n]*()')
+    _unquoted_string_rest_re = re.compile(r'[^ \t\r\n{}\[\]",:/*]*()')
+
+    def __new__(cls, listener, params=JSONParserParams()):
+        return super(JSONParser, cls).__new__(cls)
+
+    def __init__(self, listener, params=JSONParserParams()):
+        """
+        :param listener: The ParserListener that receives the parser events.
+        """
+        super(IncrementalJSONParser, self).__init__(params)
+        self.listener = listener
+        self._final = False
+        # The chunks received after the buffered text while its last token is unfinished.
+        self._chunks = []
+        self._unfinished_token = None
+        self._skipped_closing_brackets = None
+        self._skipped_container_location = None
+        listener.begin_parsing(self)
+
+    def feed(self, chunk):
+        """ Parses the next chunk of the json text. """
+        assert not self._final
+        if self.text is None:
+            self.init_text_parser(chunk)
+        else:
+            self._chunks.append(chunk)
+            # The chunks are joined only once because a long token may span many chunks.
+            if self._unfinished_token is not None and not self._unfinished_token.ends_in(chunk):
+                return
+            self._join_chunks()
+        self._parse_buffered_text()
+
+    def close(self):
+        """ Finishes the parsing. Raises an error if the received json text is incomplete. """
+        assert not self._final
+        self._final = True
+        if self.text is None:
+            self.init_text_parser('')
+        else:
+            self._join_chunks()
+        self._parse_buffered_text()
+        self.listener.end_parsing()
+
+    def _join_chunks(self):
+        if self._chunks:
+            self._chunks.insert(0, self.text)
+            self.text = ''.join(self._chunks)
+            self.end = len(self.text)
+            self._chunks = []
+
+    def _parse_buffered_text(self):
+        self._unfinished_token = None
+        try:
+            while 1:
+                location = (self.pos, self.line, self.prev_newline_char,
+                            self._column, self._column_query_pos)
+                try:
+                    if not self._parse_step():
+                        break
+                except _NeedMoreData as e:
+                    (self.pos, self.line, self.prev_newline_char,
+                     self._column, self._column_query_pos) = location
+                    self._unfinished_token = e.unfinished_token
+                    break
+        except BaseException:
+            self.listener.end_parsing()
+            raise
+
+        # Dropping the parsed text. The column of the current position has to be calculated
+        # before this because the column calculation needs the text of the current line.
+        if self.pos:
+            self._column = self.column
+            self.text = self.text[self.pos:]
+            self.pos = self._column_query_pos = 0
+            self.end = len(self.text)
+
+    def _skip_spaces_and_peek(self):
+        while 1:
+            self._skip_spaces()
+            c = self.peek()
+            if c is None and not self._final:
+                raise _NeedMoreData()
+            if not self.params.allow_comments or c != '/':
+                return c
+            d = self.peek(1)
+            if d is None and not self._final:
+                raise _NeedMoreData()
+            if d == '/':
+                self.skip_to(self.pos + 2)
+                self._skip_singleline_comment()
+            elif d == '*':
+                self.skip_to(self.pos + 2)
+                self._skip_multiline_comment()
+            else:
+                return c
+
+    def _skip_singleline_comment(self):
+        end = self._singleline_comment_re.match(self.text, self.pos, self.end).end()
+        if end == self.end and not self._final:
+            raise _NeedMoreData(_UnfinishedToken(self._singleline_comment_rest_re))
+        self.skip_to(min(end + 1, self.end))
+
+    def _skip_multiline_comment(self):
+        if not self._final and self.text.find('*/', self.pos, self.end) < 0:
+            raise _NeedMoreData(self._unfinished_token_at(self._multiline_comment_rest_re,
+                                                          self.pos))
+        super(IncrementalJSONParser, self)._skip_multiline_comment()
+
+    def _parse_and_return_unquoted_string(self):
+        result = super(IncrementalJSONParser, self)._parse_and_return_unquoted_string()
+        if result[2] == self.end and not self._final:
+            raise _NeedMoreData(_UnfinishedToken(self._unquoted_string_rest_re))
+        return result
+
+    def _parse_and_return_quoted_string(self):
+        if not self._final:
+            m = self._quoted_string_rest_re.match(self.text, self.pos + 1, self.end)
+            if m.end() == self.end:
+                raise _NeedMoreData(_UnfinishedToken(self._quoted_string_rest_re, m.group(1)))
+            # The decoding of a unicode escape sequence (and surrogate pair) close to the end
+            # of the string may look ahead up to 10 chars past the closing quotation mark.
+            if self.end - m.end() <= 10:
+                raise _NeedMoreData()
+        return super(IncrementalJSONParser, self)._parse_and_return_quoted_string()
+
+    def _unfinished_token_at(self, rest_re, pos):
+        """ Returns the _UnfinishedToken of the rest of a token that begins at pos. """
+        return _UnfinishedToken(rest_re, rest_re.match(self.text, pos, self.end).group(1))
+
+    # Unlike the _skipped_container_token_re of the JSONParser this doesn't match a single
+    # line comment or a slash at the end of the buffered text: they may continue in the next
+    # chunk. The unterminated quoted strings and multiline comments aren't matched either.
+    _skipped_container_token_re = re.compile(
+        r'(?:[^"/\[\]{}]+|"[^"\\]*(?:\\[\s\S][^"\\]*)*"|//[^\r\n]*[\r\n]|/\*[\s\S]*?\*/|'
+        r'/(?=[^/*]))*([\[\]{}])?')
+
+    # The state of skipping an object or array that isn't selected by the select parameter.
+    # It is a separate state because a skipped value may span many chunks: the scanning of
+    # the buffered text is continued in the next step and the scanned text is dropped.
+    _SKIPPED_CONTAINER = 7
+
+    def _skip_item_value(self, c):
+        if c != '{' and c != '[':
+            super(IncrementalJSONParser, self)._skip_item_value(c)
+            return
+        # The closing brackets of the skipped containers that are still open.
+        self._skipped_closing_brackets = []
+        self._skipped_container_location = (self.line + 1, self.column + 1)
+        self._state = self._SKIPPED_CONTAINER
+
+    def _parse_skipped_container(self, c):
+        match_token = self._skipped_container_token_re.match
+        closing_brackets = self._closing_brackets
+        expected_closing_brackets = self._skipped_closing_brackets
+        text = self.text
+        end = self.end
+        pos = self.pos
+        while 1:
+            m = match_token(text, pos, end)
+            bracket = m.group(1)
+            if bracket is None:
+                if self._final:
+                    raise JSONConfigParserException(
+                        _ErrorLocation(*self._skipped_container_location),
+                        'Reached the end of stream while skipping a json value.')
+                self.skip_to(m.end())
+                self._unfinished_token = self._unfinished_skipped_token()
+                return False
+            pos = m.end()
+            closing_bracket = closing_brackets.get(bracket)
+            if closing_bracket is not None:
+                expected_closing_brackets.append(closing_bracket)
+            elif bracket != expected_closing_brackets.pop():
+                self.skip_to(pos - 1)
+                self.error('Mismatched closing bracket in a skipped json value.')
+            elif not expected_closing_brackets:
+                self.skip_to(pos)
+                self._skipped_closing_brackets = self._skipped_container_location = None
+                self._end_skipped_item()
+                return True
+
+    def _unfinished_skipped_token(self):
+        """ Returns the _UnfinishedToken of the text that the skipped container scanning
+        stopped at: the beginning of a quoted string or a comment that isn't finished. """
+        pos = self.pos
+        if self.text.startswith('"', pos, self.end):
+            return self._unfinished_token_at(self._quoted_string_rest_re, pos + 1)
+        if self.text.startswith('/*', pos, self.end):
+            return self._unfinished_token_at(self._multiline_comment_rest_re, pos + 2)
+        if self.text.startswith('//', pos, self.end):
+            return _UnfinishedToken(self._singleline_comment_rest_re)
+        return None
+
+    _step_parsers = RegexJSONParser._step_parsers + (_parse_skipped_container,)
+
+
+_engine_parser_classes = {
+    'regex': RegexJSONParser,
+    'char': JSONParser,
+}
+
+
+def engine_parser_class(params):
+    """ Returns the JSONParser class that implements the engine selected by the params. """
+    cls = _engine_parser_classes[params.engine]
+    if cls is RegexJSONParser and params.lazy_location:
+        cls = LazyLocationJSONParser
+    return cls
+
+
+def text_parser_class(json_text, params):
+    """
+    Returns the JSONParser class that can parse the json_text: the Utf8JSONParser in case of
+    binary text (python3 bytes, bytearray, mmap) and the class of the engine selected by the
+    params otherwise. A python2 str is binary text only if it starts with an UTF-8 BOM.
+    """
+    if isinstance(json_text, my_basestring) and not (
+            python2 and isinstance(json_text, bytes) and json_text.startswith(codecs.BOM_UTF8)):
+        return engine_parser_class(params)
+    return Utf8JSONParser
+
+
 class ParserListener(object):
     """ Base class for parser listeners. """
     def __init__(self):
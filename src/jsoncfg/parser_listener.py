@@ -1,5 +1,8 @@
+import decimal
+
 from kwonly_args import kwonly_defaults
 
+from .compatibility import python2, my_unicode
 from .parser import ParserListener
 
 
@@ -11,7 +14,8 @@ class ObjectBuilderParams(object):
     default_string_to_scalar_converter = None
 
     @kwonly_defaults
-    def __init__(self, object_creator=None, array_creator=None, string_to_scalar_converter=None):
+    def __init__(self, object_creator=None, array_creator=None, string_to_scalar_converter=None,
+                 intern_keys=True, dedup_values=False):
         """
         :param object_creator: A callable with signature object_creator(listener) that has to
         return a tuple: (json_object, insert_function). You can access line/column information
@@ -38,6 +42,15 @@ class ObjectBuilderParams(object):
         the unquoted "yes" and "no" literals as boolean values.
         In case of conversion error you should call listener.error() with an error message and this
         raises an exception with information about the error location, etc...
+        :param intern_keys: True: the object keys with the same content share the same string
+        object in the whole parsed json tree. This reduces the memory footprint of trees that
+        repeat the same keys in many objects and the dict lookups with these keys can succeed
+        with an identity check.
+        :param dedup_values: True: the equal immutable scalars (strings, numbers, booleans and
+        None) that have the same string representation in the json share the same python object
+        in the whole parsed json tree. In case of config trees the scalar nodes remain separate
+        (they have different locations) but they share their values. This reduces the memory
+        footprint of large trees that repeat the same values many times.
         """
         def get_default(name):
             # We use type(self).__dict__['X'] because these class attributes are often simple
@@ -49,6 +62,13 @@ class ObjectBuilderParams(object):
         self.array_creator = array_creator or get_default('default_array_creator')
         self.string_to_scalar_converter = string_to_scalar_converter or\
             get_default('default_string_to_scalar_converter')
+        self.intern_keys = intern_keys
+        self.dedup_values = dedup_values
+
+    @property
+    def listener_class(self):
+        """ The class of the parser listeners that build trees with these params. """
+        return ObjectBuilderParserListener
 
 
 class ObjectBuilderParserListener(ParserListener):
@@ -57,12 +77,32 @@ class ObjectBuilderParserListener(ParserListener):
     def __init__(self, params):
         super(ObjectBuilderParserListener, self).__init__()
         self.params = params
+        self.reset()
 
+    def reset(self, params=None, value_table=None):
+        """
+        Drops the result and makes the listener ready to build another tree.
+        :param params: The parameters for the next tree or None to keep the current ones.
+        :param value_table: In case of dedup_values the table of deduplicated values (see
+        deduplicate_value()) to be shared with other trees or None to start with an empty table.
+        """
+        if params is not None:
+            self.params = params
         self._object_key = None
         # The lambda function could actually be a None but that way we get a warning in
         # self._new_value() that the insert_function isn't callable...
         self._container_stack = [(None, None, lambda *args: None)]
         self._result = None
+        # Maps the object keys of the parsed json to their first occurrence.
+        self._key_table = {} if self.params.intern_keys else None
+        # The number of object keys that have been replaced with an earlier equal key.
+        self.deduplicated_key_count = 0
+        if not self.params.dedup_values:
+            self._value_table = None
+        else:
+            self._value_table = {} if value_table is None else value_table
+        # The number of scalars that have been replaced with an earlier equal scalar.
+        self.deduplicated_value_count = 0
 
     @property
     def result(self):
@@ -84,6 +124,9 @@ class ObjectBuilderParserListener(ParserListener):
             self._object_key = None
         elif container_type == self.ContainerType.array:
             insert_function(value)
+        else:
+            # A root value. The result is set again when a root object/array is finished.
+            self._result = value
 
     def _pop_container_stack(self):
         if len(self._container_stack) == 2:
@@ -101,6 +144,11 @@ class ObjectBuilderParserListener(ParserListener):
     def begin_object_item(self, key, key_quoted):
         if key in self._state[1]:
             self.error('Duplicate key: "%s"' % (key,))
+        if self._key_table is not None:
+            interned_key = self._key_table.setdefault(key, key)
+            if interned_key is not key:
+                key = interned_key
+                self.deduplicated_key_count += 1
         self._object_key = key
 
     def begin_array(self):
@@ -113,4 +161,82 @@ class ObjectBuilderParserListener(ParserListener):
 
     def scalar(self, scalar_str, scalar_str_quoted):
         value = self.params.string_to_scalar_converter(self.parser, scalar_str, scalar_str_quoted)
+        if self._value_table is not None:
+            value = self._deduplicate_value(value, scalar_str, scalar_str_quoted)
         self._new_value(value)
+
+    def _deduplicate_value(self, value, scalar_str, scalar_str_quoted):
+        shared_value = deduplicate_value(self._value_table, value, scalar_str, scalar_str_quoted)
+        if shared_value is not value:
+            self.deduplicated_value_count += 1
+        return shared_value
+
+
+# The types of the scalars that can be shared by the nodes of a tree.
+_immutable_scalar_types = frozenset([type(None), bool, int, float, decimal.Decimal, str,
+                                     my_unicode])
+if python2:
+    _immutable_scalar_types |= frozenset([long])
+
+
+def deduplicate_value(value_table, value, scalar_str, scalar_str_quoted):
+    """
+    Returns the first value put into the value_table with the same type and string
+    representation as the given one or the given value if it is the first one or if its
+    type isn't immutable.
+    """
+    if type(value) not in _immutable_scalar_types:
+        return value
+    return value_table.setdefault((type(value), scalar_str, scalar_str_quoted), value)
+
+
+class DocumentCollectorParserListener(ObjectBuilderParserListener):
+    """
+    An ObjectBuilderParserListener for parsers with multiple_documents=True. It builds a tree
+    for each root json value and appends the finished trees to the documents list. The user of
+    the listener can pop the documents from the list while the parsing is in progress.
+    The object keys are interned across the documents.
+    """
+    def reset(self, params=None):
+        super(DocumentCollectorParserListener, self).reset(params)
+        self.documents = []
+
+    def _pop_container_stack(self):
+        super(DocumentCollectorParserListener, self)._pop_container_stack()
+        if len(self._container_stack) == 1:
+            self.documents.append(self._result)
+
+
+class EventCollectorParserListener(ParserListener):
+    """
+    Collects the parser events into the events list as (event, value, line, column) tuples.
+    The value of object_key events is the key and the value of scalar events is the scalar
+    converted with the string_to_scalar_converter, the value of the other events is None.
+    The line and column numbers are 1 based.
+    """
+    def __init__(self, string_to_scalar_converter):
+        super(EventCollectorParserListener, self).__init__()
+        self.string_to_scalar_converter = string_to_scalar_converter
+        self.events = []
+
+    def _add_event(self, event, value=None):
+        self.events.append((event, value, self.parser.line+1, self.parser.column+1))
+
+    def begin_object(self):
+        self._add_event('begin_object')
+
+    def end_object(self):
+        self._add_event('end_object')
+
+    def begin_object_item(self, key, key_quoted):
+        self._add_event('object_key', key)
+
+    def begin_array(self):
+        self._add_event('begin_array')
+
+    def end_array(self):
+        self._add_event('end_array')
+
+    def scalar(self, scalar_str, scalar_str_quoted):
+        value = self.string_to_scalar_converter(self.parser, scalar_str, scalar_str_quoted)
+        self._add_event('scalar', value)
@@ -0,0 +1,56 @@
+"""
+Contains the pool of reusable parsers and parser listeners used by the loads() functions.
+Applications that parse lots of small json documents spend a considerable part of the time
+with the creation of parsers and listeners so the loads() functions reset and reuse them.
+"""
+from .parser import text_parser_class
+
+
+class ParserPool(object):
+    """
+    A thread-safe pool of (parser, listener) pairs grouped by parser class and listener class.
+    The listener class is the listener_class of the ObjectBuilderParams. The pool doesn't need
+    a lock because list.pop() and list.append() are atomic: a pair can't be acquired by two
+    threads.
+    """
+    def __init__(self, max_size=16):
+        """
+        :param max_size: The maximum number of idle (parser, listener) pairs kept by the pool
+        per parser class.
+        """
+        self.max_size = max_size
+        self._pairs = {}
+
+    def acquire(self, json_text, parser_params, object_builder_params):
+        """
+        Returns a (parser, listener) pair for parsing the json_text. A binary json_text
+        (python3 bytes) gets a Utf8JSONParser, other texts get the parser class of the engine
+        selected by the parser_params. The pair has to be returned with release().
+        """
+        parser_class = text_parser_class(json_text, parser_params)
+        listener_class = object_builder_params.listener_class
+        try:
+            parser, listener = self._pairs[parser_class, listener_class].pop()
+        except (KeyError, IndexError):
+            return parser_class(parser_params), listener_class(object_builder_params)
+        # The released pairs have already been reset, only the params have to be updated.
+        if parser.params is not parser_params:
+            parser.reset(parser_params)
+        if listener.params is not object_builder_params:
+            listener.reset(object_builder_params)
+        return parser, listener
+
+    def release(self, parser, listener):
+        """ Resets the parser and the listener and puts them back to the pool. """
+        # Resetting here drops the references to the parsed text and to the result.
+        parser.reset()
+        listener.reset()
+        key = type(parser), type(listener)
+        pairs = self._pairs.get(key)
+        if pairs is None:
+            pairs = self._pairs.setdefault(key, [])
+        if len(pairs) < self.max_size:
+            pairs.append((parser, listener))
+
+
+default_parser_pool = ParserPool()
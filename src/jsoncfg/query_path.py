@@ -0,0 +1,95 @@
+"""
+Contains the parsing of query paths like 'servers[3].address'. This is the same format as
+the relative_path of JSONConfigValueNotFoundError: object keys are prefixed with a dot (the
+dot is optional at the beginning of the path) and array indexes are in square brackets.
+The '*' wildcard (as '.*' or '[*]') matches any object key and any array index.
+"""
+import re
+
+
+WILDCARD = '*'
+
+_component_re = re.compile(r'\.([^.\[\]]+)|\[(\d+|\*)\]')
+
+
+def parse_query_path(path):
+    """
+    Returns the list of the components of the query path: strings for object keys and
+    integers for array indexes. The wildcard component is WILDCARD. The empty path
+    refers to the root and its component list is empty.
+    """
+    if path and path[0] not in '.[':
+        path = '.' + path
+    components = []
+    pos = 0
+    while pos < len(path):
+        m = _component_re.match(path, pos)
+        if not m:
+            raise ValueError('Invalid query path: %r (error at position %s)' % (path, pos))
+        key, index = m.groups()
+        if key is not None:
+            components.append(key)
+        elif index == WILDCARD:
+            components.append(WILDCARD)
+        else:
+            components.append(int(index))
+        pos = m.end()
+    return components
+
+
+class _SelectAll(object):
+    def __repr__(self):
+        return 'SELECT_ALL'
+
+    def __reduce__(self):
+        # Unpickled as the SELECT_ALL singleton of this module.
+        return 'SELECT_ALL'
+
+
+# The selection tree node of the values that are selected with all of their descendants.
+SELECT_ALL = _SelectAll()
+
+
+def compile_selection_tree(paths):
+    """
+    Compiles a set of query paths into a selection tree: a dict that maps the object keys and
+    array indexes of a container to the selection trees of its items. The selected items
+    without further path components map to SELECT_ALL. The WILDCARD entry of a dict applies
+    to the items that don't have their own entries and it has already been merged into the
+    entries of the other items. Returns SELECT_ALL if one of the paths selects the root.
+    """
+    tree = {}
+    for path in paths:
+        components = parse_query_path(path)
+        if not components:
+            return SELECT_ALL
+        node = tree
+        for component in components[:-1]:
+            child = node.setdefault(component, {})
+            if child is SELECT_ALL:
+                break
+            node = child
+        else:
+            node[components[-1]] = SELECT_ALL
+    _merge_wildcards(tree)
+    return tree
+
+
+def _merge_trees(tree1, tree2):
+    if tree1 is SELECT_ALL or tree2 is SELECT_ALL:
+        return SELECT_ALL
+    tree = dict(tree1)
+    for component, child in tree2.items():
+        tree[component] = _merge_trees(tree[component], child) if component in tree else child
+    return tree
+
+
+def _merge_wildcards(tree):
+    wildcard_tree = tree.get(WILDCARD)
+    if wildcard_tree is not None:
+        for component in tree:
+            if component != WILDCARD:
+                tree[component] = _merge_trees(tree[component], wildcard_tree)
+    for child in tree.values():
+        if child is not SELECT_ALL:
+            _merge_wildcards(child)
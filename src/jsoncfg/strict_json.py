@@ -0,0 +1,120 @@
+"""
+A fast path for the loads() functions: most of the loaded json strings are strict json (no
+comments, unquoted keys or trailing commas) and these can be parsed with the C accelerated
+scanner of the standard json module. The functions of this module return None if the fast path
+can't produce exactly the same result as the JSONParser and in that case the caller has to fall
+back to the JSONParser. This includes the parse errors (e.g.: duplicate keys) because only
+the JSONParser can report them with the line/column info of the error.
+"""
+import json
+from collections import OrderedDict
+
+from .compatibility import my_unicode, my_recursion_error
+from .tree_python import (
+    DefaultObjectCreator, DefaultArrayCreator, DefaultStringToScalarConverter,
+    default_number_converter,
+)
+from .tree_config import DeferredNodeLocations, config_tree_from_python_tree
+
+
+class _NotHandledByFastPath(Exception):
+    pass
+
+
+def _raise_not_handled(*args):
+    raise _NotHandledByFastPath()
+
+
+def _object_pairs_hook(dict_class):
+    if dict_class in (dict, OrderedDict):
+        def object_pairs_hook(pairs):
+            obj = dict_class(pairs)
+            if len(obj) != len(pairs):
+                # duplicate key
+                raise _NotHandledByFastPath()
+            return obj
+    else:
+        def object_pairs_hook(pairs):
+            obj = dict_class()
+            for key, value in pairs:
+                if key in obj:
+                    raise _NotHandledByFastPath()
+                obj[key] = value
+            return obj
+    return object_pairs_hook
+
+
+_decoders = {}
+
+
+def _get_decoder(dict_class):
+    decoder = _decoders.get(dict_class)
+    if decoder is None:
+        # NaN, Infinity and -Infinity aren't json but the json module accepts them by default.
+        # The strict=True rejects the tab char in quoted strings but the JSONParser accepts it
+        # so in that case we fall back to the JSONParser.
+        decoder = json.JSONDecoder(object_pairs_hook=_object_pairs_hook(dict_class),
+                                   parse_constant=_raise_not_handled, strict=True)
+        _decoders[dict_class] = decoder
+    return decoder
+
+
+def _is_default_scalar_converter(string_to_scalar_converter):
+    """ Returns True if the converter interprets the scalars exactly like the json module. """
+    if type(string_to_scalar_converter) is not DefaultStringToScalarConverter:
+        return False
+    if string_to_scalar_converter.number_converter is not default_number_converter:
+        return False
+    literals = string_to_scalar_converter.scalar_const_literals
+    return len(literals) == 3 and literals.get('null', 0) is None and\
+        literals.get('true') is True and literals.get('false') is False
+
+
+def _decode(s, parser_params, dict_class):
+    # The stdlib decoder can't skip the values that aren't selected by the select parameter
+    # and it doesn't report the max_depth errors with the location of the error.
+    if not parser_params.stdlib_fast_path or parser_params.selection_tree is not None or\
+            parser_params.max_depth is not None or not isinstance(s, my_unicode):
+        return None
+    try:
+        result = _get_decoder(dict_class).decode(s)
+    except (ValueError, _NotHandledByFastPath, my_recursion_error):
+        # The C scanner of the json module is recursive, deeply nested json is parsed by the
+        # JSONParser that doesn't have a nesting limit.
+        return None
+    # The JSONParser rejects the scalar roots and the root container of the wrong type.
+    if not isinstance(result, list if parser_params.root_is_array else dict_class):
+        return None
+    return result
+
+
+def loads_python_tree(s, parser_params, object_builder_params):
+    """
+    :return: The same python object hierarchy as the one built by ObjectBuilderParserListener
+    or None if the fast path can't be used.
+    """
+    object_creator = object_builder_params.object_creator
+    array_creator = object_builder_params.array_creator
+    # The json module doesn't deduplicate the values.
+    if object_builder_params.dedup_values or\
+            type(object_creator) is not DefaultObjectCreator or\
+            type(array_creator) is not DefaultArrayCreator or\
+            array_creator.list_class is not list or\
+            not _is_default_scalar_converter(object_builder_params.string_to_scalar_converter):
+        return None
+    return _decode(s, parser_params, object_creator.dict_class)
+
+
+def loads_config_tree(s, parser_params, string_to_scalar_converter, memoize_values=False):
+    """
+    :return: The same config tree as the one built with ConfigObjectBuilderParams or None if
+    the fast path can't be used. The locations of the config nodes are resolved on demand by
+    parsing the json string again with the JSONParser.
+    """
+    if not _is_default_scalar_converter(string_to_scalar_converter):
+        return None
+    result = _decode(s, parser_params, OrderedDict)
+    if result is None:
+        return None
+    return config_tree_from_python_tree(result, DeferredNodeLocations(s, parser_params),
+                                        memoize_values)
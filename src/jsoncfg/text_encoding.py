@@ -1,3 +1,8 @@
+import codecs
+import itertools
+import mmap
+from contextlib import contextmanager
+
 from .compatibility import python2, my_basestring
 
 
@@ -55,10 +60,198 @@ def detect_encoding_and_remove_bom(buf, default_encoding='UTF-8'):
     """
     if not isinstance(buf, bytes):
         raise TypeError('buf should be a bytes instance but it is a %s: ' % type(buf).__name__)
+    bom_length, encoding = detect_encoding(buf, default_encoding)
+    if bom_length:
+        buf = buf[bom_length:]
+    return buf, encoding
+
+
+def detect_encoding(buf, default_encoding='UTF-8'):
+    """
+    :param buf: The beginning of the binary file contents with an optional BOM prefix.
+    At least 4 bytes are needed (if the file isn't shorter) to detect all kinds of BOM.
+    Besides bytes it can be any buffer with a bytes.find() compatible method (e.g.: mmap),
+    the buffer isn't sliced.
+    :param default_encoding: The encoding to be used if the buffer
+    doesn't have a BOM prefix.
+    :return: (bom_length, encoding)
+    """
     for bom, encoding in _byte_order_marks:
-        if buf.startswith(bom):
-            return buf[len(bom):], encoding
-    return buf, default_encoding
+        if buf.find(bom, 0, len(bom)) == 0:
+            return len(bom), encoding
+    return 0, default_encoding
+
+
+def read_file_chunks(file_, chunk_size=64*1024):
+    """
+    A generator that reads the file-like object in chunks until the end of the file.
+    A buffered binary file is read with its read1() method that doesn't wait for a whole
+    chunk: the data of a pipe or socket is yielded as soon as it arrives.
+    """
+    read = getattr(file_, 'read1', file_.read)
+    while 1:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def decode_utf_text_chunks(chunks, default_encoding='UTF-8', use_utf8_strings=True):
+    """
+    A generator that decodes the binary contents of a file incrementally. The encoding is
+    detected based on the BOM prefix of the first chunks.
+    :param chunks: An iterable of bytes instances, the binary file contents with an optional
+    BOM prefix.
+    :param default_encoding: The encoding to be used if the file doesn't have a BOM prefix.
+    :param use_utf8_strings: The same as in case of decode_utf_text_buffer().
+    :return: Yields non-empty unicode objects. In case of python2 these can optionally be
+    str objects containing utf-8 encoded text.
+    """
+    chunks = iter(chunks)
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= 4:
+            break
+    bom_length, encoding = detect_encoding(head, default_encoding)
+    head = head[bom_length:]
+
+    if python2 and use_utf8_strings and are_encoding_names_equivalent(encoding, 'UTF-8'):
+        if head:
+            yield head
+        for chunk in chunks:
+            yield chunk
+        return
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in itertools.chain((head,), chunks):
+        text = decoder.decode(chunk)
+        if text:
+            yield text.encode('UTF-8') if python2 and use_utf8_strings else text
+    text = decoder.decode(b'', True)
+    if text:
+        yield text.encode('UTF-8') if python2 and use_utf8_strings else text
+
+
+def load_utf_text_file_chunks(file_, default_encoding='UTF-8', use_utf8_strings=True,
+                              chunk_size=64*1024, use_mmap=False):
+    """
+    A generator that works like load_utf_text_file() but instead of reading the whole file
+    into memory it reads and decodes the file in chunks and yields the decoded text chunks.
+    :param file_: The path to the loadable text file or a file-like object with a read() method.
+    :param chunk_size: The number of bytes to read at once.
+    :param use_mmap: True means that the chunks are read from a read-only memory map of the
+    file instead of reading them with file_.read().
+    """
+    read_chunks = _read_mapped_file_chunks if use_mmap else read_file_chunks
+    if isinstance(file_, my_basestring):
+        with open(file_, 'rb') as f:
+            for text in decode_utf_text_chunks(read_chunks(f, chunk_size),
+                                               default_encoding, use_utf8_strings):
+                yield text
+    else:
+        for text in decode_utf_text_chunks(read_chunks(file_, chunk_size),
+                                           default_encoding, use_utf8_strings):
+            yield text
+
+
+def map_utf_text_file(file_, default_encoding='UTF-8', use_utf8_strings=True):
+    """
+    Works like load_utf_text_file() but instead of reading the file into a bytes object it
+    maps the file into memory and decodes the text directly from the mapped pages. This saves
+    a copy of the file contents and processes loading the same file share the page cache.
+    Files that can't be mapped (e.g.: empty files or file-like objects without a real file
+    descriptor) and file objects that aren't at the beginning of the file are loaded with
+    file_.read().
+    :param file_: The path to the loadable text file or a file object with a fileno() method.
+    """
+    with open_utf_text_file(file_, default_encoding, use_utf8_strings, use_mmap=True) as text:
+        return text
+
+
+@contextmanager
+def open_utf_text_file(file_, default_encoding='UTF-8', use_utf8_strings=True, use_mmap=False,
+                       utf8_bytes=False):
+    """
+    A context manager that loads the text file like load_utf_text_file() and yields the
+    contents of the file.
+    :param use_mmap: True means that the file is mapped into memory (see map_utf_text_file())
+    and the map is closed when the context exits.
+    :param utf8_bytes: True means that UTF-8 files aren't decoded: the yielded contents is the
+    binary contents of the file (a bytes or an mmap object) with its optional BOM prefix.
+    This can be parsed with the Utf8JSONParser. Files with other encodings are decoded.
+    """
+    with _open_binary_file(file_) as f:
+        with _binary_file_contents(f, use_mmap) as buf:
+            bom_length, encoding = detect_encoding(buf, default_encoding)
+            if utf8_bytes and are_encoding_names_equivalent(encoding, 'UTF-8'):
+                yield buf
+            elif isinstance(buf, bytes):
+                yield decode_utf_text_buffer(buf, default_encoding, use_utf8_strings)
+            else:
+                yield _decode_mapped_buffer(buf, bom_length, encoding, use_utf8_strings)
+
+
+@contextmanager
+def _open_binary_file(file_):
+    if isinstance(file_, my_basestring):
+        with open(file_, 'rb') as f:
+            yield f
+    else:
+        yield file_
+
+
+@contextmanager
+def _binary_file_contents(f, use_mmap):
+    """ Yields the bytes or the mmap of the file contents. """
+    mapped = _map_file(f) if use_mmap else None
+    if mapped is None:
+        yield f.read()
+        return
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+
+def _map_file(f):
+    """ Returns a read-only mmap of the file or None if the file can't be mapped. """
+    try:
+        # The map would start at the beginning of the file but f.read() reads the file
+        # from its current position.
+        if f.tell() != 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, AttributeError, EnvironmentError):
+        # ValueError: empty file or io.UnsupportedOperation (no file descriptor).
+        # EnvironmentError: a file that doesn't support mapping (e.g.: a pipe or /dev/stdin).
+        return None
+
+
+def _decode_mapped_buffer(mapped, bom_length, encoding, use_utf8_strings):
+    if python2:
+        # The python2 mmap doesn't support the new buffer protocol.
+        buf = mapped[bom_length:]
+        if use_utf8_strings:
+            if are_encoding_names_equivalent(encoding, 'UTF-8'):
+                return buf
+            return buf.decode(encoding).encode('UTF-8')
+        return buf.decode(encoding)
+    with memoryview(mapped) as view:
+        return codecs.decode(view[bom_length:], encoding)
+
+
+def _read_mapped_file_chunks(f, chunk_size):
+    mapped = _map_file(f)
+    if mapped is None:
+        for chunk in read_file_chunks(f, chunk_size):
+            yield chunk
+        return
+    try:
+        for chunk in read_file_chunks(mapped, chunk_size):
+            yield chunk
+    finally:
+        mapped.close()
 
 
 _byte_order_marks = (
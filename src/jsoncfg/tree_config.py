@@ -9,20 +9,48 @@ an exception with useful message when a required config value is missing. The ex
 message helps to locate the error in the config file (line/column number and sometimes
 some other info).
 """
+import copy
+import threading
+
 from kwonly_args import kwonly_defaults
 
-from .parser_listener import ObjectBuilderParams
-from .config_classes import ConfigJSONObject, ConfigJSONArray, ConfigJSONScalar
+from .compatibility import my_basestring, my_ordered_dict, my_xrange
+from .parser import JSONParser, ParserListener, text_parser_class
+from .parser_listener import ObjectBuilderParams, ObjectBuilderParserListener
+from .parser_pool import default_parser_pool
+from .line_index import LineIndex, Utf8LineIndex
+from .config_classes import (
+    ConfigJSONObject, ConfigJSONArray, ConfigJSONScalar, LazyConfigJSONObject,
+    LazyConfigJSONArray, _UnparsedValue,
+)
 from .tree_python import DefaultStringToScalarConverter
 
 
+def _node_location_args(parser):
+    """
+    Returns the (line, column, deferred_locations) args of the config node at the current
+    position of the parser. If possible the node stores only its offset and the line/column
+    is resolved on demand with the line index of the json text that is shared by the nodes.
+    """
+    if parser.offset_locations:
+        return None, parser.pos, parser.line_index
+    return parser.line+1, parser.column+1, None
+
+
+def _memoize_values(listener):
+    # The creators can be used also with other ObjectBuilderParams.
+    return getattr(listener.params, 'memoize_values', False)
+
+
 def config_object_creator(listener):
-    obj = ConfigJSONObject(listener.parser.line+1, listener.parser.column+1)
+    obj = ConfigJSONObject(*_node_location_args(listener.parser),
+                           memoize_value=_memoize_values(listener))
     return obj, obj._insert
 
 
 def config_array_creator(listener):
-    array = ConfigJSONArray(listener.parser.line+1, listener.parser.column+1)
+    array = ConfigJSONArray(*_node_location_args(listener.parser),
+                            memoize_value=_memoize_values(listener))
     return array, array._append
 
 
@@ -40,7 +68,7 @@ class ConfigStringToScalarConverter(object):
 
     def __call__(self, listener, scalar_str, scalar_str_quoted):
         scalar = self.string_to_scalar_converter(listener, scalar_str, scalar_str_quoted)
-        return ConfigJSONScalar(scalar, listener.line+1, listener.column+1)
+        return ConfigJSONScalar(scalar, *_node_location_args(listener))
 
 
 class ConfigObjectBuilderParams(ObjectBuilderParams):
@@ -49,6 +77,221 @@ class ConfigObjectBuilderParams(ObjectBuilderParams):
     default_string_to_scalar_converter = ConfigStringToScalarConverter()
 
     @kwonly_defaults
-    def __init__(self, string_to_scalar_converter=DefaultStringToScalarConverter()):
+    def __init__(self, string_to_scalar_converter=DefaultStringToScalarConverter(),
+                 intern_keys=True, dedup_values=False, memoize_values=False):
+        """
+        :param memoize_values: True: the unwrapped values of the objects and arrays are built
+        only by their first call and the next calls return the same read-only value.
+        """
         super(ConfigObjectBuilderParams, self).__init__(
-            string_to_scalar_converter=ConfigStringToScalarConverter(string_to_scalar_converter))
+            string_to_scalar_converter=ConfigStringToScalarConverter(string_to_scalar_converter),
+            intern_keys=intern_keys,
+            dedup_values=dedup_values,
+        )
+        self.memoize_values = memoize_values
+
+    @property
+    def listener_class(self):
+        return ConfigObjectBuilderParserListener
+
+
+class ConfigObjectBuilderParserListener(ObjectBuilderParserListener):
+    """
+    An ObjectBuilderParserListener for config trees. In case of dedup_values the scalar nodes
+    remain separate (they have different locations) but they share their values.
+    """
+    def _deduplicate_value(self, value, scalar_str, scalar_str_quoted):
+        if isinstance(value, ConfigJSONScalar):
+            value.value = super(ConfigObjectBuilderParserListener, self)._deduplicate_value(
+                value.value, scalar_str, scalar_str_quoted)
+            return value
+        return super(ConfigObjectBuilderParserListener, self)._deduplicate_value(
+            value, scalar_str, scalar_str_quoted)
+
+
+class _NodeLocationRecorder(ParserListener):
+    """ Records the zero based (line, column) of the json nodes in the order they are parsed. """
+    def __init__(self):
+        super(_NodeLocationRecorder, self).__init__()
+        self.locations = []
+
+    def _record_location(self):
+        self.locations.append((self.parser.line, self.parser.column))
+
+    def begin_object(self):
+        self._record_location()
+
+    def end_object(self):
+        pass
+
+    def begin_object_item(self, key, key_quoted):
+        pass
+
+    def begin_array(self):
+        self._record_location()
+
+    def end_array(self):
+        pass
+
+    def scalar(self, scalar_str, scalar_str_quoted):
+        self._record_location()
+
+
+class DeferredNodeLocations(object):
+    """
+    Resolves the locations of config nodes that were built without line/column info
+    (see config_tree_from_python_tree()). The nodes are identified by their index in the
+    pre-order traversal of the tree. The first location query parses the json text again
+    to collect the locations of all nodes so this object keeps a reference to the json text.
+    The config tree can be queried from several threads so the parsing is guarded by a lock.
+    """
+    def __init__(self, json_text, parser_params):
+        self.json_text = json_text
+        self.parser_params = parser_params
+        self._locations = None
+        self._lock = threading.Lock()
+
+    def location(self, node_index):
+        if self._locations is None:
+            with self._lock:
+                # Another thread may have collected the locations while we were waiting.
+                if self._locations is None:
+                    recorder = _NodeLocationRecorder()
+                    JSONParser(self.parser_params).parse(self.json_text, recorder)
+                    self._locations = recorder.locations
+                    self.json_text = None
+        return self._locations[node_index]
+
+
+class RecordedNodeLocations(object):
+    """
+    Works like DeferredNodeLocations but with node locations that have been recorded while
+    the tree was built, for example by a LocationRecordingObjectBuilderParserListener.
+    A python tree with its recorded locations is a compact picklable form of a config tree.
+    """
+    def __init__(self, locations):
+        """
+        :param locations: The 1 based (line, column) of the nodes in pre-order.
+        """
+        self.locations = locations
+
+    def location(self, node_index):
+        line, column = self.locations[node_index]
+        return line-1, column-1
+
+
+class LocationRecordingObjectBuilderParserListener(ObjectBuilderParserListener):
+    """
+    An ObjectBuilderParserListener that records the 1 based (line, column) of the json nodes
+    in pre-order while it builds the tree. The python tree can be turned into a config tree
+    later with config_tree_from_python_tree(tree, RecordedNodeLocations(locations)).
+    """
+    def reset(self, params=None):
+        super(LocationRecordingObjectBuilderParserListener, self).reset(params)
+        self.locations = []
+
+    def _record_location(self):
+        self.locations.append((self.parser.line+1, self.parser.column+1))
+
+    def begin_object(self):
+        self._record_location()
+        super(LocationRecordingObjectBuilderParserListener, self).begin_object()
+
+    def begin_array(self):
+        self._record_location()
+        super(LocationRecordingObjectBuilderParserListener, self).begin_array()
+
+    def scalar(self, scalar_str, scalar_str_quoted):
+        self._record_location()
+        super(LocationRecordingObjectBuilderParserListener, self).scalar(scalar_str,
+                                                                          scalar_str_quoted)
+
+
+def config_tree_from_python_tree(value, deferred_locations, memoize_values=False):
+    """
+    Wraps a python object hierarchy (dicts, lists and scalars) into config nodes. The
+    locations of the nodes are deferred: they are resolved by deferred_locations.
+    :param value: A python object hierarchy built from the json text of deferred_locations.
+    The key order of the dicts has to be the same as in the json text.
+    :param memoize_values: See ConfigObjectBuilderParams.
+    """
+    # The tree is wrapped without recursion because the nesting depth of the json isn't
+    # limited. The stack items are (value, items_of_the_parent_node, key_in_the_parent).
+    root = [None]
+    stack = [(value, root, 0)]
+    node_index = 0
+    while stack:
+        value, parent_items, key = stack.pop()
+        if isinstance(value, dict):
+            node = ConfigJSONObject(None, node_index, deferred_locations, memoize_values)
+            # The keys are inserted in advance to keep their order.
+            node._dict = items = my_ordered_dict((item_key, None) for item_key in value)
+            stack.extend((item, items, item_key)
+                         for item_key, item in reversed(list(value.items())))
+        elif isinstance(value, list):
+            node = ConfigJSONArray(None, node_index, deferred_locations, memoize_values)
+            node._list = items = [None] * len(value)
+            stack.extend((value[index], items, index)
+                         for index in my_xrange(len(value) - 1, -1, -1))
+        else:
+            node = ConfigJSONScalar(value, None, node_index, deferred_locations)
+        parent_items[key] = node
+        node_index += 1
+    return root[0]
+
+
+class LazyConfigSource(object):
+    """
+    Parses the item values of the containers of a lazy config tree when they are accessed
+    for the first time. Keeps a reference to the json text as long as the tree is alive.
+    """
+    def __init__(self, json_text, parser_params, object_builder_params):
+        self.json_text = json_text
+        # The items of the lazy root are parsed one level deeper than the root.
+        if parser_params.max_depth is not None:
+            parser_params = copy.copy(parser_params)
+            parser_params.max_depth -= 1
+        self.parser_params = parser_params
+        self.object_builder_params = object_builder_params
+        line_index_class = LineIndex if isinstance(json_text, my_basestring) else Utf8LineIndex
+        self.line_index = line_index_class(json_text, parser_params.tab_size)
+        # The values are deduplicated across the separately parsed item values.
+        self.value_table = {} if object_builder_params.dedup_values else None
+
+    def parse_value(self, pos):
+        """ Returns the config node of the json value at the pos offset of the json text. """
+        parser, listener = default_parser_pool.acquire(self.json_text, self.parser_params,
+                                                       self.object_builder_params)
+        try:
+            if self.value_table is not None:
+                listener.reset(value_table=self.value_table)
+            parser.parse_value(self.json_text, listener, pos, self.line_index)
+            return listener.result
+        finally:
+            default_parser_pool.release(parser, listener)
+
+
+def lazy_config_tree(json_text, parser_params, object_builder_params):
+    """
+    Builds a config tree with a LazyConfigJSONObject or LazyConfigJSONArray root. Only the
+    structure of the root is parsed here, the values of its items are skipped with a bracket
+    matcher and they are parsed when they are accessed for the first time. The syntax errors
+    in the item values are raised at that time with the same line/column as in case of a
+    full parse.
+    :param object_builder_params: The ConfigObjectBuilderParams of the item values.
+    """
+    if parser_params.selection_tree is not None:
+        raise ValueError('The select parser parameter isn\'t supported by lazy config trees.')
+    parser = text_parser_class(json_text, parser_params)(parser_params)
+    root_pos, items = parser.scan_root_items(json_text)
+    source = LazyConfigSource(json_text, parser_params, object_builder_params)
+    line, column = source.line_index.location(root_pos)
+    if parser_params.root_is_array:
+        root = LazyConfigJSONArray(line+1, column+1, source,
+                                   object_builder_params.memoize_values)
+        root._list = [_UnparsedValue(pos) for _, pos in items]
+    else:
+        root = LazyConfigJSONObject(line+1, column+1, source,
+                                    object_builder_params.memoize_values)
+        root._dict = my_ordered_dict((key, _UnparsedValue(pos)) for key, pos in items)
+    return root
@@ -6,9 +6,13 @@ but our parser allows an extended syntax (unquoted keys, comments, trailing comm
 and this parser have other extras, for example you can provide your own dictionary
 and list objects.
 """
+import decimal
 from collections import OrderedDict
 
-from .parser_listener import ObjectBuilderParams
+from kwonly_args import kwonly_defaults
+
+from .parser import ParserListener
+from .parser_listener import ObjectBuilderParams, ObjectBuilderParserListener, deduplicate_value
 
 
 class DefaultObjectCreator(object):
@@ -58,15 +62,41 @@ class DefaultArrayCreator(object):
         return array, append_function
 
 
+def _convert_number(number_str, float_class):
+    if number_str.isdigit() or (number_str[:1] == '-' and number_str[1:].isdigit()):
+        return int(number_str)
+    value = float_class(number_str)
+    # Besides the numbers float() and Decimal() accept nan, inf, infinity and underscores
+    # between the digits. Checking the last char rejects the former, it is cheaper than a regex.
+    if number_str[-1] not in _number_end_chars or '_' in number_str:
+        raise ValueError('Invalid number: %s' % (number_str,))
+    return value
+
+
+_number_end_chars = frozenset('0123456789.')
+
+
 def default_number_converter(number_str):
     """
     Converts the string representation of a json number into its python object equivalent, an
-    int, long, float or whatever type suits.
+    int, long or float. Raises ValueError if number_str isn't a number (e.g.: nan or inf).
+    """
+    return _convert_number(number_str, float)
+
+
+def decimal_number_converter(number_str):
+    """
+    The same as default_number_converter() but the numbers with a fraction or exponent are
+    converted into decimal.Decimal objects instead of floats so they don't lose precision.
     """
-    is_int = (number_str.startswith('-') and number_str[1:].isdigit()) or number_str.isdigit()
-    # FIXME: this handles a wider range of numbers than allowed by the json standard,
-    # etc.: float('nan') and float('inf'). But is this a problem?
-    return int(number_str) if is_int else float(number_str)
+    return _convert_number(number_str, _to_decimal)
+
+
+def _to_decimal(number_str):
+    try:
+        return decimal.Decimal(number_str)
+    except decimal.InvalidOperation:
+        raise ValueError('Invalid number: %s' % (number_str,))
 
 
 class DefaultStringToScalarConverter(object):
@@ -78,7 +108,8 @@ class DefaultStringToScalarConverter(object):
     """
     def __init__(self,
                  number_converter=default_number_converter,
-                 scalar_const_literals=None):
+                 scalar_const_literals=None,
+                 cache_size=0):
         """
 
         :param number_converter: This number converter will be called with every non-quoted
@@ -88,14 +119,22 @@ class DefaultStringToScalarConverter(object):
         If you don't supply this parameter then the default dictionary
         that will be used is {'null': None, 'true': True, 'false': False}. Note that
         you can use this parameter to easily define your own "constants" in the json file.
+        :param cache_size: The maximum number of the converted non-quoted strings remembered by
+        this converter. The cached strings aren't passed to the number_converter again. Json
+        files that repeat the same numbers many times (e.g.: 0, 1, 0.5) load faster with a
+        cache. The first cache_size different numbers are cached. Defaults to 0 (no cache).
+        The number_converter must return immutable objects if the cache is used.
         """
         self.number_converter = number_converter
+        self.cache_size = cache_size
         if scalar_const_literals is None:
             self.scalar_const_literals = {'null': None, 'true': True, 'false': False}
         else:
             self.scalar_const_literals = scalar_const_literals
+        # Maps the converted non-quoted strings to the return values of the number_converter.
+        self._number_cache = {}
 
-    _not_scalar_const_literal = object()
+    _not_converted = object()
 
     def __call__(self, listener, scalar_str, scalar_str_quoted):
         """
@@ -106,12 +145,16 @@ class DefaultStringToScalarConverter(object):
         if scalar_str_quoted:
             return scalar_str
 
-        value = self.scalar_const_literals.get(scalar_str, self._not_scalar_const_literal)
-        if value is self._not_scalar_const_literal:
-            try:
-                value = self.number_converter(scalar_str)
-            except ValueError:
-                listener.error('Invalid json scalar: "%s"' % (scalar_str,))
+        value = self.scalar_const_literals.get(scalar_str, self._not_converted)
+        if value is self._not_converted:
+            value = self._number_cache.get(scalar_str, self._not_converted)
+            if value is self._not_converted:
+                try:
+                    value = self.number_converter(scalar_str)
+                except ValueError:
+                    listener.error('Invalid json scalar: "%s"' % (scalar_str,))
+                if len(self._number_cache) < self.cache_size:
+                    self._number_cache[scalar_str] = value
         return value
 
 
@@ -119,3 +162,135 @@ class PythonObjectBuilderParams(ObjectBuilderParams):
     default_object_creator = DefaultObjectCreator()
     default_array_creator = DefaultArrayCreator()
     default_string_to_scalar_converter = DefaultStringToScalarConverter()
+
+    @kwonly_defaults
+    def __init__(self, object_creator=None, array_creator=None, string_to_scalar_converter=None,
+                 intern_keys=True, dedup_values=False, fast_tree_builder=True):
+        """
+        :param fast_tree_builder: True: the trees are built by a PythonTreeBuilderParserListener
+        if the object_creator and the array_creator are the default ones (with dict or
+        OrderedDict and list). False: the trees are always built by an
+        ObjectBuilderParserListener that calls the object and array creators.
+        """
+        super(PythonObjectBuilderParams, self).__init__(
+            object_creator=object_creator,
+            array_creator=array_creator,
+            string_to_scalar_converter=string_to_scalar_converter,
+            intern_keys=intern_keys,
+            dedup_values=dedup_values,
+        )
+        self.fast_tree_builder = fast_tree_builder
+
+    @property
+    def listener_class(self):
+        if self.fast_tree_builder and PythonTreeBuilderParserListener.can_build(self):
+            return PythonTreeBuilderParserListener
+        return ObjectBuilderParserListener
+
+
+class PythonTreeBuilderParserListener(ParserListener):
+    """
+    Builds the same python object hierarchy as an ObjectBuilderParserListener with the default
+    object and array creators but faster: it creates the dicts and lists directly instead of
+    calling the creators and the insert/append functions returned by them.
+    """
+    def __init__(self, params):
+        """
+        :param params: PythonObjectBuilderParams that can_build() accepts.
+        """
+        super(PythonTreeBuilderParserListener, self).__init__()
+        self.params = params
+        self.reset()
+
+    @staticmethod
+    def can_build(params):
+        """ Returns True if this listener can build the trees of the given params. """
+        return type(params.object_creator) is DefaultObjectCreator and\
+            params.object_creator.dict_class in (dict, OrderedDict) and\
+            type(params.array_creator) is DefaultArrayCreator and\
+            params.array_creator.list_class is list
+
+    def reset(self, params=None, value_table=None):
+        """ The same as ObjectBuilderParserListener.reset(). """
+        if params is not None:
+            self.params = params
+        self._dict_class = self.params.object_creator.dict_class
+        self._string_to_scalar_converter = self.params.string_to_scalar_converter
+        # The DefaultStringToScalarConverter returns the quoted strings as they are.
+        self._convert_quoted_strings = type(self._string_to_scalar_converter) is not\
+            DefaultStringToScalarConverter
+        # The currently open container and its append method. The append method is None in
+        # case of objects, the items of those are inserted with the _object_key.
+        self._container = None
+        self._append = self._set_result
+        self._object_key = None
+        # The (container, append) pairs of the parent containers.
+        self._container_stack = []
+        self._result = None
+        self._key_table = {} if self.params.intern_keys else None
+        self.deduplicated_key_count = 0
+        if not self.params.dedup_values:
+            self._value_table = None
+        else:
+            self._value_table = {} if value_table is None else value_table
+        self.deduplicated_value_count = 0
+
+    @property
+    def result(self):
+        """ This property holds the parsed object or array after a successful parsing. """
+        return self._result
+
+    def _set_result(self, value):
+        self._result = value
+
+    def begin_object(self):
+        obj = self._dict_class()
+        if self._append is None:
+            self._container[self._object_key] = obj
+        else:
+            self._append(obj)
+        self._container_stack.append((self._container, self._append))
+        self._container = obj
+        self._append = None
+
+    def end_object(self):
+        self._container, self._append = self._container_stack.pop()
+
+    def begin_object_item(self, key, key_quoted):
+        if key in self._container:
+            self.error('Duplicate key: "%s"' % (key,))
+        if self._key_table is not None:
+            interned_key = self._key_table.setdefault(key, key)
+            if interned_key is not key:
+                key = interned_key
+                self.deduplicated_key_count += 1
+        self._object_key = key
+
+    def begin_array(self):
+        array = []
+        if self._append is None:
+            self._container[self._object_key] = array
+        else:
+            self._append(array)
+        self._container_stack.append((self._container, self._append))
+        self._container = array
+        self._append = array.append
+
+    def end_array(self):
+        self._container, self._append = self._container_stack.pop()
+
+    def scalar(self, scalar_str, scalar_str_quoted):
+        if scalar_str_quoted and not self._convert_quoted_strings:
+            value = scalar_str
+        else:
+            value = self._string_to_scalar_converter(self.parser, scalar_str, scalar_str_quoted)
+        if self._value_table is not None:
+            shared_value = deduplicate_value(self._value_table, value, scalar_str,
+                                             scalar_str_quoted)
+            if shared_value is not value:
+                value = shared_value
+                self.deduplicated_value_count += 1
+        if self._append is None:
+            self._container[self._object_key] = value
+        else:
+            self._append(value)
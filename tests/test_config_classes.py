@@ -1,13 +1,17 @@
+import copy
+import pickle
 from unittest import TestCase
 from jsoncfg.config_classes import (
     ValueNotFoundNode, ConfigJSONScalar, ConfigJSONObject, ConfigJSONArray, JSONConfigNodeTypeError, ConfigNode,
-    JSONConfigIndexError,
+    JSONConfigIndexError, ReadOnlyDict, ReadOnlyList, CompiledQuery,
 )
 from jsoncfg import JSONConfigValueNotFoundError, JSONParserParams, JSONValueMapper
 from jsoncfg import (
     loads_config, node_location, node_exists, node_is_object, node_is_array,
     node_is_scalar, ensure_exists, expect_object, expect_array, expect_scalar,
+    invalidate_memoized_values, compile_query, compile_queries, fetch_many,
 )
+from jsoncfg.value_mappers import require_integer
 
 from .utils import WrapCallable
 
@@ -48,6 +52,29 @@ class TestValueNotFoundNode(TestCase):
         case1 = not_found_node['a']['b']
         self.assertRaises(JSONConfigValueNotFoundError, case1)
 
+    def test_missing_query_path(self):
+        config = loads_config('{a: {}}')
+        node = config.a.b
+        deeper_node = node[3].c
+        self.assertIs(deeper_node._parent_config_node, config.a)
+        self.assertListEqual(deeper_node._missing_query_path, ['b', 3, 'c'])
+        self.assertListEqual(node._missing_query_path, ['b'])
+        self.assertRaisesRegexp(JSONConfigValueNotFoundError,
+                                r'Missing query path: \.b\[3\]\.c \(relative to error location\)',
+                                deeper_node)
+        self.assertListEqual(ValueNotFoundNode(config, ['x', 0])[1]._missing_query_path,
+                             ['x', 0, 1])
+        self.assertListEqual(ValueNotFoundNode(config, [])['x']._missing_query_path, ['x'])
+
+    def test_default_value(self):
+        config = loads_config('{}')
+        self.assertEqual(config.a.b.c.d(5), 5)
+        self.assertIsNone(config.a.b(None))
+        self.assertEqual(config.a('x', require_integer), 'x')
+        self.assertRaises(JSONConfigValueNotFoundError, WrapCallable(config.a), require_integer)
+        self.assertRaisesRegexp(TypeError, r'1 isn\'t a JSONValueMapper instance!',
+                                WrapCallable(config.a), 0, 1)
+
 
 class TestJSONValueMapper(TestCase):
     def test_call(self):
@@ -81,6 +108,16 @@ class TestConfigNode(TestCase):
     def test_unimplemented_fetch_unwrapped_value(self):
         self.assertRaises(NotImplementedError, ConfigNode(0, 0)._fetch_unwrapped_value)
 
+    def test_nodes_have_no_instance_dict(self):
+        config = loads_config(TEST_JSON_STRING)
+        for node in (config, config.array, config.int, loads_config('{a: 0}', lazy=True)):
+            self.assertRaises(AttributeError, setattr, node, 'x', 0)
+
+    def test_pickled_tree(self):
+        config = pickle.loads(pickle.dumps(loads_config(TEST_JSON_STRING)))
+        self.assertEqual(config(), loads_config(TEST_JSON_STRING)())
+        self.assertEqual(node_location(config.array[1].b), (9, 22))
+
 
 class TestConfigJSONScalar(TestCase):
     def test_len(self):
@@ -254,6 +291,110 @@ class TestConfigJSONArray(TestCase):
         repr(config.array)
 
 
+class TestMemoizedValues(TestCase):
+    strict_json_string = '{"int": 5, "array": [{"a": 0}, {"b": [1]}], "obj": {}}'
+
+    def test_memoized_values(self):
+        for json_str in (TEST_JSON_STRING, self.strict_json_string):
+            for lazy in (False, True):
+                config = loads_config(json_str, lazy=lazy, memoize_values=True)
+                value = config()
+                self.assertEqual(value, loads_config(json_str)())
+                self.assertIs(config(), value)
+                self.assertIs(config.array(), value['array'])
+                self.assertIs(config.array[1](), value['array'][1])
+                self.assertIsInstance(value, dict)
+                self.assertIsInstance(value['array'], list)
+
+    def test_values_are_not_memoized_by_default(self):
+        config = loads_config(TEST_JSON_STRING)
+        self.assertIsNot(config(), config())
+        self.assertIsNot(config.array(), config.array())
+
+    def test_memoized_values_are_read_only(self):
+        value = loads_config(TEST_JSON_STRING, memoize_values=True)()
+        self.assertRaisesRegexp(TypeError, r'The memoized values of config nodes are read-only\.',
+                                value.__setitem__, 'int', 6)
+        for func, args in ((value.update, ({'x': 0},)), (value.pop, ('int',)),
+                           (value['array'].append, (0,)), (value['array'].sort, ()),
+                           (value['array'].__delitem__, (0,))):
+            self.assertRaises(TypeError, func, *args)
+        self.assertEqual(value, loads_config(TEST_JSON_STRING)())
+        copied_value = dict(value)
+        copied_value['int'] = 6
+        self.assertEqual(value['int'], 5)
+
+    def test_pickled_memoized_value(self):
+        value = loads_config(TEST_JSON_STRING, memoize_values=True)()
+        for copied_value in (pickle.loads(pickle.dumps(value)), copy.deepcopy(value)):
+            self.assertEqual(copied_value, loads_config(TEST_JSON_STRING)())
+            self.assertIs(type(copied_value), ReadOnlyDict)
+            self.assertIs(type(copied_value['array']), ReadOnlyList)
+
+    def test_invalidate_memoized_values(self):
+        config = loads_config(TEST_JSON_STRING, memoize_values=True)
+        value = config()
+        array_value = config.array()
+        invalidate_memoized_values(config.array)
+        self.assertIs(config(), value)
+        self.assertIsNot(config.array(), array_value)
+        invalidate_memoized_values(config)
+        self.assertIsNot(config(), value)
+        self.assertEqual(config(), value)
+        invalidate_memoized_values(loads_config(TEST_JSON_STRING))
+
+
+class TestCompiledQuery(TestCase):
+    paths = ['', 'int', 'array[1].b', 'array[0]', 'obj.missing.x', 'missing[0].y', 'array[1].c']
+
+    def _assert_same_node(self, node, expected):
+        self.assertIs(type(node), type(expected))
+        if isinstance(expected, ValueNotFoundNode):
+            self.assertIs(node._parent_config_node, expected._parent_config_node)
+            self.assertListEqual(node._missing_query_path, expected._missing_query_path)
+        else:
+            self.assertIs(node, expected)
+
+    def test_same_node_as_member_access(self):
+        for lazy in (False, True):
+            config = loads_config(TEST_JSON_STRING, lazy=lazy)
+            expected_nodes = [config, config.int, config.array[1].b, config.array[0],
+                              config.obj.missing.x, config.missing[0].y, config.array[1].c]
+            for path, expected in zip(self.paths, expected_nodes):
+                self._assert_same_node(compile_query(path)(config), expected)
+        self.assertEqual(compile_query('array[1].b')(config)(), 1)
+        self.assertRaisesRegexp(JSONConfigValueNotFoundError,
+                                r'Missing query path: \.missing\.x .*\[line=10;col=10\]',
+                                compile_query('obj.missing.x')(config))
+
+    def test_errors(self):
+        config = loads_config(TEST_JSON_STRING)
+        self.assertRaises(JSONConfigIndexError, compile_query('array[2]'), config)
+        self.assertRaises(JSONConfigNodeTypeError, compile_query('array.a'), config)
+        self.assertRaises(JSONConfigNodeTypeError, compile_query('[0]'), config)
+        self.assertRaises(JSONConfigNodeTypeError, compile_query('int.a'), config)
+        self.assertRaisesRegexp(ValueError, r'Wildcards aren\'t supported', compile_query,
+                                'array[*]')
+        self.assertRaisesRegexp(ValueError, r'Invalid query path', compile_query, 'a..b')
+        self.assertEqual(repr(compile_query('a[0]')), "CompiledQuery('a[0]')")
+
+    def test_fetch_many(self):
+        for lazy in (False, True):
+            config = loads_config(TEST_JSON_STRING, lazy=lazy)
+            queries = dict((path, path) for path in self.paths)
+            queries['compiled'] = compile_query('array[1]')
+            queries['array'] = 'array'
+            for nodes in (fetch_many(config, queries),
+                          fetch_many(config, compile_queries(queries))):
+                self.assertEqual(sorted(nodes), sorted(queries))
+                for name, query in queries.items():
+                    if not isinstance(query, CompiledQuery):
+                        query = compile_query(query)
+                    self._assert_same_node(nodes[name], query(config))
+        self.assertEqual(fetch_many(config, {}), {})
+        self.assertRaises(JSONConfigIndexError, fetch_many, config, {'a': 'int', 'b': 'array[2]'})
+
+
 class TestUtilityFunctions(TestCase):
     def test_node_location(self):
         config = loads_config('\n{k0:0}')
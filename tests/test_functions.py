@@ -1,10 +1,16 @@
-from unittest import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
 from mock import patch
 
 from jsoncfg import (
-    load, load_config, loads, loads_config, JSONConfigParserException,
-    JSONParserParams, DefaultStringToScalarConverter, PythonObjectBuilderParams
+    load, load_config, loads, loads_config, iterparse, JSONConfigParserException,
+    loads_many, loads_config_many, iter_load, iter_load_config,
+    JSONParserParams, DefaultStringToScalarConverter, PythonObjectBuilderParams, node_location,
 )
+from jsoncfg.compatibility import python2, my_unicode
 
 
 TEST_JSON_STRING = """
@@ -49,6 +55,31 @@ class TestLoads(TestCase):
         self.assertRaisesRegexp(JSONConfigParserException, r'Duplicate key: "my_duplicate_key"',
                                 loads, '{my_duplicate_key:0,my_duplicate_key:0}')
 
+    def test_multiple_documents_is_rejected(self):
+        params = JSONParserParams(multiple_documents=True)
+        self.assertRaisesRegexp(ValueError, r'Use loads_many\(\) or iter_load\(\) instead\.',
+                                loads, '{a: 0} {a: 1}', params)
+        self.assertRaisesRegexp(ValueError, r'Use loads_many\(\) or iter_load\(\) instead\.',
+                                load, io.BytesIO(b'{a: 0} {a: 1}'), params, stream=True)
+
+
+@skipIf(python2, 'In case of python2 bytes are utf-8 encoded str objects.')
+class TestLoadsUtf8Bytes(TestCase):
+    def test_loads(self):
+        json_bytes = TEST_JSON_STRING.encode('utf-8')
+        self.assertEqual(loads(json_bytes), TEST_JSON_VALUE)
+        self.assertEqual(loads(b'\xef\xbb\xbf{"\xc3\xa9": 0}'), {u'\xe9': 0})
+
+    def test_loads_config(self):
+        config = loads_config(b'{\n  a: [0, "\xc3\xa9"],\n}')
+        self.assertEqual(config.a[1](), u'\xe9')
+        self.assertEqual(node_location(config.a[1]), (2, 10))
+
+    def test_error(self):
+        self.assertRaisesRegexp(JSONConfigParserException,
+                                r'Invalid UTF-8 byte sequence\. \[line=1;col=5\]',
+                                loads, b'{a: \xff}')
+
 
 class TestLoadsConfig(TestCase):
     def test_object_and_standard_json_datatype_loading(self):
@@ -67,6 +98,34 @@ class TestLoadsConfig(TestCase):
         self.assertRaisesRegexp(JSONConfigParserException, r'Duplicate key: "my_duplicate_key"',
                                 loads_config, '{my_duplicate_key:0,my_duplicate_key:0}')
 
+    def test_multiple_documents_is_rejected(self):
+        params = JSONParserParams(multiple_documents=True)
+        for lazy in (False, True):
+            self.assertRaisesRegexp(ValueError, r'Use loads_many\(\) or iter_load\(\)',
+                                    loads_config, '{a: 0} {a: 1}', params, lazy=lazy)
+
+    def test_node_locations_are_resolved_from_offsets(self):
+        json_str = '{\r\n\ta: [1,\t{b: "x"}],\n  c: {}\n}'
+        for text in (json_str, json_str.encode('UTF-8')):
+            config = loads_config(text)
+            self.assertIsNone(config.a[1].b._line)
+            self.assertIs(config.a[1].b._deferred_locations, config._deferred_locations)
+            self.assertEqual(node_location(config.a[1].b), (2, 17))
+            self.assertEqual(node_location(config.a[1]), (2, 13))
+            self.assertEqual(node_location(config.c), (3, 6))
+            self.assertEqual(node_location(config), (1, 1))
+        config = loads_config(json_str, JSONParserParams(lazy_location=False))
+        self.assertEqual(config.a[1].b._line, 2)
+        self.assertEqual(node_location(config.a[1].b), (2, 17))
+
+    def test_dedup_values(self):
+        json_str = '{"a": {"name": "web server"}, "b": {"name": "web server"}}'
+        for lazy in (False, True):
+            config = loads_config(json_str, lazy=lazy, dedup_values=True)
+            self.assertIs(config.b.name(), config.a.name())
+        config = load_config(io.BytesIO(json_str.encode('UTF-8')), stream=True, dedup_values=True)
+        self.assertIs(config.b.name(), config.a.name())
+
 
 class TestFileLoadFunctions(TestCase):
     @patch('jsoncfg.functions.loads', return_value='loads_return_value')
@@ -94,6 +153,294 @@ class TestFileLoadFunctions(TestCase):
         )
 
 
+class TestStreamLoadFunctions(TestCase):
+    json_bytes = b'\xef\xbb\xbf' + TEST_JSON_STRING.encode('UTF-8')
+
+    def test_load(self):
+        for chunk_size in (1, 7, 64*1024):
+            res = load(io.BytesIO(self.json_bytes), stream=True, chunk_size=chunk_size)
+            self.assertEqual(res, TEST_JSON_VALUE)
+
+    def test_load_with_params(self):
+        res = load(io.BytesIO(b'[0, 1,]'), JSONParserParams(root_is_array=True),
+                   stream=True, chunk_size=2)
+        self.assertEqual(res, [0, 1])
+
+    def test_load_utf16(self):
+        f = io.BytesIO(b'\xff\xfe' + TEST_JSON_STRING.encode('UTF-16-LE'))
+        self.assertEqual(load(f, stream=True, chunk_size=3), TEST_JSON_VALUE)
+
+    def test_load_config(self):
+        config = load_config(io.BytesIO(self.json_bytes), stream=True, chunk_size=5)
+        self.assertEqual(config(), TEST_JSON_VALUE)
+
+    def test_load_config_error(self):
+        f = io.BytesIO(b'{\n  a: 0,\n  a: 1\n}')
+        self.assertRaisesRegexp(JSONConfigParserException, r'Duplicate key: "a" \[line=3;col=3\]',
+                                load_config, f, stream=True, chunk_size=2)
+
+    @patch('jsoncfg.functions.load_utf_text_file')
+    def test_stream_doesnt_load_the_whole_file(self, mock_load_utf_text_file):
+        load(io.BytesIO(self.json_bytes), stream=True)
+        self.assertFalse(mock_load_utf_text_file.called)
+
+
+class TestMappedFileLoadFunctions(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'test.json')
+        with open(self.path, 'wb') as f:
+            f.write(b'\xef\xbb\xbf' + TEST_JSON_STRING.encode('UTF-8'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load(self):
+        self.assertEqual(load(self.path, use_mmap=True), TEST_JSON_VALUE)
+
+    def test_load_config(self):
+        config = load_config(self.path, use_mmap=True)
+        self.assertEqual(config(), TEST_JSON_VALUE)
+        self.assertEqual(node_location(config.array[1].b), (9, 22))
+
+    def test_load_stream(self):
+        self.assertEqual(load(self.path, use_mmap=True, stream=True, chunk_size=7),
+                         TEST_JSON_VALUE)
+
+    def test_load_utf8_bytes(self):
+        for use_mmap in (False, True):
+            self.assertEqual(load(self.path, use_mmap=use_mmap, parse_utf8_bytes=True),
+                             TEST_JSON_VALUE)
+            config = load_config(self.path, use_mmap=use_mmap, parse_utf8_bytes=True)
+            self.assertEqual(config(), TEST_JSON_VALUE)
+
+    @patch('jsoncfg.functions.load_utf_text_file')
+    def test_mmap_doesnt_read_the_file(self, mock_load_utf_text_file):
+        with open(self.path, 'rb') as f:
+            self.assertEqual(load(f, use_mmap=True), TEST_JSON_VALUE)
+            self.assertEqual(f.tell(), 0)
+        self.assertFalse(mock_load_utf_text_file.called)
+
+
+class TestIterParse(TestCase):
+    json_string = my_unicode('{a: [1, "x", {}],\n\tb: null}')
+    expected_events = [
+        ('begin_object', None, 1, 1),
+        ('object_key', 'a', 1, 2),
+        ('begin_array', None, 1, 5),
+        ('scalar', 1, 1, 6),
+        ('scalar', 'x', 1, 9),
+        ('begin_object', None, 1, 14),
+        ('end_object', None, 1, 16),
+        ('end_array', None, 1, 17),
+        ('object_key', 'b', 2, 5),
+        ('scalar', None, 2, 8),
+        ('end_object', None, 2, 13),
+    ]
+
+    def test_string_source(self):
+        self.assertListEqual(list(iterparse(self.json_string)), self.expected_events)
+        self.assertListEqual(list(iterparse(self.json_string, chunk_size=1)),
+                             self.expected_events)
+
+    def test_file_source(self):
+        events = list(iterparse(io.StringIO(self.json_string), chunk_size=4))
+        self.assertListEqual(events, self.expected_events)
+
+    def test_binary_file_source(self):
+        f = io.BytesIO(b'\xef\xbb\xbf' + self.json_string.encode('UTF-8'))
+        events = list(iterparse(f, chunk_size=3))
+        self.assertListEqual(events, self.expected_events)
+
+    def test_early_stop(self):
+        f = io.StringIO(self.json_string)
+        for event, value, _, _ in iterparse(f, chunk_size=4):
+            if event == 'object_key' and value == 'a':
+                break
+        self.assertEqual(f.tell(), 4)
+
+    def test_error(self):
+        events = iterparse(my_unicode('[0, 1 2]'), JSONParserParams(root_is_array=True),
+                           chunk_size=1)
+        self.assertEqual(next(events), ('begin_array', None, 1, 1))
+        self.assertRaisesRegexp(JSONConfigParserException, r'Expected "," \[line=1;col=7\]',
+                                list, events)
+
+    def test_invalid_scalar(self):
+        self.assertRaisesRegexp(JSONConfigParserException, r'Invalid json scalar: "woof"',
+                                list, iterparse('{a: woof}'))
+
+
+class TestMultipleDocuments(TestCase):
+    json_lines = '{id: 1, tags: ["a"]}\n{"id": 2, "tags": []}\n\n{id: 3, tags: [{x: null}]}\n'
+    documents = [
+        {'id': 1, 'tags': ['a']},
+        {'id': 2, 'tags': []},
+        {'id': 3, 'tags': [{'x': None}]},
+    ]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'test.jsonl')
+        with open(self.path, 'wb') as f:
+            f.write(self.json_lines.encode('UTF-8'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_loads_many(self):
+        for chunk_size in (1, 7, 64*1024):
+            self.assertListEqual(list(loads_many(self.json_lines, chunk_size=chunk_size)),
+                                 self.documents)
+
+    def test_concatenated_documents(self):
+        self.assertListEqual(list(loads_many('{a: 1}{b: 2} /* c */ {c: 3}')),
+                             [{'a': 1}, {'b': 2}, {'c': 3}])
+        self.assertListEqual(list(loads_many('[1][2]', JSONParserParams(root_is_array=True))),
+                             [[1], [2]])
+
+    def test_empty_text(self):
+        self.assertListEqual(list(loads_many('')), [])
+        self.assertListEqual(list(loads_many(' \n')), [])
+
+    @skipIf(python2, 'In case of python2 the binary text is a str.')
+    def test_binary_text(self):
+        json_bytes = b'\xef\xbb\xbf' + self.json_lines.encode('UTF-8')
+        self.assertListEqual(list(loads_many(json_bytes, chunk_size=5)), self.documents)
+
+    def test_documents_are_yielded_before_the_error(self):
+        documents = loads_many('{a: 1}\n{b: 2}\n{c: }\n{d: 4}\n')
+        self.assertEqual(next(documents), {'a': 1})
+        self.assertEqual(next(documents), {'b': 2})
+        self.assertRaisesRegexp(JSONConfigParserException,
+                                r'Expected a scalar here\. \[line=3;col=5\]', next, documents)
+
+    def test_keys_are_shared_by_the_documents(self):
+        first, second = loads_many('{"key": 1}\n{"key": 2}')
+        self.assertIs(list(first)[0], list(second)[0])
+
+    def test_loads_config_many(self):
+        configs = list(loads_config_many(self.json_lines))
+        self.assertListEqual([config() for config in configs], self.documents)
+        self.assertEqual(node_location(configs[2].tags[0].x), (4, 20))
+
+    def test_iter_load(self):
+        self.assertListEqual(list(iter_load(self.path, chunk_size=3)), self.documents)
+        with open(self.path, 'rb') as f:
+            self.assertListEqual(list(iter_load(f)), self.documents)
+
+    def test_iter_load_config(self):
+        configs = iter_load_config(self.path, JSONParserParams(), use_mmap=True)
+        self.assertListEqual([config.id() for config in configs], [1, 2, 3])
+
+    def test_early_stop(self):
+        f = io.BytesIO(self.json_lines.encode('UTF-8'))
+        for document in iter_load(f, chunk_size=4):
+            break
+        self.assertEqual(document, self.documents[0])
+        self.assertLessEqual(f.tell(), 32)
+
+
+class TestSelect(TestCase):
+    json_str = '{\n  servers: [\n    {address: "a", port: 1},\n    {address: "b", port: 2},\n  ],\n' \
+               '  log: {level: "info", file: "x.log"},\n  data: [[1, 2], {"]": "}"}],\n}'
+    select = ['servers[*].address', 'log.level']
+    expected = {'servers': [{'address': 'a'}, {'address': 'b'}], 'log': {'level': 'info'}}
+
+    def test_loads(self):
+        # A strict json text would be loaded by the stdlib fast path without the select.
+        strict_json_str = '{"a": [1, {"b": 2, "c": 3}], "d": 4}'
+        self.assertEqual(loads(strict_json_str, JSONParserParams(select=['a[1].c'])),
+                         {'a': [None, {'c': 3}]})
+        self.assertEqual(loads(self.json_str, JSONParserParams(select=self.select)),
+                         self.expected)
+
+    def test_loads_config(self):
+        config = loads_config(self.json_str, JSONParserParams(select=self.select))
+        self.assertEqual(config(), self.expected)
+        self.assertEqual(node_location(config.servers[1].address), (4, 15))
+        self.assertEqual(node_location(config.log.level), (6, 16))
+        self.assertEqual(config.data('default'), 'default')
+
+    def test_select_all(self):
+        for select in (None, [''], ['*']):
+            self.assertEqual(loads(self.json_str, JSONParserParams(select=select)),
+                             loads(self.json_str))
+
+    def test_loads_many(self):
+        documents = loads_many('{a: 0, b: [1]}\n{a: 2, c: 3}', JSONParserParams(select=['a']))
+        self.assertListEqual(list(documents), [{'a': 0}, {'a': 2}])
+
+    def test_invalid_path(self):
+        self.assertRaisesRegexp(ValueError, r"Invalid query path: '\.a\.\[0\]'",
+                                JSONParserParams, select=['a.[0]'])
+
+
+class TestLazyLoadsConfig(TestCase):
+    json_str = '// config\n{\n  a: {x: [1, 2], y: "s"},\n\tb: [3, {z: null}],\n  c: 5,\n  d: {e: }\n}'
+
+    def test_values_are_parsed_on_access(self):
+        config = loads_config(self.json_str, lazy=True)
+        self.assertEqual(len(config), 4)
+        self.assertTrue('d' in config)
+        self.assertEqual(node_location(config), (2, 1))
+        self.assertEqual(config.a.x[1](), 2)
+        self.assertEqual(node_location(config.a.x[1]), (3, 14))
+        self.assertIsNone(config.b[-1].z())
+        self.assertEqual(node_location(config.b[1].z), (4, 16))
+        self.assertEqual(config.c(), 5)
+        self.assertIs(config.a, config['a'])
+        self.assertEqual(config.missing(0), 0)
+
+    def test_same_tree_as_without_lazy(self):
+        for json_str in (TEST_JSON_STRING, self.json_str.replace('{e: }', '{e: 6}')):
+            config = loads_config(json_str, lazy=True)
+            expected = loads_config(json_str)
+            self.assertEqual(config(), expected())
+            self.assertListEqual([(key, node_location(node)) for key, node in config],
+                                 [(key, node_location(node)) for key, node in expected])
+        config = loads_config('[0, {a: [1]}]', JSONParserParams(root_is_array=True), lazy=True)
+        self.assertListEqual([node() for node in config], [0, {'a': [1]}])
+
+    def test_error_is_raised_on_access(self):
+        for engine in ('regex', 'char'):
+            config = loads_config(self.json_str, JSONParserParams(engine=engine), lazy=True)
+            self.assertEqual(config.c(), 5)
+            self.assertRaisesRegexp(JSONConfigParserException,
+                                    r'Expected a scalar here\. \[line=6;col=10\]', config, 'd')
+            self.assertRaisesRegexp(JSONConfigParserException,
+                                    r'Expected a scalar here\. \[line=6;col=10\]', config)
+
+    def test_root_errors(self):
+        self.assertRaisesRegexp(JSONConfigParserException,
+                                r'Duplicate key: "a" \[line=2;col=9\]',
+                                loads_config, '{a: [0],\n  x: 1, a: 2}', lazy=True)
+        self.assertRaisesRegexp(JSONConfigParserException,
+                                r'Mismatched closing bracket in a skipped json value\.',
+                                loads_config, '{a: [0}}', lazy=True)
+        self.assertRaisesRegexp(JSONConfigParserException,
+                                r'Garbage detected after the parsed json! \[line=1;col=9\]',
+                                loads_config, '{a: [0]}x', lazy=True)
+
+    @skipIf(python2, 'In case of python2 the binary text is a str.')
+    def test_binary_text(self):
+        config = loads_config(self.json_str.encode('UTF-8'), lazy=True)
+        self.assertEqual(config.a.y(), 's')
+        self.assertEqual(node_location(config.b[1].z), (4, 16))
+
+    def test_load_config_with_mmap(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'test.json')
+            with open(path, 'wb') as f:
+                f.write(self.json_str.replace('{e: }', '{e: 6}').encode('UTF-8'))
+            config = load_config(path, lazy=True, use_mmap=True, parse_utf8_bytes=True)
+            self.assertEqual(config.a.x(), [1, 2])
+            self.assertEqual(load_config(path, lazy=True, stream=True).a.x(), [1, 2])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
 class TestOther(TestCase):
     def test_custom_const_scalars(self):
         my_const = object()
@@ -0,0 +1,60 @@
+from unittest import TestCase
+from jsoncfg.parser import TextParser
+from jsoncfg.line_index import LineIndex, Utf8LineIndex, advance_column
+
+
+class TestLineIndex(TestCase):
+    text = '\r \n\t\r\r \n\n\t \r\n\n\r\n\r\r\nab\tc\t\td\n\r\t x'
+
+    def _text_parser_locations(self, tab_size):
+        parser = TextParser(tab_size=tab_size)
+        parser.init_text_parser(self.text)
+        locations = []
+        for pos in range(len(self.text) + 1):
+            parser.skip_to(pos)
+            locations.append((parser.line, parser.column))
+        return locations
+
+    def test_sequential_queries(self):
+        for tab_size in (1, 4, 8):
+            line_index = LineIndex(self.text, tab_size)
+            locations = [line_index.location(pos) for pos in range(len(self.text) + 1)]
+            self.assertListEqual(locations, self._text_parser_locations(tab_size))
+
+    def test_random_access_queries(self):
+        expected = self._text_parser_locations(4)
+        line_index = LineIndex(self.text)
+        positions = list(range(len(self.text) + 1))
+        for pos in reversed(positions):
+            self.assertEqual(line_index.location(pos), expected[pos])
+        for pos in positions[::3] + positions[1::3] + positions[2::3]:
+            self.assertEqual(line_index.location(pos), expected[pos])
+
+    def test_line_index_is_built_on_first_query(self):
+        line_index = LineIndex('a\nb')
+        self.assertIsNone(line_index._line_starts)
+        self.assertEqual(line_index.location(2), (1, 0))
+        self.assertListEqual(line_index.line_starts, [2])
+
+    def test_advance_column(self):
+        self.assertEqual(advance_column('ab\tc', 0, 4, 0, 4), 5)
+        self.assertEqual(advance_column('ab\tc', 1, 4, 1, 4), 5)
+        self.assertEqual(advance_column('ab\tc', 2, 3, 3, 8), 8)
+        self.assertEqual(advance_column('ab\tc', 2, 2, 3, 8), 3)
+
+
+class TestUtf8LineIndex(TestCase):
+    def test_columns_are_counted_in_chars(self):
+        text = u'\t\xe9\u20ac x\r\n\xe9 y'
+        expected = LineIndex(text)
+        encoded = text.encode('utf-8')
+        line_index = Utf8LineIndex(encoded)
+        for pos in range(len(text) + 1):
+            byte_pos = len(text[:pos].encode('utf-8'))
+            self.assertEqual(line_index.location(byte_pos), expected.location(pos))
+
+    def test_bom(self):
+        line_index = Utf8LineIndex(b'\xef\xbb\xbfab\nc')
+        self.assertEqual(line_index.location(3), (0, 0))
+        self.assertEqual(line_index.location(5), (0, 2))
+        self.assertEqual(line_index.location(6), (1, 0))
@@ -0,0 +1,163 @@
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+
+from jsoncfg import (
+    load, load_config, load_many, load_config_many, node_location, JSONConfigParserException,
+    JSONParserParams, loads, loads_config, loads_parallel, loads_config_parallel, load_parallel,
+    load_config_parallel,
+)
+from jsoncfg.parallel import _find_item_separators
+from jsoncfg.parser import JSONParser
+from jsoncfg.parser_listener import ObjectBuilderParserListener
+from jsoncfg.tree_python import PythonObjectBuilderParams
+
+
+class _ImmediateExecutor(object):
+    """ An executor that pickles the calls and results like a process pool would. """
+    def map(self, func, *iterables):
+        func = pickle.loads(pickle.dumps(func))
+        for args in zip(*iterables):
+            try:
+                result = func(*args)
+            except Exception as e:
+                raise pickle.loads(pickle.dumps(e))
+            yield pickle.loads(pickle.dumps(result))
+
+
+class TestLoadMany(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(10):
+            self.paths.append(self._write_file('config%d.json' % i,
+                                               '// config %d\n{id: %d, items: [%d, {name: "x%d"}]}'
+                                               % (i, i, i, i)))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write_file(self, filename, json_str):
+        path = os.path.join(self.tmp_dir, filename)
+        with open(path, 'wb') as f:
+            f.write(json_str.encode('UTF-8'))
+        return path
+
+    def test_load_many(self):
+        expected = [load(path) for path in self.paths]
+        self.assertListEqual(load_many(self.paths, workers=2), expected)
+        self.assertListEqual(load_many(self.paths, workers=1), expected)
+        self.assertListEqual(load_many(self.paths, executor=_ImmediateExecutor()), expected)
+        self.assertListEqual(load_many([]), [])
+
+    def test_load_config_many(self):
+        for kwargs in ({'workers': 2}, {'workers': 1}, {'executor': _ImmediateExecutor()},
+                       {'workers': 1, 'parse_utf8_bytes': True, 'use_mmap': True}):
+            configs = load_config_many(self.paths, **kwargs)
+            for path, config in zip(self.paths, configs):
+                expected = load_config(path)
+                self.assertEqual(config(), expected())
+                self.assertEqual(node_location(config), node_location(expected))
+                self.assertEqual(node_location(config.items[1].name),
+                                 node_location(expected.items[1].name))
+                self.assertEqual(node_location(config.items[1].name), (2, 27))
+
+    def test_error_has_filename(self):
+        path = self._write_file('invalid.json', '{a: 0,\n b: }')
+        for func in (load_many, load_config_many):
+            for kwargs in ({'workers': 2}, {'workers': 1}, {'executor': _ImmediateExecutor()}):
+                with self.assertRaises(JSONConfigParserException) as cm:
+                    func(self.paths + [path], **kwargs)
+                e = cm.exception
+                self.assertEqual((e.filename, e.line, e.column), (path, 2, 5))
+                self.assertEqual(str(e), 'Expected a scalar here. [file=%s;line=2;col=5]' % path)
+
+    def test_parser_params(self):
+        path = self._write_file('array.json', '[1, 2]')
+        self.assertListEqual(load_many([path], JSONParserParams(root_is_array=True)), [[1, 2]])
+
+
+class TestParserExceptionPickling(TestCase):
+    def test_pickled_exception(self):
+        listener = ObjectBuilderParserListener(PythonObjectBuilderParams())
+        try:
+            JSONParser().parse('{\n  a: }', listener)
+        except JSONConfigParserException as e:
+            error = e
+        self.assertEqual((error.line, error.column), (2, 6))
+        for filename in (None, 'a.json'):
+            if filename is not None:
+                error = error.with_filename(filename)
+            unpickled = pickle.loads(pickle.dumps(error))
+            self.assertEqual(str(unpickled), str(error))
+            self.assertEqual((unpickled.error_message, unpickled.line, unpickled.column,
+                              unpickled.filename),
+                             (error.error_message, error.line, error.column, filename))
+
+
+class TestLoadsParallel(TestCase):
+    json_str = '// records\n[\n' + ',\n'.join(
+        '\t{id: %d, "name": "a,]}\\"[%d", /* ,] */ tags: [%d, {x: null}]}' % (i, i, i)
+        for i in range(50)) + ',\n]\n'
+    parser_params = JSONParserParams(root_is_array=True)
+
+    def _assert_same_config_trees(self, config, expected):
+        self.assertEqual(config(), expected())
+        self.assertEqual(node_location(config), node_location(expected))
+        for item, expected_item in zip(config, expected):
+            self.assertEqual(node_location(item), node_location(expected_item))
+            self.assertEqual(node_location(item.tags[1].x), node_location(expected_item.tags[1].x))
+
+    def test_loads_parallel(self):
+        expected = loads(self.json_str, self.parser_params)
+        for kwargs in ({'workers': 2}, {'executor': _ImmediateExecutor()}, {'workers': 1}):
+            self.assertListEqual(loads_parallel(self.json_str, min_chunk_size=50, **kwargs),
+                                 expected)
+
+    def test_loads_config_parallel(self):
+        expected = loads_config(self.json_str, self.parser_params)
+        for kwargs in ({'workers': 2}, {'executor': _ImmediateExecutor()}, {'workers': 1}):
+            config = loads_config_parallel(self.json_str, min_chunk_size=50, **kwargs)
+            self._assert_same_config_trees(config, expected)
+
+    def test_load_parallel(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'records.json')
+            with open(path, 'wb') as f:
+                f.write(self.json_str.encode('UTF-8'))
+            self.assertListEqual(load_parallel(path, workers=2, min_chunk_size=50),
+                                 loads(self.json_str, self.parser_params))
+            self._assert_same_config_trees(
+                load_config_parallel(path, workers=2, min_chunk_size=50),
+                loads_config(self.json_str, self.parser_params))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_error_is_the_same_as_in_case_of_loads(self):
+        json_str = self.json_str.replace('id: 40', 'id: }')
+        for func in (loads_parallel, loads_config_parallel):
+            self.assertRaisesRegexp(JSONConfigParserException,
+                                    r'Expected a scalar here\. \[line=43;col=10\]',
+                                    func, json_str, min_chunk_size=50,
+                                    executor=_ImmediateExecutor())
+
+    def test_select(self):
+        params = JSONParserParams(root_is_array=True, select=['[*].tags[1]', '[3]'])
+        self.assertListEqual(loads_parallel(self.json_str, params, min_chunk_size=50,
+                                            executor=_ImmediateExecutor()),
+                             loads(self.json_str, params))
+
+    def test_object_root(self):
+        self.assertEqual(loads_parallel('{a: [1, 2]}', JSONParserParams(), min_chunk_size=1,
+                                        executor=_ImmediateExecutor()), {'a': [1, 2]})
+
+    def test_item_separators(self):
+        json_str = '[{a: 1}, "x,]", /* ,] */ 2, [3, 4], {b: [5]}, 6,\n]'
+        separators = _find_item_separators(json_str, 1)
+        self.assertListEqual(separators, [7, 14, 26, 34, 44])
+        self.assertTrue(all(json_str[pos] == ',' for pos in separators))
+        self.assertListEqual(_find_item_separators(json_str, 20), [26])
+        self.assertListEqual(_find_item_separators('{a: [1, 2]}', 1), [])
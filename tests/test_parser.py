@@ -1,8 +1,10 @@
 from unittest import TestCase
 from jsoncfg.parser import (
-    TextParser, JSONConfigParserException, ParserListener, JSONParser, JSONParserParams
+    TextParser, JSONConfigParserException, ParserListener, JSONParser, JSONParserParams,
+    RegexJSONParser, LazyLocationJSONParser, IncrementalJSONParser, Utf8JSONParser,
 )
-from jsoncfg.compatibility import my_unicode
+from jsoncfg.compatibility import python2, my_unicode
+from jsoncfg.line_index import LineIndex
 
 
 class TestTextParser(TestCase):
@@ -193,25 +195,33 @@ class MyParserListener(ParserListener):
 
 
 class TestJSONParser(TestCase):
+    engine = 'regex'
+    listener_class = MyParserListener
+
+    def _parse(self, parser_params, json_str, listener):
+        JSONParser(parser_params).parse(json_str, listener)
+
     def _test_with_data(self, input_json, expected_event_stream, root_is_array=False):
-        listener = MyParserListener()
-        parser = JSONParser(JSONParserParams(root_is_array=root_is_array))
-        parser.parse(input_json, listener)
+        listener = self.listener_class()
+        self._parse(JSONParserParams(root_is_array=root_is_array, engine=self.engine),
+                    input_json, listener)
         self.assertEqual(listener.event_stream, expected_event_stream)
 
     def _assert_raises_regexp(self, regexp, json_str, root_is_array=False,
                               parser_params=JSONParserParams()):
         parser_params.root_is_array = root_is_array
-        listener = MyParserListener()
-        parser = JSONParser(parser_params)
-        self.assertRaisesRegexp(JSONConfigParserException, regexp, parser.parse, json_str, listener)
+        parser_params.engine = self.engine
+        listener = self.listener_class()
+        self.assertRaisesRegexp(JSONConfigParserException, regexp, self._parse, parser_params,
+                                json_str, listener)
 
     def _assert_raises(self, json_str, root_is_array=False,
                        parser_params=JSONParserParams()):
         parser_params.root_is_array = root_is_array
-        listener = MyParserListener()
-        parser = JSONParser(parser_params)
-        self.assertRaises(JSONConfigParserException, parser.parse, json_str, listener)
+        parser_params.engine = self.engine
+        listener = self.listener_class()
+        self.assertRaises(JSONConfigParserException, self._parse, parser_params, json_str,
+                          listener)
 
     def test_garbage_in_input_after_json_str(self):
         self._assert_raises_regexp(r'Garbage detected after the parsed json!', '{}garbage')
@@ -271,9 +281,8 @@ class TestJSONParser(TestCase):
     def test_skip_spaces_and_peek_comments_not_allowed(self):
         """ This test is needed in order to provide coverage in one of
         the branches of JSONParser._skip_spaces_and_peek() """
-        listener = MyParserListener()
-        parser = JSONParser(JSONParserParams(allow_comments=False))
-        parser.parse('{}', listener)
+        listener = self.listener_class()
+        self._parse(JSONParserParams(allow_comments=False, engine=self.engine), '{}', listener)
 
     def test_skip_spaces_and_peek_invalid_comment_starter(self):
         """ This test is needed in order to provide coverage in one of
@@ -377,6 +386,328 @@ class TestJSONParser(TestCase):
         self._assert_raises_regexp(r'Encountered a control character that isn\'t allowed in'
                                    ' quoted strings\.', '["\n"]', root_is_array=True)
 
+    def test_deep_nesting(self):
+        json_str = '[' * 5000 + '{a:0}' + ']' * 5000
+        self._test_with_data(json_str, '[' * 5000 + "{'a'u:'0'u}" + ']' * 5000, True)
+
+    def test_max_depth(self):
+        self._test_with_data('[[{}], {a: [[0]]}, 0]', "[[{}]{'a'u:[['0'u]]}'0'u]", True)
+        self._assert_raises_regexp(r'The json is nested deeper than the max_depth=3 limit\. '
+                                   r'\[line=2;col=7\]', '[[{}],\n {a: [[0]]}, 0]', True,
+                                   JSONParserParams(max_depth=3))
+
+    def test_multiple_documents(self):
+        params = JSONParserParams(multiple_documents=True, engine=self.engine)
+        for json_str in ('', ' \n// comment\n'):
+            listener = self.listener_class()
+            self._parse(params, json_str, listener)
+            self.assertEqual(listener.event_stream, '')
+
+        listener = self.listener_class()
+        self._parse(params, '{a: 0}\n{"b": [1]}{}  /* c */ {c:{}}\n', listener)
+        self.assertEqual(listener.event_stream, "{'a'u:'0'u}{'b'q:['1'u]}{}{'c'u:{}}")
+
+        self._assert_raises_regexp(r'The root of the json is expected to be an object! '
+                                   r'\[line=2;col=1\]', '{a: 0}\n[1]',
+                                   parser_params=JSONParserParams(multiple_documents=True))
+        self._assert_raises_regexp(r'Expected a scalar here\. \[line=3;col=5\]',
+                                   '{a: 0}\n{b: 1}\n{c: }',
+                                   parser_params=JSONParserParams(multiple_documents=True))
+
+    def test_select(self):
+        json_str = ('{a: {x: [1, {"q": "]}"}], y: 2}, b: [{n: 1, m: "}\\""}, /* ] */ {n: 2}, 7],'
+                    ' "*": 5}')
+        for select, expected_event_stream in (
+                (['a.y'], "{'a'u:{'y'u:'2'u}}"),
+                (['b[*].n'], "{'b'u:[{'n'u:'1'u}{'n'u:'2'u}'7'u]}"),
+                (['b[1]', 'a.x[1].q'], "{'a'u:{'x'u:['null'u{'q'q:']}'q}]}'b'u:['null'u{'n'u:'2'u}"
+                                       "'null'u]}"),
+                (['*'], "{'a'u:{'x'u:['1'u{'q'q:']}'q}]'y'u:'2'u}'b'u:[{'n'u:'1'u'm'u:'}\"'q}"
+                        "{'n'u:'2'u}'7'u]'*'q:'5'u}"),
+                (['.*.y'], "{'a'u:{'y'u:'2'u}'b'u:['null'u'null'u'null'u]'*'q:'5'u}"),
+                (['c.d'], "{}")):
+            listener = self.listener_class()
+            self._parse(JSONParserParams(select=select, engine=self.engine), json_str, listener)
+            self.assertEqual(listener.event_stream, expected_event_stream)
+
+    def test_select_error_in_skipped_value(self):
+        params = JSONParserParams(select=['b'])
+        self._assert_raises_regexp(r'Mismatched closing bracket in a skipped json value\. '
+                                   r'\[line=2;col=7\]', '{a: [{x:\n  "]"}}], b: 1}',
+                                   parser_params=params)
+        self._assert_raises_regexp(r'Reached the end of stream while skipping a json value\. '
+                                   r'\[line=1;col=5\]', '{a: [{x: "]}"}',
+                                   parser_params=params)
+        self._assert_raises_regexp(r'Expected a scalar here\. \[line=1;col=5\]', '{a: , b: 1}',
+                                   parser_params=params)
+
+
+class TestCharEngineJSONParser(TestJSONParser):
+    engine = 'char'
+
+
+class TestIncrementalJSONParser(TestJSONParser):
+    chunk_size = 1
+
+    def _parse(self, parser_params, json_str, listener):
+        parser = IncrementalJSONParser(listener, parser_params)
+        for pos in range(0, len(json_str), self.chunk_size):
+            parser.feed(json_str[pos:pos+self.chunk_size])
+        parser.close()
+
+
+class TestIncrementalJSONParserLargeChunks(TestIncrementalJSONParser):
+    chunk_size = 3
+
+
+class Utf8StringsParserListener(MyParserListener):
+    """
+    Records the unicode strings of the Utf8JSONParser as UTF-8 str if encode_strings is True
+    to produce the same events as the python2 parsers of str texts.
+    """
+    encode_strings = False
+
+    def _str(self, value):
+        return value.encode('utf-8') if self.encode_strings else value
+
+    def begin_object_item(self, key, key_quoted):
+        super(Utf8StringsParserListener, self).begin_object_item(self._str(key), key_quoted)
+
+    def scalar(self, scalar_str, scalar_str_quoted):
+        super(Utf8StringsParserListener, self).scalar(self._str(scalar_str), scalar_str_quoted)
+
+
+class TestUtf8JSONParser(TestJSONParser):
+    listener_class = Utf8StringsParserListener
+
+    def _parse(self, parser_params, json_str, listener):
+        listener.encode_strings = python2 and not isinstance(json_str, my_unicode)
+        Utf8JSONParser(parser_params).parse(my_unicode(json_str).encode('utf-8'), listener)
+
+
+class TestUtf8JSONParserBinaryText(TestCase):
+    def _parse(self, json_bytes):
+        listener = MyParserListener()
+        Utf8JSONParser().parse(json_bytes, listener)
+        return listener.event_stream
+
+    def _parse_error(self, json_bytes):
+        try:
+            self._parse(json_bytes)
+        except JSONConfigParserException as e:
+            return e.error_message, e.line, e.column
+        self.fail('JSONConfigParserException not raised')
+
+    def test_strings_are_decoded(self):
+        self.assertEqual(self._parse(b'{"\xc3\xa9": \xe2\x82\xac}'),
+                         '{%rq:%ru}' % (u'\xe9', u'\u20ac'))
+
+    def test_bom_and_buffer_types(self):
+        self.assertEqual(self._parse(b'\xef\xbb\xbf{}'), '{}')
+        self.assertEqual(self._parse(bytearray(b'{}')), '{}')
+        if not python2:
+            # The python2 re module doesn't support the new buffer protocol of memoryview.
+            self.assertEqual(self._parse(memoryview(b'\xef\xbb\xbf{}')), '{}')
+
+    def test_columns_are_counted_in_chars(self):
+        self.assertEqual(self._parse_error(b'\xef\xbb\xbf{"\xc3\xa9\xe2\x82\xac" 0}'),
+                         ('Expected ":"', 1, 7))
+        self.assertEqual(self._parse_error(b'{\n\t"\xc3\xa9\xe2\x82\xac" 0}'),
+                         ('Expected ":"', 2, 10))
+
+    def test_invalid_utf8(self):
+        self.assertEqual(self._parse_error(b'{a: "\xc3\xa9\xc3"}'),
+                         ('Invalid UTF-8 byte sequence.', 1, 7))
+        self.assertEqual(self._parse_error(b'{\n  \xff: 0}'),
+                         ('Invalid UTF-8 byte sequence.', 2, 3))
+
+    def test_unicode_escape_next_to_multibyte_chars(self):
+        self.assertEqual(self._parse(b'{"a": "\\ud83dx\xc3\xa9", "b": 1}'),
+                         '{%rq:%rq%rq:%ru}' % (u'a', u'\ud83dx\xe9', u'b', u'1'))
+        self.assertEqual(self._parse_error(b'{"a": "\\uabc\xc3\xa9"}'),
+                         ('Error decoding unicode escape sequence.', 1, 8))
+        self.assertEqual(self._parse_error(b'{"a": "\\ud83d\\uabc\xc3\xa9"}'),
+                         ('Error decoding unicode escape sequence.', 1, 14))
+
+
+class TestIncrementalJSONParserFeed(TestCase):
+    def test_events_are_emitted_before_close(self):
+        listener = MyParserListener()
+        parser = IncrementalJSONParser(listener, JSONParserParams(root_is_array=True))
+        parser.feed('[{a:"xxx')
+        self.assertEqual(listener.event_stream, "[{'a'u:")
+        parser.feed('",    b: 012')
+        self.assertEqual(listener.event_stream, "[{'a'u:'xxx'q'b'u:")
+        parser.feed('3}\n')
+        self.assertEqual(listener.event_stream, "[{'a'u:'xxx'q'b'u:'0123'u}")
+        parser.feed(']')
+        parser.close()
+        self.assertEqual(listener.event_stream, "[{'a'u:'xxx'q'b'u:'0123'u}]")
+        self.assertIsNone(listener.parser)
+
+    def test_parsed_text_is_dropped(self):
+        listener = MyParserListener()
+        parser = IncrementalJSONParser(listener, JSONParserParams(root_is_array=True))
+        parser.feed('[\t0,\t1,\n\t"long string')
+        self.assertEqual(parser.text, ',\n\t"long string')
+        parser.feed('", 2, 3, 4, 5\r')
+        self.assertEqual(parser.text, '\r')
+        self.assertEqual((parser.line, parser.column), (1, 29))
+        parser.feed('\n\t,6')
+        # The comma and the unfinished item are parsed in the same step.
+        self.assertEqual(parser.text, '\r\n\t,6')
+        self.assertEqual((parser.line, parser.column), (1, 29))
+        self.assertRaisesRegexp(JSONConfigParserException, r'Expected "," \[line=3;col=8\]',
+                                parser.feed, ' 7]')
+
+    def test_skipped_text_is_dropped(self):
+        listener = MyParserListener()
+        parser = IncrementalJSONParser(listener, JSONParserParams(select=['b']))
+        parser.feed('{a: [1, "x]')
+        self.assertEqual(parser.text, '"x]')
+        parser.feed('", // ]')
+        self.assertEqual(parser.text, '// ]')
+        parser.feed('\n /* ] */ {}], b')
+        self.assertEqual(parser.text, ', b')
+        self.assertEqual((parser.line, parser.column), (1, 12))
+        parser.feed(': 2}')
+        parser.close()
+        self.assertEqual(listener.event_stream, "{'b'u:'2'u}")
+
+    def test_unfinished_token_is_parsed_when_it_ends(self):
+        listener = MyParserListener()
+        parser = IncrementalJSONParser(listener, JSONParserParams(root_is_array=True))
+        parser.feed('["long')
+        # The chunks aren't joined with the buffered text while the token doesn't end.
+        for chunk in (' \\', '"', ' string\\', '\\'):
+            parser.feed(chunk)
+            self.assertEqual(parser.text, '"long')
+        parser.feed('", 1234567890, // comment *')
+        self.assertEqual(parser.text, ', // comment *')
+        parser.feed('/')
+        self.assertEqual(parser.text, ', // comment *')
+        parser.feed('\n/* *')
+        # The comma and the next item are parsed in the same step.
+        self.assertEqual(parser.text, ', // comment */\n/* *')
+        parser.feed('/ 0')
+        self.assertEqual(parser.text, ', // comment */\n/* */ 0')
+        parser.feed(']')
+        parser.close()
+        self.assertEqual(listener.event_stream, "[%rq'1234567890'u'0'u]" % 'long " string\\')
+
+
+class TestParserEngines(TestCase):
+    error_json_strings = (
+        '{\n\ta: 0,\r\n\tb: [1, 2,\n\r\t\t3 4]}',
+        '{\r\r\t/* comment\n\n */ a: 0\n b: 1}',
+        '{\n\t// comment\r\n\ta:\t\t"\\x"}',
+        '{\n\ta: "\t\\u12X4"}',
+        '{\n\ta: "\\ud800\\uX"}',
+        '{\n\ta: "xxx\n"}',
+        '{\n\ta: "xxx',
+        '{\n\ta: 0,\n\t/*',
+        '{\n\ta: 0,\n\t/ 5',
+        '{\n\ta: 0\n\t}\n\t\tgarbage',
+        '\n\t[]',
+        '{\n\ta:\n\t}',
+        '{\n\ta\n\t0}',
+        '{\n\ta:0,\n\t}',
+        '{\n\ta:0\n\t',
+        '{\n\ta: "\\n\\txx\\"\x01"}',
+        '{\n\ta: "xx\\',
+        '{\n\ta: "xx\\"',
+        '{\n\ta: "\\ud800\\udc00\\q"}',
+    )
+
+    def _parse_error(self, json_str, engine, lazy_location=True):
+        parser = JSONParser(JSONParserParams(engine=engine, lazy_location=lazy_location,
+                                             allow_trailing_commas=False))
+        try:
+            parser.parse(json_str, MyParserListener())
+        except JSONConfigParserException as e:
+            return e.error_message, e.line, e.column
+        self.fail('Parsing %r did not fail.' % (json_str,))
+
+    def test_engine_selection(self):
+        self.assertIsInstance(JSONParser(JSONParserParams(engine='regex')),
+                              LazyLocationJSONParser)
+        parser = JSONParser(JSONParserParams(engine='regex', lazy_location=False))
+        self.assertIsInstance(parser, RegexJSONParser)
+        self.assertNotIsInstance(parser, LazyLocationJSONParser)
+        self.assertNotIsInstance(JSONParser(JSONParserParams(engine='char')), RegexJSONParser)
+        self.assertRaisesRegexp(ValueError, r'Invalid engine', JSONParserParams, engine='woof')
+
+    def test_error_locations_are_the_same(self):
+        for json_str in self.error_json_strings:
+            expected = self._parse_error(json_str, 'char')
+            self.assertEqual(self._parse_error(json_str, 'regex'), expected)
+            self.assertEqual(self._parse_error(json_str, 'regex', False), expected)
+
+    def test_quoted_strings_are_the_same(self):
+        json_str = ('{a: "\\"x\\\\\\u00e9\\ud800\\udc00\\ud800\\u0041\\/\\b\\f\\n\\r\\t\ty", '
+                    'b: "", c: "\\u0041", d: "plain"}')
+        # In case of python2 the type of the strings depends on the type of the text.
+        for text in (json_str, my_unicode(json_str)):
+            expected = MyParserListener()
+            JSONParser(JSONParserParams(engine='char')).parse(text, expected)
+            listener = MyParserListener()
+            JSONParser(JSONParserParams(engine='regex')).parse(text, listener)
+            self.assertEqual(listener.event_stream, expected.event_stream)
+
+    def test_bulk_line_column_tracking(self):
+        text = '\r \n\t\r\r \n\n\t \r\n\n\r\n\r\r\nab\tc\t\td\n\r\t'
+        for step in (1, 2, 3, 5):
+            char_parser = TextParser()
+            char_parser.init_text_parser(text)
+            regex_parser = JSONParser(JSONParserParams(lazy_location=False))
+            regex_parser.init_text_parser(text)
+            for pos in range(0, len(text) + 1, step):
+                char_parser.skip_to(pos)
+                regex_parser.skip_to(pos)
+                self.assertEqual((regex_parser.line, regex_parser.column),
+                                 (char_parser.line, char_parser.column))
+
+
+class TestPartialParsing(TestCase):
+    json_str = '{\n  a: [1, {b: "x"}],\n\t"c": 2, d: {},\n}'
+
+    def _parsers(self):
+        for engine, lazy_location in (('char', False), ('regex', False), ('regex', True)):
+            yield JSONParser(JSONParserParams(engine=engine, lazy_location=lazy_location))
+
+    def test_scan_root_items(self):
+        for parser in self._parsers():
+            self.assertEqual(parser.scan_root_items(self.json_str),
+                             (0, [('a', 7), ('c', 28), ('d', 34)]))
+        parser = JSONParser(JSONParserParams(root_is_array=True))
+        self.assertEqual(parser.scan_root_items(' [0, [1]]'), (1, [(None, 2), (None, 5)]))
+
+    def test_parse_value(self):
+        line_index = LineIndex(self.json_str)
+        for parser in self._parsers():
+            for pos, expected_event_stream, expected_location in (
+                    (7, "['1'u{'b'u:'x'q}]", (1, 18)), (28, "'2'u", (2, 10)), (34, "{}", (2, 17))):
+                listener = MyParserListener()
+                parser.parse_value(self.json_str, listener, pos, line_index)
+                self.assertEqual(listener.event_stream, expected_event_stream)
+                # The parser stops right after the value.
+                self.assertEqual((parser.line, parser.column), expected_location)
+                parser.reset()
+
+
+class TestLazyLocationJSONParser(TestCase):
+    def test_location_is_calculated_on_demand(self):
+        parser = JSONParser(JSONParserParams())
+        parser.init_text_parser('{\r\n\ta:\t0}')
+        parser.skip_to(7)
+        self.assertIsNone(parser._line_index)
+        self.assertEqual((parser.line, parser.column), (1, 8))
+        self.assertIsNotNone(parser._line_index)
+
+    def test_location_before_init_text_parser(self):
+        parser = JSONParser(JSONParserParams())
+        self.assertEqual((parser.line, parser.column), (0, 0))
+
 
 class TestParserListener(TestCase):
     def setUp(self):
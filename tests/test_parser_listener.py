@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from unittest import TestCase
+
+from jsoncfg import JSONConfigParserException, DefaultStringToScalarConverter
+from jsoncfg.parser import JSONParser, JSONParserParams
+from jsoncfg.parser_listener import ObjectBuilderParserListener
+from jsoncfg.tree_python import (
+    PythonObjectBuilderParams, PythonTreeBuilderParserListener, DefaultObjectCreator,
+    DefaultArrayCreator,
+)
+from jsoncfg.tree_config import ConfigObjectBuilderParams, ConfigObjectBuilderParserListener
+
+
+class KeyInterningTestsMixin(object):
+    """ The key interning tests of the listeners that build python trees. """
+    json_str = '[{host: "a", port: 1}, {"host": "b", port: 2}, {host: "c", x: {port: 3}}]'
+    listener_class = None
+
+    def _parse(self, object_builder_params):
+        listener = self.listener_class(object_builder_params)
+        JSONParser(JSONParserParams(root_is_array=True)).parse(self.json_str, listener)
+        return listener
+
+    def _keys(self, obj):
+        return list(obj)
+
+    def test_keys_are_interned(self):
+        listener = self._parse(PythonObjectBuilderParams())
+        result = listener.result
+        self.assertEqual(listener.deduplicated_key_count, 4)
+        self.assertIs(self._keys(result[1])[0], self._keys(result[0])[0])
+        self.assertIs(self._keys(result[2])[0], self._keys(result[0])[0])
+        self.assertIs(self._keys(result[2]['x'])[0], self._keys(result[0])[1])
+
+    def test_interning_disabled(self):
+        listener = self._parse(PythonObjectBuilderParams(intern_keys=False))
+        result = listener.result
+        self.assertEqual(listener.deduplicated_key_count, 0)
+        self.assertIsNot(self._keys(result[1])[0], self._keys(result[0])[0])
+        self.assertEqual(self._keys(result[1])[0], self._keys(result[0])[0])
+
+
+class TestObjectBuilderKeyInterning(KeyInterningTestsMixin, TestCase):
+    listener_class = ObjectBuilderParserListener
+
+    def test_config_tree_keys_are_interned(self):
+        listener = self._parse(ConfigObjectBuilderParams())
+        result = listener.result
+        self.assertEqual(listener.deduplicated_key_count, 4)
+        self.assertIs(self._keys(result[1]._dict)[1], self._keys(result[0]._dict)[1])
+
+
+class TestKeyInterningWithPythonTreeBuilder(KeyInterningTestsMixin, TestCase):
+    listener_class = PythonTreeBuilderParserListener
+
+
+class ValueDeduplicationTestsMixin(object):
+    """ The value deduplication tests of the listeners that build python trees. """
+    json_str = ('[{name: "web server", port: 8080, ratio: 1.5, on: true},'
+                ' {name: "web server", port: 8080, ratio: 1.5, x: "8080", y: -0.0, z: 0.0},'
+                ' {a: [], b: []}]')
+    listener_class = None
+
+    def _parse(self, object_builder_params, listener=None):
+        if listener is None:
+            listener = self.listener_class(object_builder_params)
+        JSONParser(JSONParserParams(root_is_array=True)).parse(self.json_str, listener)
+        return listener
+
+    def test_values_are_deduplicated(self):
+        listener = self._parse(PythonObjectBuilderParams(dedup_values=True))
+        result = listener.result
+        self.assertEqual(listener.deduplicated_value_count, 3)
+        for key in ('name', 'port', 'ratio'):
+            self.assertIs(result[1][key], result[0][key])
+        self.assertEqual(result[1]['x'], '8080')
+        # -0.0 and 0.0 are equal but they have different representations.
+        self.assertEqual(repr(result[1]['y']), '-0.0')
+        self.assertEqual(repr(result[1]['z']), '0.0')
+
+    def test_mutable_values_are_not_shared(self):
+        result = self._parse(PythonObjectBuilderParams(dedup_values=True)).result
+        self.assertIsNot(result[2]['a'], result[2]['b'])
+
+    def test_value_table_is_shared_by_trees(self):
+        listener = self.listener_class(PythonObjectBuilderParams(dedup_values=True))
+        value_table = {}
+        listener.reset(value_table=value_table)
+        first = self._parse(None, listener).result
+        listener.reset(value_table=value_table)
+        second = self._parse(None, listener).result
+        # All scalars of the second tree except the true singleton are replaced.
+        self.assertEqual(listener.deduplicated_value_count, 9)
+        self.assertIs(second[0]['name'], first[0]['name'])
+
+    def test_deduplication_disabled(self):
+        listener = self._parse(PythonObjectBuilderParams())
+        result = listener.result
+        self.assertEqual(listener.deduplicated_value_count, 0)
+        self.assertIsNot(result[1]['name'], result[0]['name'])
+        self.assertEqual(result[1]['name'], result[0]['name'])
+
+
+class TestObjectBuilderValueDeduplication(ValueDeduplicationTestsMixin, TestCase):
+    listener_class = ObjectBuilderParserListener
+
+    def test_config_tree_values_are_deduplicated(self):
+        params = ConfigObjectBuilderParams(dedup_values=True)
+        listener = self._parse(params, params.listener_class(params))
+        result = listener.result
+        self.assertEqual(listener.deduplicated_value_count, 3)
+        self.assertIsNot(result[1].name, result[0].name)
+        self.assertIs(result[1].name(), result[0].name())
+        self.assertIs(result[1].ratio(), result[0].ratio())
+
+
+class TestValueDeduplicationWithPythonTreeBuilder(ValueDeduplicationTestsMixin, TestCase):
+    listener_class = PythonTreeBuilderParserListener
+
+
+class TestPythonTreeBuilderParserListener(TestCase):
+    json_str = '{a: [1, "x", [], {}, [[{b: null}]]], "c": {d: {e: [true, 1.5]}}, f: "g"}'
+
+    def _parse(self, listener, json_str=json_str):
+        JSONParser().parse(json_str, listener)
+        return listener.result
+
+    def test_same_tree_as_object_builder(self):
+        for params in (PythonObjectBuilderParams(),
+                       PythonObjectBuilderParams(object_creator=DefaultObjectCreator(dict)),
+                       PythonObjectBuilderParams(string_to_scalar_converter=(
+                           DefaultStringToScalarConverter(scalar_const_literals={'null': 0, 'true': 1})))):
+            expected = self._parse(ObjectBuilderParserListener(params))
+            result = self._parse(PythonTreeBuilderParserListener(params))
+            self.assertEqual(result, expected)
+            self.assertIs(type(result), params.object_creator.dict_class)
+            self.assertIs(type(result['c']['d']), params.object_creator.dict_class)
+
+    def test_custom_scalar_converter(self):
+        def converter(listener, scalar_str, scalar_str_quoted):
+            return scalar_str.upper() if scalar_str_quoted else scalar_str
+        params = PythonObjectBuilderParams(string_to_scalar_converter=converter)
+        self.assertEqual(self._parse(PythonTreeBuilderParserListener(params), '{a: ["b", c]}'),
+                         {'a': ['B', 'c']})
+
+    def test_duplicate_key(self):
+        listener = PythonTreeBuilderParserListener(PythonObjectBuilderParams())
+        self.assertRaisesRegexp(JSONConfigParserException,
+                                r'Duplicate key: "a" \[line=1;col=12\]',
+                                self._parse, listener, '{b: {a: 0, a: 1}}')
+
+    def test_listener_class(self):
+        self.assertIs(PythonObjectBuilderParams().listener_class,
+                      PythonTreeBuilderParserListener)
+        for params in (PythonObjectBuilderParams(fast_tree_builder=False),
+                       PythonObjectBuilderParams(array_creator=DefaultArrayCreator(tuple)),
+                       PythonObjectBuilderParams(object_creator=DefaultObjectCreator(
+                           type('MyDict', (OrderedDict,), {})))):
+            self.assertIs(params.listener_class, ObjectBuilderParserListener)
+        self.assertIs(ConfigObjectBuilderParams().listener_class,
+                      ConfigObjectBuilderParserListener)
@@ -0,0 +1,134 @@
+import threading
+from unittest import TestCase, skipIf
+
+from jsoncfg import loads, loads_config, JSONParserParams, PythonObjectBuilderParams
+from jsoncfg.compatibility import python2
+from jsoncfg.parser import JSONParser, LazyLocationJSONParser, Utf8JSONParser
+from jsoncfg.parser_listener import ObjectBuilderParserListener
+from jsoncfg.parser_pool import ParserPool
+from jsoncfg.tree_config import ConfigObjectBuilderParams
+
+
+class TestParserReset(TestCase):
+    def test_reused_parser_and_listener(self):
+        parser = JSONParser()
+        listener = ObjectBuilderParserListener(PythonObjectBuilderParams())
+        parser.parse('{a: [1, 2]}', listener)
+        self.assertEqual(listener.result, {'a': [1, 2]})
+
+        parser.reset()
+        listener.reset()
+        parser.parse('\n\n{b: 3}', listener)
+        self.assertEqual(listener.result, {'b': 3})
+        self.assertEqual(parser.line, 2)
+
+    def test_reused_parser_after_error(self):
+        parser = JSONParser()
+        listener = ObjectBuilderParserListener(PythonObjectBuilderParams())
+        self.assertRaisesRegexp(Exception, r'\[line=1;col=8\]', parser.parse, '{a: [1,', listener)
+
+        parser.reset()
+        listener.reset()
+        parser.parse('{a: 1}', listener)
+        self.assertEqual(listener.result, {'a': 1})
+
+    def test_reset_with_new_params(self):
+        parser = JSONParser()
+        listener = ObjectBuilderParserListener(PythonObjectBuilderParams())
+        parser.parse('{a: 1}', listener)
+
+        parser.reset(JSONParserParams(root_is_array=True, tab_size=8))
+        listener.reset(PythonObjectBuilderParams(intern_keys=False))
+        parser.parse('[1]', listener)
+        self.assertEqual(listener.result, [1])
+        self.assertEqual(parser.tab_size, 8)
+        self.assertIsNone(listener._key_table)
+
+
+class TestParserPool(TestCase):
+    def setUp(self):
+        self.pool = ParserPool(max_size=2)
+        self.parser_params = JSONParserParams()
+        self.object_builder_params = PythonObjectBuilderParams()
+
+    def _acquire(self, json_text='{}'):
+        return self.pool.acquire(json_text, self.parser_params, self.object_builder_params)
+
+    def test_released_pair_is_reused(self):
+        parser, listener = self._acquire()
+        self.assertIsInstance(parser, LazyLocationJSONParser)
+        parser.parse('{a: 1}', listener)
+        self.pool.release(parser, listener)
+        self.assertIsNone(parser.text)
+        self.assertIsNone(listener.result)
+
+        parser2, listener2 = self._acquire()
+        self.assertIs(parser2, parser)
+        self.assertIs(listener2, listener)
+
+    def test_concurrently_acquired_pairs_are_different(self):
+        parser, listener = self._acquire()
+        parser2, listener2 = self._acquire()
+        self.assertIsNot(parser2, parser)
+        self.assertIsNot(listener2, listener)
+
+    def test_max_size(self):
+        pairs = [self._acquire() for _ in range(3)]
+        for parser, listener in pairs:
+            self.pool.release(parser, listener)
+        reused_parsers = [self._acquire()[0] for _ in range(3)]
+        self.assertEqual(sum(parser in reused_parsers for parser, _ in pairs), 2)
+
+    def test_parsers_are_pooled_by_engine(self):
+        parser, listener = self._acquire()
+        self.pool.release(parser, listener)
+        char_parser, _ = self.pool.acquire('{}', JSONParserParams(engine='char'),
+                                           self.object_builder_params)
+        self.assertIsNot(char_parser, parser)
+        self.assertEqual(char_parser.params.engine, 'char')
+
+    @skipIf(python2, 'In case of python2 the binary text is a str.')
+    def test_binary_text_gets_utf8_parser(self):
+        parser, listener = self._acquire(b'{}')
+        self.assertIsInstance(parser, Utf8JSONParser)
+
+    def test_reused_pair_gets_the_new_params(self):
+        parser, listener = self._acquire()
+        self.pool.release(parser, listener)
+        parser_params = JSONParserParams(root_is_array=True)
+        object_builder_params = ConfigObjectBuilderParams()
+        parser, listener = self.pool.acquire('[]', parser_params, object_builder_params)
+        self.assertIs(parser.params, parser_params)
+        self.assertIs(listener.params, object_builder_params)
+
+
+class TestPooledLoads(TestCase):
+    parser_params = JSONParserParams(stdlib_fast_path=False)
+
+    def test_loads_after_parse_error(self):
+        self.assertRaisesRegexp(Exception, r'\[line=1;col=5\]', loads, '{a: }',
+                                self.parser_params)
+        self.assertEqual(loads('{a: 1}', self.parser_params), {'a': 1})
+        self.assertEqual(loads_config('{a: 1}', self.parser_params).a(), 1)
+
+    def test_loads_from_multiple_threads(self):
+        errors = []
+
+        def parse_documents(thread_index):
+            try:
+                for i in range(200):
+                    doc = '{thread: %d, i: %d, items: [%d, {x: %d}]}' % (thread_index, i, i, i)
+                    expected = {'thread': thread_index, 'i': i, 'items': [i, {'x': i}]}
+                    if loads(doc, self.parser_params) != expected:
+                        errors.append(doc)
+                    if loads_config(doc, self.parser_params).items[1].x() != i:
+                        errors.append(doc)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=parse_documents, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
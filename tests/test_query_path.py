@@ -0,0 +1,41 @@
+import pickle
+from unittest import TestCase
+
+from jsoncfg.query_path import parse_query_path, compile_selection_tree, WILDCARD, SELECT_ALL
+
+
+class TestParseQueryPath(TestCase):
+    def test_parse_query_path(self):
+        self.assertListEqual(parse_query_path(''), [])
+        self.assertListEqual(parse_query_path('a'), ['a'])
+        self.assertListEqual(parse_query_path('.a.b'), ['a', 'b'])
+        self.assertListEqual(parse_query_path('servers[3].address'), ['servers', 3, 'address'])
+        self.assertListEqual(parse_query_path('[0][*].*'), [0, WILDCARD, WILDCARD])
+
+    def test_invalid_path(self):
+        for path in ('a..b', 'a[x]', 'a[0', 'a]', '.'):
+            self.assertRaisesRegexp(ValueError, r'Invalid query path', parse_query_path, path)
+
+
+class TestCompileSelectionTree(TestCase):
+    def test_compile_selection_tree(self):
+        self.assertEqual(compile_selection_tree(['a.b', 'a.c[1]', 'd']),
+                         {'a': {'b': SELECT_ALL, 'c': {1: SELECT_ALL}}, 'd': SELECT_ALL})
+        self.assertEqual(compile_selection_tree([]), {})
+
+    def test_shorter_path_selects_the_whole_subtree(self):
+        self.assertEqual(compile_selection_tree(['a.b', 'a']), {'a': SELECT_ALL})
+        self.assertEqual(compile_selection_tree(['a', 'a.b']), {'a': SELECT_ALL})
+        self.assertIs(compile_selection_tree(['a', '']), SELECT_ALL)
+
+    def test_wildcards_are_merged(self):
+        self.assertEqual(compile_selection_tree(['[*].a', '[1].b', '[2]']),
+                         {WILDCARD: {'a': SELECT_ALL}, 1: {'a': SELECT_ALL, 'b': SELECT_ALL},
+                          2: SELECT_ALL})
+        self.assertEqual(compile_selection_tree(['*.*.x', 'a.b.y']),
+                         {WILDCARD: {WILDCARD: {'x': SELECT_ALL}},
+                          'a': {WILDCARD: {'x': SELECT_ALL},
+                                'b': {'x': SELECT_ALL, 'y': SELECT_ALL}}})
+
+    def test_select_all_pickling(self):
+        self.assertIs(pickle.loads(pickle.dumps(SELECT_ALL)), SELECT_ALL)
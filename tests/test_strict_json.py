@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+from unittest import TestCase
+from mock import patch
+
+from jsoncfg import (
+    loads, loads_config, node_location, JSONParserParams, JSONConfigParserException,
+    PythonObjectBuilderParams, DefaultObjectCreator, DefaultArrayCreator,
+    DefaultStringToScalarConverter,
+)
+from jsoncfg import tree_config
+from jsoncfg.compatibility import my_unicode
+from jsoncfg.config_classes import ConfigNode
+
+
+STRICT_JSON_STRING = my_unicode('''{
+\t"int": 5, "negative": -0, "float": 1.5e3, "big": 123456789012345678901234567890,
+\t"str": "str\\\\u00e9\\\\ud800\\\\udc00\\\\n", "null": null, "true": true, "false": false,
+    "array": [{"a": 0}, {"b": [1, [2, {}]]}, [], "x"],
+    "obj": {"z": 0, "y": 1, "x": 2}
+}''')
+
+
+class TestStrictJSONFastPath(TestCase):
+    fast = JSONParserParams()
+    slow = JSONParserParams(stdlib_fast_path=False)
+
+    def test_loads_result_is_the_same(self):
+        result = loads(STRICT_JSON_STRING, self.fast)
+        self.assertEqual(result, loads(STRICT_JSON_STRING, self.slow))
+        self.assertIsInstance(result, OrderedDict)
+        self.assertEqual(list(result['obj'].keys()), ['z', 'y', 'x'])
+
+    def test_loads_uses_the_json_module(self):
+        with patch('jsoncfg.functions.default_parser_pool') as mock_parser_pool:
+            loads(STRICT_JSON_STRING, self.fast)
+            loads_config(STRICT_JSON_STRING, self.fast)
+        self.assertFalse(mock_parser_pool.acquire.called)
+
+    def test_custom_dict_class(self):
+        class MyDict(dict):
+            pass
+        params = PythonObjectBuilderParams(object_creator=DefaultObjectCreator(MyDict))
+        result = loads(STRICT_JSON_STRING, self.fast, params)
+        self.assertIsInstance(result['array'][0], MyDict)
+        self.assertEqual(result, loads(STRICT_JSON_STRING, self.slow, params))
+
+    def test_fallback_with_custom_factories(self):
+        class MyList(list):
+            pass
+        params = PythonObjectBuilderParams(array_creator=DefaultArrayCreator(MyList))
+        self.assertIsInstance(loads(STRICT_JSON_STRING, self.fast, params)['array'], MyList)
+
+        my_true = object()
+        converter = DefaultStringToScalarConverter(
+            scalar_const_literals={'null': None, 'true': my_true, 'false': False})
+        params = PythonObjectBuilderParams(string_to_scalar_converter=converter)
+        self.assertIs(loads(STRICT_JSON_STRING, self.fast, params)['true'], my_true)
+        self.assertIs(loads_config(STRICT_JSON_STRING, self.fast, converter).true(), my_true)
+
+    def test_fallback_with_extended_syntax(self):
+        for json_str in ('{a: 0}', '{"a": 0,}', '{"a": 0} // comment'):
+            self.assertEqual(loads(my_unicode(json_str), self.fast), {'a': 0})
+        self.assertEqual(loads(my_unicode('{"a": "\t"}'), self.fast), {'a': '\t'})
+
+    def test_errors_are_reported_by_the_parser(self):
+        error_json_strings = (
+            '{"a": 0, "a": 1}',
+            '{"a": NaN}',
+            '{"a": Infinity}',
+            '[]',
+            '{"a": "\\u12X4"}',
+            '{"a": 0} 0',
+            '1',
+            '"x"',
+            'true',
+        )
+        for json_str in error_json_strings:
+            json_str = my_unicode(json_str)
+            for loads_func in (loads, loads_config):
+                try:
+                    loads_func(json_str, self.slow)
+                except JSONConfigParserException as e:
+                    expected = str(e)
+                else:
+                    expected = None
+                try:
+                    loads_func(json_str, self.fast)
+                except JSONConfigParserException as e:
+                    self.assertEqual(str(e), expected)
+                else:
+                    self.assertIsNone(expected)
+
+    def test_root_is_array(self):
+        params = JSONParserParams(root_is_array=True)
+        self.assertEqual(loads(my_unicode('[{"a": 0}]'), params), [{'a': 0}])
+        self.assertRaises(JSONConfigParserException, loads, my_unicode('{}'), params)
+        self.assertRaises(JSONConfigParserException, loads, my_unicode('1'), params)
+
+    def test_deep_nesting_is_parsed_by_the_parser(self):
+        depth = 100000
+        json_str = my_unicode('[' * depth + ']' * depth)
+        params = JSONParserParams(root_is_array=True)
+        result = loads(json_str, params)
+        config = loads_config(json_str, params)
+        for _ in range(depth - 1):
+            result = result[0]
+            config = config[0]
+        self.assertEqual(result, [])
+        self.assertEqual(config(), [])
+        self.assertEqual(node_location(config), (1, depth))
+
+    def test_max_depth_is_checked_by_the_parser(self):
+        json_str = my_unicode('{"a": {"b": {"c": {}}}}')
+        params = JSONParserParams(max_depth=2)
+        for loads_func in (loads, loads_config):
+            self.assertRaisesRegexp(JSONConfigParserException,
+                                    r'The json is nested deeper than the max_depth=2 limit\. '
+                                    r'\[line=1;col=13\]', loads_func, json_str, params)
+
+    def test_config_tree_is_the_same(self):
+        def collect(node, path, result):
+            result.append((path, node_location(node), repr(node)))
+            if isinstance(node(), dict):
+                for key, child in node:
+                    collect(child, path + '.' + key, result)
+            elif isinstance(node(), list):
+                for index, child in enumerate(node):
+                    collect(child, path + '[%s]' % index, result)
+            return result
+
+        fast_config = loads_config(STRICT_JSON_STRING, self.fast)
+        slow_config = loads_config(STRICT_JSON_STRING, self.slow)
+        self.assertEqual(fast_config(), slow_config())
+        self.assertEqual(collect(fast_config, '', []), collect(slow_config, '', []))
+
+    def test_config_node_locations_are_resolved_on_demand(self):
+        config = loads_config(STRICT_JSON_STRING, self.fast)
+        self.assertIsNone(config.array[1].b._line)
+        self.assertEqual(node_location(config.array[1].b), (4, 31))
+        self.assertEqual(config.array[1].b._line, 4)
+        self.assertIsNone(config.array[1].b._deferred_locations.json_text)
+        self.assertIsInstance(config.array[1].b, ConfigNode)
+
+    def test_node_locations_can_be_resolved_by_several_threads(self):
+        parser_class = tree_config.JSONParser
+        first_thread_is_resolving = threading.Event()
+        errors = []
+
+        def create_parser(params):
+            # Suspends the first thread after it has found that the locations are missing.
+            if not first_thread_is_resolving.is_set():
+                first_thread_is_resolving.set()
+                time.sleep(0.1)
+            return parser_class(params)
+
+        def query_location(node):
+            try:
+                self.assertEqual(node_location(node), (4, 31))
+            except Exception as e:
+                errors.append(e)
+
+        node = loads_config(STRICT_JSON_STRING, self.fast).array[1].b
+        with patch('jsoncfg.tree_config.JSONParser', create_parser):
+            threads = [threading.Thread(target=query_location, args=(node,)) for _ in range(2)]
+            threads[0].start()
+            first_thread_is_resolving.wait()
+            threads[1].start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
@@ -1,9 +1,15 @@
+import io
+import os
+import shutil
+import tempfile
 from unittest import TestCase
 from mock import patch, MagicMock
 
 from jsoncfg.compatibility import python2
 from jsoncfg.text_encoding import (
-    detect_encoding_and_remove_bom, decode_utf_text_buffer, load_utf_text_file
+    detect_encoding_and_remove_bom, decode_utf_text_buffer, load_utf_text_file,
+    decode_utf_text_chunks, load_utf_text_file_chunks, map_utf_text_file, detect_encoding,
+    open_utf_text_file, read_file_chunks,
 )
 
 
@@ -21,6 +27,13 @@ class TestEncodingFunctions(TestCase):
             buf, encoding = detect_encoding_and_remove_bom(encoded)
             self.assertEqual(buf.decode(encoding), decoded)
 
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding(b'\xef\xbb\xbfUTF'), (3, 'UTF-8'))
+        self.assertEqual(detect_encoding(b'\xff\xfe\0\0U\0\0\0'), (4, 'UTF-32-LE'))
+        self.assertEqual(detect_encoding(b'\xff\xfeU\0'), (2, 'UTF-16-LE'))
+        self.assertEqual(detect_encoding(b'UTF'), (0, 'UTF-8'))
+        self.assertEqual(detect_encoding(b'', 'UTF-16-LE'), (0, 'UTF-16-LE'))
+
     def test_detect_encoding_and_remove_bom_with_non_bytes_buf(self):
         self.assertRaisesRegexp(TypeError, r'buf should be a bytes instance but it is a',
                                 detect_encoding_and_remove_bom, u'non_bytes_buf')
@@ -58,3 +71,152 @@ class TestEncodingFunctions(TestCase):
 
         self.assertEqual(text, u'file_contents')
         mock_file.read.assert_called_with()
+
+
+class _PipeRawIO(io.RawIOBase):
+    """ Returns the next record for each read like a pipe the records are written to.
+    Reading after the last record fails instead of blocking. """
+    def __init__(self, records):
+        super(_PipeRawIO, self).__init__()
+        self.records = list(records)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        if not self.records:
+            raise AssertionError('Blocked while waiting for the next record.')
+        record = self.records.pop(0)
+        buf[:len(record)] = record
+        return len(record)
+
+
+class TestChunkedDecoding(TestCase):
+    def _split(self, buf, chunk_size):
+        return [buf[pos:pos+chunk_size] for pos in range(0, len(buf), chunk_size)]
+
+    def test_decode_utf_text_chunks(self):
+        text = u'UTF \u00e9\u20ac\U0001f600'
+        encoded_buffers = (
+            b'\xef\xbb\xbf' + text.encode('UTF-8'),
+            b'\xff\xfe\0\0' + text.encode('UTF-32-LE'),
+            b'\0\0\xfe\xff' + text.encode('UTF-32-BE'),
+            b'\xff\xfe' + text.encode('UTF-16-LE'),
+            b'\xfe\xff' + text.encode('UTF-16-BE'),
+            text.encode('UTF-8'),
+        )
+        for buf in encoded_buffers:
+            for chunk_size in (1, 2, 3, 5, 1000):
+                chunks = list(decode_utf_text_chunks(self._split(buf, chunk_size),
+                                                     use_utf8_strings=False))
+                self.assertEqual(u''.join(chunks), text)
+                self.assertNotIn(u'', chunks)
+
+    def test_decode_utf_text_chunks_default_encoding(self):
+        buf = u'UTF'.encode('UTF-16-LE')
+        chunks = decode_utf_text_chunks(self._split(buf, 3), default_encoding='UTF-16-LE',
+                                        use_utf8_strings=False)
+        self.assertEqual(u''.join(chunks), u'UTF')
+
+    def test_decode_utf_text_chunks_empty(self):
+        self.assertEqual(list(decode_utf_text_chunks([], use_utf8_strings=False)), [])
+        self.assertEqual(list(decode_utf_text_chunks([b'\xef\xbb\xbf'],
+                                                     use_utf8_strings=False)), [])
+
+    def test_decode_utf_text_chunks_invalid(self):
+        self.assertRaises(UnicodeDecodeError, list,
+                          decode_utf_text_chunks([b'[', b'\xff', b']'], use_utf8_strings=False))
+
+    def test_load_utf_text_file_chunks_filename(self):
+        with patch('jsoncfg.text_encoding.open', create=True) as mock_open:
+            mock_open.return_value.__enter__.return_value = io.BytesIO(b'file_contents')
+            chunks = list(load_utf_text_file_chunks('fake.txt', use_utf8_strings=False,
+                                                    chunk_size=4))
+
+        self.assertEqual(u''.join(chunks), u'file_contents')
+        mock_open.assert_called_with('fake.txt', 'rb')
+
+    def test_load_utf_text_file_chunks_fileobject(self):
+        f = io.BytesIO(b'\xef\xbb\xbffile_contents')
+        chunks = load_utf_text_file_chunks(f, use_utf8_strings=False, chunk_size=4)
+        self.assertEqual(next(chunks), u'f')
+        # the file is read lazily
+        self.assertEqual(f.tell(), 4)
+        self.assertEqual(u''.join(chunks), u'ile_contents')
+
+    def test_read_file_chunks_doesnt_wait_for_a_whole_chunk(self):
+        chunks = read_file_chunks(io.BufferedReader(_PipeRawIO([b'{"a": 0}\n', b'{"b": 1}\n'])))
+        self.assertEqual(next(chunks), b'{"a": 0}\n')
+        self.assertEqual(next(chunks), b'{"b": 1}\n')
+
+
+class TestMappedFileLoading(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _create_file(self, contents):
+        path = os.path.join(self.tmp_dir, 'test.json')
+        with open(path, 'wb') as f:
+            f.write(contents)
+        return path
+
+    def test_map_utf_text_file(self):
+        text = u'UTF \u00e9\u20ac'
+        encoded_buffers = (
+            b'\xef\xbb\xbf' + text.encode('UTF-8'),
+            b'\xff\xfe\0\0' + text.encode('UTF-32-LE'),
+            b'\xfe\xff' + text.encode('UTF-16-BE'),
+            text.encode('UTF-8'),
+        )
+        for buf in encoded_buffers:
+            path = self._create_file(buf)
+            self.assertEqual(map_utf_text_file(path, use_utf8_strings=False), text)
+            with open(path, 'rb') as f:
+                self.assertEqual(map_utf_text_file(f, use_utf8_strings=False), text)
+
+    def test_map_empty_file(self):
+        path = self._create_file(b'')
+        self.assertEqual(map_utf_text_file(path, use_utf8_strings=False), u'')
+
+    def test_map_file_object_without_fileno(self):
+        f = io.BytesIO(b'\xef\xbb\xbffile_contents')
+        self.assertEqual(map_utf_text_file(f, use_utf8_strings=False), u'file_contents')
+
+    def test_map_pipe(self):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b'\xef\xbb\xbffile_contents')
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            self.assertEqual(map_utf_text_file(f, use_utf8_strings=False), u'file_contents')
+
+    def test_map_file_from_its_current_position(self):
+        path = self._create_file(b'skipped_header\nfile_contents')
+        with open(path, 'rb') as f:
+            f.readline()
+            self.assertEqual(map_utf_text_file(f, use_utf8_strings=False), u'file_contents')
+        with open(path, 'rb') as f:
+            f.readline()
+            chunks = load_utf_text_file_chunks(f, use_utf8_strings=False, use_mmap=True)
+            self.assertEqual(u''.join(chunks), u'file_contents')
+
+    def test_load_utf_text_file_chunks_mmap(self):
+        path = self._create_file(b'\xff\xfe' + u'file_contents'.encode('UTF-16-LE'))
+        chunks = load_utf_text_file_chunks(path, use_utf8_strings=False, chunk_size=3,
+                                           use_mmap=True)
+        self.assertEqual(u''.join(chunks), u'file_contents')
+
+    def test_open_utf_text_file_utf8_bytes(self):
+        path = self._create_file(b'\xef\xbb\xbf\xc3\xa9')
+        for use_mmap in (False, True):
+            with open_utf_text_file(path, use_mmap=use_mmap, utf8_bytes=True) as buf:
+                self.assertEqual(buf[:], b'\xef\xbb\xbf\xc3\xa9')
+
+    def test_open_utf_text_file_utf8_bytes_decodes_other_encodings(self):
+        path = self._create_file(b'\xff\xfe' + u'\xe9'.encode('UTF-16-LE'))
+        for use_mmap in (False, True):
+            with open_utf_text_file(path, use_utf8_strings=False, use_mmap=use_mmap,
+                                    utf8_bytes=True) as text:
+                self.assertEqual(text, u'\xe9')
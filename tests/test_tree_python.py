@@ -0,0 +1,74 @@
+import decimal
+from unittest import TestCase
+
+from jsoncfg import (
+    loads, JSONParserParams, JSONConfigParserException, PythonObjectBuilderParams,
+    DefaultStringToScalarConverter, default_number_converter, decimal_number_converter,
+)
+
+
+class TestNumberConverters(TestCase):
+    def test_default_number_converter(self):
+        for number_str, expected in (('0', 0), ('-12', -12), ('007', 7), ('1.5', 1.5),
+                                     ('-0.25e2', -25.0), ('1E3', 1000.0), ('+5', 5.0),
+                                     ('.5', 0.5), ('5.', 5.0),
+                                     ('123456789012345678901234567890',
+                                      123456789012345678901234567890)):
+            value = default_number_converter(number_str)
+            self.assertEqual(value, expected)
+            self.assertIs(type(value), type(expected))
+
+    def test_non_numbers_are_rejected(self):
+        for number_str in ('nan', 'NaN', 'inf', '-inf', 'Infinity', '1e', '--1', '1.2.3', '.',
+                           '', '0x10', '1_000'):
+            self.assertRaises(ValueError, default_number_converter, number_str)
+            self.assertRaises(ValueError, decimal_number_converter, number_str)
+
+    def test_decimal_number_converter(self):
+        self.assertEqual(decimal_number_converter('0.1'), decimal.Decimal('0.1'))
+        self.assertIsInstance(decimal_number_converter('-1e2'), decimal.Decimal)
+        self.assertIs(type(decimal_number_converter('-12')), int)
+
+    def test_loads_with_decimal_number_converter(self):
+        params = PythonObjectBuilderParams(string_to_scalar_converter=(
+            DefaultStringToScalarConverter(number_converter=decimal_number_converter)))
+        self.assertEqual(loads('{"a": [0.1, 2]}', object_builder_params=params),
+                         {'a': [decimal.Decimal('0.1'), 2]})
+
+    def test_nan_is_invalid_json_scalar(self):
+        self.assertRaisesRegexp(JSONConfigParserException,
+                                r'Invalid json scalar: "nan" \[line=1;col=5\]', loads, '{a: nan}')
+
+
+class TestScalarCache(TestCase):
+    def _parse(self, converter, json_str):
+        params = PythonObjectBuilderParams(string_to_scalar_converter=converter)
+        return loads(json_str, JSONParserParams(root_is_array=True), params)
+
+    def test_cache(self):
+        converted = []
+
+        def number_converter(number_str):
+            converted.append(number_str)
+            return default_number_converter(number_str)
+        converter = DefaultStringToScalarConverter(number_converter=number_converter,
+                                                   cache_size=2)
+        self.assertListEqual(self._parse(converter, '[1, 2, 1, 3, 2, 3, null, "1"]'),
+                             [1, 2, 1, 3, 2, 3, None, '1'])
+        # The cache is full after 1 and 2.
+        self.assertListEqual(converted, ['1', '2', '3', '3'])
+
+    def test_scalar_const_literals_can_be_replaced(self):
+        converter = DefaultStringToScalarConverter(cache_size=10)
+        self.assertListEqual(self._parse(converter, '[null, 1]'), [None, 1])
+        converter.scalar_const_literals = {'null': 0}
+        self.assertListEqual(self._parse(converter, '[null]'), [0])
+        self.assertRaisesRegexp(JSONConfigParserException, r'Invalid json scalar: "true"',
+                                self._parse, converter, '[true]')
+
+    def test_scalar_const_literals_can_be_modified_in_place(self):
+        converter = DefaultStringToScalarConverter(cache_size=10)
+        self.assertListEqual(self._parse(converter, '[null, 1]'), [None, 1])
+        converter.scalar_const_literals['nil'] = None
+        converter.scalar_const_literals['1'] = 'one'
+        self.assertListEqual(self._parse(converter, '[nil, 1]'), [None, 'one'])